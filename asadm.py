@@ -21,6 +21,8 @@ import cmd
 import getpass
 import shlex
 from lib import citrusleaf
+from lib import util
+from lib.cluster import Cluster
 from lib.controller import *
 from lib.logcontroller import *
 from lib import terminal
@@ -381,6 +383,16 @@ def main():
                             , "--file-path"
                             , dest="log_path"
                             , help="Path of cluster collectinfo file or directory containing collectinfo files.")
+        parser.add_argument("--refresh-interval"
+                            , dest="refresh_interval"
+                            , type=float
+                            , default=Cluster.crawl_interval
+                            , help="Minimum number of seconds between two checks of the cluster topology. Default: %s"%(Cluster.crawl_interval))
+        parser.add_argument("--threads"
+                            , dest="threads"
+                            , type=int
+                            , default=util.DEFAULT_MAX_WORKERS
+                            , help="Maximum number of concurrent requests to cluster nodes. Default: %d"%(util.DEFAULT_MAX_WORKERS))
 
         cli_args = parser.parse_args()
     except Exception:
@@ -449,6 +461,16 @@ def main():
                             , "--file-path"
                             , dest="log_path"
                             , help="Path of cluster collectinfo file or directory containing collectinfo files.")
+        parser.add_option("--refresh-interval"
+                            , dest="refresh_interval"
+                            , type=float
+                            , default=Cluster.crawl_interval
+                            , help="Minimum number of seconds between two checks of the cluster topology. Default: %s"%(Cluster.crawl_interval))
+        parser.add_option("--threads"
+                            , dest="threads"
+                            , type=int
+                            , default=util.DEFAULT_MAX_WORKERS
+                            , help="Maximum number of concurrent requests to cluster nodes. Default: %d"%(util.DEFAULT_MAX_WORKERS))
 
         (cli_args, args) = parser.parse_args()
 
@@ -463,6 +485,14 @@ def main():
     if cli_args.no_color:
         disable_coloring()
 
+    Cluster.crawl_interval = max(0, cli_args.refresh_interval)
+
+    try:
+        util.set_max_workers(cli_args.threads)
+    except ValueError as e:
+        print "Invalid --threads value: %s"%(e)
+        exit(1)
+
     user = None
     password = None
     if cli_args.user != None:
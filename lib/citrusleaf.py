@@ -216,6 +216,8 @@ def receivedata(sock, sz):
 	pos = 0
 	while pos < sz:
 		chunk = sock.recv(sz - pos)
+		if not chunk:
+			raise socket.error("connection closed by peer")
 		if pos == 0:
 			data = chunk
 		else:
@@ -340,13 +342,18 @@ def adminParseHeader(data):
 
 	return rv
 
-def authenticate(sock, user, password):
+def authenticate_buffer(user, password):
 	sz = len(user) + len(password) + 34  # 2 * 5 + 24
 	send_buf = adminWriteHeader(sz, 0, 2)
 	
 	fmtStr = "! I B %ds I B %ds" % (len(user), len(password))
 	struct.pack_into(fmtStr, send_buf, 24, len(user)+1, 0, user, len(password)+1, 3, password)
 
+	return send_buf
+
+def authenticate(sock, user, password):
+	send_buf = authenticate_buffer(user, password)
+
 	try:
 		sock.sendall(send_buf)
 		recv_buff = receivedata(sock, 24)
@@ -899,37 +906,49 @@ def citrusleaf_info_request(host, port, buf, user=None, password=None, debug=Fal
 				sock.close()
 				return None
 
-		sock.send(buf)
-		
-		if debug:
-			print "info get response"
-		# get response
-		rsp_hdr = sock.recv(8)
-		if debug:
-			print "response is: "
-			myHexlify(rsp_hdr)
-		q = struct.unpack_from("! Q",rsp_hdr, 0)
-		sz = q[0] & 0xFFFFFFFFFFFF
-		if debug:
-			print "recv header length ",sz
-		if sz > 0:
-			rsp_data = receivedata(sock, sz)
-			if debug:
-				print "recv body "
-				myHexlify(rsp_data)
+		rsp_data = citrusleaf_info_send(sock, buf, debug)
 		sock.close()
 	except Exception , ex:
 #		print "info request got exception ",type(ex)," ",ex
 		return -1	
 	
+	return( rsp_data )
+
+#
+# Send a prebuilt info buffer over an already connected (and authenticated)
+# socket and read back the response body. The socket is left open so that
+# callers can reuse it for further requests.
+#
+# Returns: the response body, or None if the server sent an empty response.
+# Socket errors are raised to the caller.
+
+def citrusleaf_info_send(sock, buf, debug=False):
+
+	sock.sendall(buf)
+
+	if debug:
+		print "info get response"
+	# get response
+	rsp_hdr = receivedata(sock, 8)
+	if debug:
+		print "response is: "
+		myHexlify(rsp_hdr)
+	q = struct.unpack_from("! Q",rsp_hdr, 0)
+	sz = q[0] & 0xFFFFFFFFFFFF
+	if debug:
+		print "recv header length ",sz
+
 	# parse out responses
 	if sz == 0:
 		return None
-		
+
+	rsp_data = receivedata(sock, sz)
 	if debug:
+		print "recv body "
+		myHexlify(rsp_data)
 		print "receive as string: ",rsp_data
-	
-	return( rsp_data )
+
+	return rsp_data
 	
 
 
@@ -997,6 +1016,23 @@ def citrusleaf_info_command( host, port, cmd, user=None, password=None, paramete
 
 def citrusleaf_info( host, port, names=None, user=None, password=None, debug=False ):
 	
+	buf = citrusleaf_info_buffer(names)
+		
+	if debug:
+		print "request buffer: "
+		myHexlify(buf)
+
+	rsp_data = citrusleaf_info_request( host, port, buf, user, password, debug )
+
+	return citrusleaf_info_parse(names, rsp_data, debug)
+
+#
+# Build the wire buffer for an info request on 'names' (None, a single
+# string or an iterable of strings, as for citrusleaf_info).
+#
+
+def citrusleaf_info_buffer( names=None ):
+
 	# Passed a set of names: created output buffer
 
 	if names == None:
@@ -1023,12 +1059,16 @@ def citrusleaf_info( host, port, names=None, user=None, password=None, debug=Fal
 		fmtStr = "! Q %ds" % len(namestr)
 		buf = struct.pack(fmtStr, q, namestr )
 
-		
-	if debug:
-		print "request buffer: "
-		myHexlify(buf)
+	return buf
 
-	rsp_data = citrusleaf_info_request( host, port, buf, user, password, debug )
+#
+# Split an info response body back into values for the requested 'names'.
+#
+# Returns: a single value if 'names' was a string, a dict otherwise, or -1
+# if the request failed.
+#
+
+def citrusleaf_info_parse( names, rsp_data, debug=False ):
 
 	if rsp_data == -1 or rsp_data is None:
 		return -1
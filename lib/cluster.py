@@ -13,15 +13,23 @@
 # limitations under the License.
 
 from lib import util
+from lib import infoloop
 from lib.node import Node
 from lib.prefixdict import PrefixDict
 import re
+from time import time
 
 class Cluster(object):
     # Kinda like a singleton... All instantiated classes will share the same
     # state... This makes the class no
     cluster_state = {}
     use_services = False
+    # Minimum number of seconds between two crawls. Commands issued within
+    # this interval reuse the known topology, 0 checks on every command.
+    crawl_interval = 5.0
+    # Serve plain info/infoBatch calls from a single event loop instead of
+    # one worker per node.
+    use_event_loop = True
 
     def __init__(self, seed_nodes, use_telnet=False, user=None, password=None, use_services=False):
         """
@@ -50,6 +58,9 @@ class Cluster(object):
         self._original_seed_nodes = set(seed_nodes)
         self._seed_nodes = set(seed_nodes)
         self._live_nodes = set()
+        # node.key -> set of services the node reported on the last crawl
+        self._node_services = {}
+        self._last_crawl = 0
         # crawl the cluster search for nodes in addition to the seed nodes.
         self._enable_crawler = True
         self._crawl()
@@ -98,6 +109,7 @@ class Cluster(object):
             return ''
 
     def getLiveNodes(self):
+        self._refreshNodeLiveliness()
         return self._live_nodes
 
     def getClusterVisibilityErrorNodes(self):
@@ -118,80 +130,91 @@ class Cluster(object):
         """
         Determine if we need to do a crawl.
 
-        We crawl if the union of all services lists is not equal to the set
-        of nodes that this tool percieves as alive.
+        We crawl at most once every crawl_interval seconds.
         """
         if not self._enable_crawler:
             return False
-        self._enable_crawler = False
-        current_services = set()
 
-        self._refreshNodeLiveliness()
+        return time() - self._last_crawl >= self.crawl_interval
 
-        try:
-            for services in self.infoServices().itervalues():
-                if isinstance(services, Exception):
-                    continue
-                current_services |= set(services)
-
-            if current_services and current_services == self._live_nodes:
-                # services have not changed, do not crawl
-                # if services are empty they crawl regardless
-                return False
-            else:
-                # services have changed
-                return True
+    def _probeServices(self, nodes):
+        """
+        Fetch the services of nodes and record them.
 
-        except IOError:
-            # We aren't connected yet, definitely crawl.
-            return True
+        Returns:
+        set -- services of the nodes whose services changed since the last
+               crawl (or that were never probed before)
+        """
+        changed = set()
+        services_list = util.concurrent_map(self._getServices, nodes)
+        for node, services in zip(nodes, services_list):
+            if isinstance(services, Exception):
+                continue
+            services = set(services)
+            services.add((node.ip, node.port))
+            if self._node_services.get(node.key, None) != services:
+                changed |= services
+            self._node_services[node.key] = services
 
-        finally:
-            # Re-enable crawler before exiting
-            self._enable_crawler = True
+        return changed
 
     def _crawl(self):
         """
         Find all the nodes in the cluster and add them to self.nodes.
+
+        The services reported by each live node act as its change signal:
+        only addresses advertised by nodes whose services changed, or whose
+        node is known but not alive, are (re-)registered.
         """
         if not self._shouldCrawl():
             return
         self._enable_crawler = False
 
         try:
-            if self._seed_nodes:
-                seed_nodes = self._seed_nodes
+            self._refreshNodeLiveliness()
+            live_nodes = [node for node in self.nodes.itervalues()
+                          if node.alive]
+
+            if live_nodes:
+                unvisited = self._probeServices(live_nodes)
+            elif self._seed_nodes:
+                unvisited = set(self._seed_nodes)
             else:
-                seed_nodes = self._original_seed_nodes
+                unvisited = set(self._original_seed_nodes)
 
-            # clear the current lookup and node list
+            # dead nodes still advertised by the cluster get another chance
             all_services = set()
-            visited = set()
-            unvisited = set(seed_nodes)
+            for node in live_nodes:
+                all_services |= self._node_services.get(node.key, set())
+            for node in self.nodes.itervalues():
+                if not node.alive and (node.ip, node.port) in all_services:
+                    unvisited.add((node.ip, node.port))
+
+            visited = set(self._live_nodes)
             while unvisited - visited:
-                l_unvisited = list(unvisited)
+                l_unvisited = list(unvisited - visited)
 
                 nodes = util.concurrent_map(self._registerNode, l_unvisited)
-                live_nodes = [node
-                              for node in nodes
-                              if node is not None and node.alive and node not in visited]
+                new_nodes = [node
+                             for node in nodes
+                             if node is not None
+                             and not isinstance(node, Exception) and node.alive
+                             and (node.ip, node.port) not in visited]
 
                 visited |= unvisited
-                unvisited.clear()
-
-                services_list = util.concurrent_map(self._getServices, live_nodes)
-                for node, services in zip(live_nodes, services_list):
-                    if isinstance(services, Exception):
-                        continue
-                    all_services.update(set(services))
-                    all_services.add((node.ip, node.port))
-                unvisited = all_services - visited
+                visited.update((node.ip, node.port) for node in new_nodes)
+                unvisited = self._probeServices(new_nodes)
+
+            for node in self.nodes.itervalues():
+                if node.alive:
+                    all_services |= self._node_services.get(node.key, set())
             if all_services:
                 self._seed_nodes = all_services
             self._refreshNodeLiveliness()
         except Exception:
             pass
         finally:
+            self._last_crawl = time()
             self._enable_crawler = True
 
     def _refreshNodeLiveliness(self):
@@ -239,7 +262,10 @@ class Cluster(object):
                                 password=self.password)
 
                 if existing and not new_node.alive:
+                    new_node.close()
                     new_node = existing
+                elif existing:
+                    existing.close()
             else:
                 return existing
 
@@ -287,11 +313,49 @@ class Cluster(object):
         if len(use_nodes) == 0:
             raise IOError('Unable to find any Aerospike nodes')
 
-        return dict(
+        if (self.use_event_loop and not self.use_telnet and not kwargs
+                and method_name in ('info', 'infoBatch') and len(args) == 1):
+            return self._callNodeInfoLoop(use_nodes, method_name, args[0])
+
+        return dict(zip(
+            [node.key for node in use_nodes],
             util.concurrent_map(
-                lambda node:
-                (node.key, getattr(node, method_name)(*args, **kwargs)),
-                use_nodes))
+                lambda node: getattr(node, method_name)(*args, **kwargs),
+                use_nodes)))
+
+    def _callNodeInfoLoop(self, use_nodes, method_name, command):
+        """
+        Run info (or infoBatch) for command on use_nodes from one event loop.
+        """
+
+        if method_name == 'infoBatch':
+            names = tuple(util.unique(command))
+            if not names:
+                return dict((node.key, {}) for node in use_nodes)
+        else:
+            names = command
+
+        # only go to the nodes whose response is not cached, static commands
+        # (build, node, ...) are answered from the cache between watch
+        # iterations
+        results = {}
+        requests = []
+        for node in use_nodes:
+            response = node.cachedInfo(names)
+            if response is not None:
+                results[node.key] = node.infoResponse(names, response
+                                                      , store=False)
+            else:
+                requests.append((node.key, node._getInfoPool(node.port), names))
+
+        if requests:
+            responses = infoloop.info_fanout(requests)
+            for node in use_nodes:
+                if node.key not in results:
+                    results[node.key] = node.infoResponse(
+                        names, responses[node.key])
+
+        return results
 
     def isXDREnabled(self, nodes='all'):
         return self._callNodeMethod(nodes, 'isXDREnabled')
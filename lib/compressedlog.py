@@ -0,0 +1,393 @@
+"""
+Read gzip compressed server logs, and zstd compressed ones if the zstandard
+module is installed, as if they were plain files.
+
+CompressedLog is a read only file object over the decompressed log. A seek
+starts decompressing at the closest restart point before the target rather
+than at the start of the file. The restart points are kept in a BlockIndex
+shared by every CompressedLog of the same file:
+
+- the start of every gzip member or zstd frame, each can be decompressed on
+  its own. These are saved with the server log index, next to the log.
+- a copy of the zlib decompressor every CHECKPOINT_BYTES of decompressed
+  data within a gzip member. zlib state can not be saved, these last for the
+  life of the process. Compressed logs are therefore scanned in the asadm
+  process rather than in worker processes.
+
+Only member and frame starts outlive the process. A log compressed by
+logrotate is a single gzip member, its saved index holds the start of the
+file alone and a new process decompresses it from the start again.
+
+The decompressed size and the last TAIL_BYTES of the log are kept as well,
+finding the last line of a log does not decompress all of it again.
+"""
+
+__author__ = 'aerospike'
+
+import bisect
+import os
+import struct
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    # zstd compressed logs are not recognized
+    zstandard = None
+
+GZIP_MAGIC = "\x1f\x8b"
+ZSTD_MAGIC = "\x28\xb5\x2f\xfd"
+# skippable zstd frames have magic numbers 0x184D2A50 to 0x184D2A5F
+ZSTD_SKIPPABLE_MAGIC = "\x2a\x4d\x18"
+GZIP_WBITS = zlib.MAX_WBITS | 16
+
+# compressed bytes read at a time
+READ_BYTES = 256 * 1024
+# decompressed bytes between two decompressor copies
+CHECKPOINT_BYTES = 64 * 1024 * 1024
+# decompressed bytes kept from the end of the log
+TAIL_BYTES = 64 * 1024
+# decompressed bytes kept before the current piece, short seeks back (e.g.
+# to the start of a line) do not restart decompression
+KEEP_BYTES = 64 * 1024
+
+def compression(path):
+    """
+    "gzip" or "zstd" if path is a compressed file which can be read, None
+    otherwise.
+    """
+
+    try:
+        with open(path, "rb") as f:
+            magic = f.read(4)
+    except EnvironmentError:
+        return None
+
+    if magic[0:2] == GZIP_MAGIC:
+        return "gzip"
+    if zstandard is not None and (magic == ZSTD_MAGIC or _is_skippable(magic)):
+        return "zstd"
+    return None
+
+def is_compressed(path):
+    return compression(path) is not None
+
+def open_log(path):
+    """
+    File object over the (decompressed) lines of the log at path.
+    """
+
+    if is_compressed(path):
+        return CompressedLog(path)
+    return open(path, "r")
+
+def _is_skippable(magic):
+    return magic[1:4] == ZSTD_SKIPPABLE_MAGIC and "\x50" <= magic[0:1] <= "\x5f"
+
+def _zstd_frame_end(f, offset):
+    """
+    (end offset, has data) of the zstd frame at offset, found from its block
+    headers without decompressing it. end is None if there is no complete
+    frame at offset.
+    """
+
+    f.seek(offset)
+    magic = f.read(4)
+    if _is_skippable(magic):
+        size = f.read(4)
+        if len(size) < 4:
+            return None, False
+        return offset + 8 + struct.unpack("<I", size)[0], False
+    if magic != ZSTD_MAGIC:
+        return None, False
+
+    descriptor = f.read(1)
+    if not descriptor:
+        return None, False
+    descriptor = ord(descriptor)
+    single_segment = descriptor & 0x20
+    pos = offset + 5 + (0 if single_segment else 1) \
+        + (0, 1, 2, 4)[descriptor & 0x3] \
+        + (1 if single_segment else 0, 2, 4, 8)[descriptor >> 6]
+
+    while True:
+        f.seek(pos)
+        block = f.read(3)
+        if len(block) < 3:
+            return None, False
+        header = struct.unpack("<I", block + "\0")[0]
+        # an RLE block holds one byte
+        pos += 3 + (1 if (header >> 1) & 0x3 == 1 else header >> 3)
+        if header & 0x1:
+            break
+
+    if descriptor & 0x4:
+        # content checksum
+        pos += 4
+    return pos, True
+
+class BlockIndex(object):
+    """
+    Restart points of a compressed file, (decompressed offset, compressed
+    offset, decompressor) sorted by offset. decompressor is None at the
+    start of a member.
+    """
+
+    def __init__(self):
+        self.offsets = [0]
+        self.points = [(0, 0, None)]
+        # decompressed size and its last TAIL_BYTES, once read to the end
+        self.size = None
+        self.tail = ""
+
+    def add(self, offset, compressed_offset, decompressor=None):
+        i = bisect.bisect_left(self.offsets, offset)
+        if i < len(self.offsets) and self.offsets[i] == offset:
+            # a member start is kept over a decompressor copy
+            if decompressor is None and self.points[i][2] is not None:
+                self.points[i] = (offset, compressed_offset, None)
+            return
+        self.offsets.insert(i, offset)
+        self.points.insert(i, (offset, compressed_offset, decompressor))
+
+    def find(self, offset):
+        """
+        Last restart point at or before offset.
+        """
+
+        return self.points[bisect.bisect_right(self.offsets, offset) - 1]
+
+    def saved(self):
+        """
+        What can be saved: member starts, size and tail.
+        """
+
+        return {"members": [[offset, compressed_offset]
+                            for offset, compressed_offset, decompressor in self.points
+                            if decompressor is None]
+                , "size": self.size
+                , "tail": self.tail.decode("latin-1")}
+
+    def load(self, saved):
+        for offset, compressed_offset in saved["members"]:
+            self.add(offset, compressed_offset)
+        if saved["size"] is not None:
+            self.size = saved["size"]
+            self.tail = saved["tail"].encode("latin-1")
+
+# BlockIndex of every compressed file read by this process, keyed by path
+# and stat, shared by its CompressedLogs
+_block_indices = {}
+
+def block_index(path, file_stat):
+    key = (os.path.abspath(path), file_stat.st_ino, file_stat.st_size
+           , file_stat.st_mtime)
+    if key not in _block_indices:
+        _block_indices[key] = BlockIndex()
+    return _block_indices[key]
+
+class CompressedLog(object):
+    """
+    Read only file object over the decompressed content of a gzip or zstd
+    file. read, readline, seek and tell use decompressed offsets.
+    """
+
+    def __init__(self, path):
+        self.name = path
+        self.format = compression(path)
+        self._raw = open(path, "rb")
+        self.blocks = block_index(path, os.fstat(self._raw.fileno()))
+        self.closed = False
+
+        # read position, and decompressed data held from _buf_start
+        self._pos = 0
+        self._buf = ""
+        self._buf_start = 0
+
+        # decompression: output so far ends at offset _out, the next
+        # compressed bytes are at _raw_pos
+        self._decompressor = None
+        self._out = 0
+        self._raw_pos = 0
+        self._member_end = None
+        self._member_done = False
+        self._next_checkpoint = 0
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        line = self.readline()
+        if not line:
+            raise StopIteration
+        return line
+
+    def fileno(self):
+        return self._raw.fileno()
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=0):
+        if whence == 1:
+            offset += self._pos
+        elif whence == 2:
+            offset += self.size()
+        self._pos = max(0, offset)
+
+    def size(self):
+        """
+        Decompressed size, read to the end if not known yet.
+        """
+
+        while self.blocks.size is None:
+            self._load(max(self._out, self._buf_start + len(self._buf)))
+        return self.blocks.size
+
+    def read(self, size=-1):
+        data = []
+        while size < 0 or size > 0:
+            if not self._load(self._pos):
+                break
+            start = self._pos - self._buf_start
+            end = len(self._buf)
+            if size >= 0:
+                end = min(end, start + size)
+                size -= end - start
+            data.append(self._buf[start:end])
+            self._pos = self._buf_start + end
+        return "".join(data)
+
+    def readline(self):
+        data = []
+        while self._load(self._pos):
+            start = self._pos - self._buf_start
+            end = self._buf.find("\n", start) + 1
+            if not end:
+                end = len(self._buf)
+            data.append(self._buf[start:end])
+            self._pos = self._buf_start + end
+            if self._buf[end - 1] == "\n":
+                break
+        return "".join(data)
+
+    def close(self):
+        self._raw.close()
+        self._decompressor = None
+        self._buf = ""
+        self.closed = True
+
+    def _load(self, offset):
+        """
+        Make _buf hold offset, False if offset is at or past the end.
+        """
+
+        if self._buf_start <= offset < self._buf_start + len(self._buf):
+            return True
+
+        blocks = self.blocks
+        if blocks.size is not None:
+            if offset >= blocks.size:
+                return False
+            if offset >= blocks.size - len(blocks.tail):
+                self._buf = blocks.tail
+                self._buf_start = blocks.size - len(blocks.tail)
+                return True
+
+        start, raw_pos, decompressor = blocks.find(offset)
+        if self._decompressor is None or offset < self._out or start > self._out:
+            self._restart(start, raw_pos, decompressor)
+
+        if self._buf_start + len(self._buf) != self._out:
+            self._buf = ""
+            self._buf_start = self._out
+        while True:
+            data = self._next_piece()
+            if data is None:
+                blocks.size = self._out
+                blocks.tail = self._buf[-TAIL_BYTES:]
+                return False
+
+            self._buf = self._buf[-KEEP_BYTES:] + data
+            self._buf_start = self._out - len(self._buf)
+            if offset < self._out:
+                return True
+
+    def _restart(self, offset, raw_pos, decompressor):
+        self._out = offset
+        self._raw_pos = raw_pos
+        self._member_end = None
+        self._member_done = False
+        if decompressor is None:
+            if not self._start_member():
+                self._decompressor = None
+        else:
+            self._decompressor = decompressor.copy()
+            self._next_checkpoint = offset + CHECKPOINT_BYTES
+
+    def _start_member(self):
+        """
+        Start decompressing the member at _raw_pos, False if there is none.
+        """
+
+        if self.format == "gzip":
+            self._raw.seek(self._raw_pos)
+            if self._raw.read(2) != GZIP_MAGIC:
+                # the end, gzip ignores trailing garbage too
+                return False
+            self._decompressor = zlib.decompressobj(GZIP_WBITS)
+        else:
+            while True:
+                end, has_data = _zstd_frame_end(self._raw, self._raw_pos)
+                if end is None:
+                    return False
+                if has_data:
+                    break
+                self._raw_pos = end
+            self._member_end = end
+            self._decompressor = zstandard.ZstdDecompressor().decompressobj()
+
+        self.blocks.add(self._out, self._raw_pos)
+        self._next_checkpoint = self._out + CHECKPOINT_BYTES
+        return True
+
+    def _next_piece(self):
+        """
+        Decompress the next piece of the log, None at the end.
+        """
+
+        while self._decompressor is not None:
+            if self._member_done:
+                self._member_done = False
+                if not self._start_member():
+                    self._decompressor = None
+                    break
+
+            size = READ_BYTES
+            if self._member_end is not None:
+                size = min(size, self._member_end - self._raw_pos)
+            self._raw.seek(self._raw_pos)
+            data = self._raw.read(size) if size > 0 else ""
+            if not data:
+                self._member_done = True
+                continue
+
+            self._raw_pos += len(data)
+            piece = self._decompressor.decompress(data)
+            if self.format == "gzip":
+                if self._decompressor.unused_data:
+                    # the next member starts right after this one
+                    self._raw_pos -= len(self._decompressor.unused_data)
+                    self._member_done = True
+            elif self._raw_pos >= self._member_end:
+                self._member_done = True
+
+            self._out += len(piece)
+            if self.format == "gzip" and not self._member_done \
+                    and self._out >= self._next_checkpoint:
+                self.blocks.add(self._out, self._raw_pos, self._decompressor.copy())
+                self._next_checkpoint = self._out + CHECKPOINT_BYTES
+            if piece:
+                return piece
+
+        return None
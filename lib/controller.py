@@ -22,6 +22,7 @@ from lib.data import lsof_file_type_desc
 from lib.util import clear_val_from_dict, fetch_line_clear_dict, get_arg_and_delete_from_mods, \
     check_arg_and_delete_from_mods, get_value_from_dict
 from lib.view import CliView
+from lib.snapshot import namespace_snapshots, CounterRates
 from lib import filesize
 
 
@@ -88,6 +89,7 @@ class RootController(BaseController):
             , 'collectinfo':CollectinfoController
             , 'features':FeaturesController
             , 'pager':PagerController
+            , 'cache':CacheController
         }
 
     @CommandHelp('Terminate session')
@@ -703,13 +705,14 @@ class ShowHealthController(CommandController):
         self.do_xdr(line)
         pass
 
-    def get_namespaces_health(self, namespace_config = ''):
+    def get_namespaces_health(self, namespace_snapshots):
         namespaces_health = dict()
-        for ns, nodes in namespace_config.items():
+        for ns, snapshot in namespace_snapshots.items():
             broken = {}
             is_first = True
             namespaces_health[ns] = dict()
-            for ip, params in nodes.items():
+            for ip in snapshot.nodes:
+                params = snapshot.raw[ip]
                 if params:
                     health_params = copy.deepcopy(self.NAMESPACE_PARAMS)
                     if is_first:
@@ -735,11 +738,11 @@ class ShowHealthController(CommandController):
                     update_health(self.STOP_WRITES_PCT, stop_writes_pct, self.WARNING)
                     update_health(self.SET_EVICTED_OBJECTS, set_evicted_objects, self.WARNING)
                     update_health(self.TYPE, _type, self.WARNING)
-                    high_water_memory_pct = params.get(self.HIGH_WATER_MEMEORY_PCT)
-                    min_avail_pct = params.get(self.MIN_AVAIL_PCT)
+                    high_water_memory_pct = snapshot.value(ip, self.HIGH_WATER_MEMEORY_PCT)
+                    min_avail_pct = snapshot.value(ip, self.MIN_AVAIL_PCT)
                     if high_water_memory_pct is not None:
                         high_water_memory_pct = int(high_water_memory_pct)
-                        used_memory_pct = 100 - int(params[self.FREE_PCT_MEMORY])
+                        used_memory_pct = 100 - int(snapshot.value(ip, self.FREE_PCT_MEMORY))
                         hwm_warn_range = range(high_water_memory_pct - (high_water_memory_pct * self.HWM_WARN_CHECK_PCT / 100) , high_water_memory_pct)
                         if used_memory_pct >= high_water_memory_pct:
                             health_params[self.HIGH_WATER_MEMEORY_PCT] = self.CRITICAL
@@ -760,22 +763,8 @@ class ShowHealthController(CommandController):
 
     @CommandHelp('Displays namespace health of cluster')
     def do_namespace(self, line):
-        namespaces = self.cluster.infoNamespaces(nodes=self.nodes)
-        namespaces = namespaces.values()
-        namespace_set = set()
-        namespace_stats = dict()
-        for namespace in namespaces:
-            if isinstance(namespace, Exception):
-                continue
-            namespace_set.update(namespace)
-        for namespace in sorted(namespace_set):
-            ns_stats = self.cluster.infoNamespaceStatistics(namespace
-                                                            , nodes=self.nodes)
-            for node, params in ns_stats.items():
-                if isinstance(params, Exception):
-                    ns_stats[node] = {}
-            namespace_stats[namespace] = ns_stats
-        ns_health = self.get_namespaces_health(namespace_stats)
+        ns_stats = self.cluster.infoAllNamespaceStatistics(nodes=self.nodes)
+        ns_health = self.get_namespaces_health(namespace_snapshots(ns_stats))
         for ns, configs in ns_health.iteritems():
             self.view.showHealth("%s Namespace Health"%(ns)
                                  , configs, self.cluster, **self.mods)
@@ -871,15 +860,107 @@ class ShowHealthController(CommandController):
 
 @CommandHelp('Displays statistics for Aerospike components.')
 class ShowStatisticsController(CommandController):
+    # previous snapshot of every statistics table, for -d
+    counter_rates = CounterRates()
+
     def __init__(self):
         self.modifiers = set(['with', 'like', 'for'])
 
+    def _showRates(self, line):
+        return check_arg_and_delete_from_mods(line=line, arg="-d", default=False, modifiers=self.modifiers, mods=self.mods)
+
+    def _serviceStatistics(self):
+        """
+        Service statistics of self.nodes, fetched once per command and shared
+        by the service table and the uptimes of the other tables.
+        """
+
+        if getattr(self, "_service_stats", None) is None:
+            self._service_stats = util.Future(self.cluster.infoStatistics
+                                              , nodes=self.nodes).start()
+        return self._service_stats.result()
+
+    def _uptimes(self, show_rates):
+        """
+        With -d, {node: service uptime} to detect restarts in tables without
+        an uptime of their own.
+        """
+
+        if not show_rates:
+            return None
+
+        uptimes = {}
+        for node, node_stats in self._serviceStatistics().iteritems():
+            if isinstance(node_stats, Exception) or not node_stats:
+                continue
+            if "uptime" in node_stats:
+                uptimes[node] = node_stats["uptime"]
+        return uptimes
+
+    def _counterRates(self, title, stats, show_rates, uptimes=None):
+        """
+        With -d replace counters in stats by their rate since the previous
+        run of the same table. Returns (title, stats, total_row), total_row
+        sums the rates of the counters and is None when no rates are shown.
+        uptimes is {node: service uptime} (see _uptimes), by default the
+        uptime in stats is used.
+        """
+
+        if not show_rates:
+            return title, stats, None
+
+        rates = self.counter_rates.update(title, stats, uptimes=uptimes)
+        if rates is None:
+            return "%s (baseline, run again for rates)"%(title), stats, None
+
+        rate_stats = {}
+        counters = set()
+        rate_totals = {}
+        for node, node_stats in stats.iteritems():
+            if isinstance(node_stats, Exception) or node not in rates:
+                rate_stats[node] = node_stats
+                continue
+            node_stats = dict(node_stats)
+            for metric, rate in rates[node].iteritems():
+                counters.add(metric)
+                if rate is None:
+                    node_stats[metric] = "reset"
+                else:
+                    node_stats[metric] = "%.1f/s (+%d)"%(rate)
+                    per_second, delta = rate_totals.get(metric, (0.0, 0))
+                    rate_totals[metric] = (per_second + rate[0], delta + rate[1])
+            rate_stats[node] = node_stats
+
+        total_row = dict((metric, total)
+                         for metric, total
+                         in self.counter_rates.latest(title).totals().iteritems()
+                         if metric not in counters)
+        for metric, rate in rate_totals.iteritems():
+            total_row[metric] = "%.1f/s (+%d)"%(rate)
+
+        return "%s (per second since last run)"%(title), rate_stats, total_row
+
+    def _showStats(self, title, stats, show_rates, uptimes=None, **kwargs):
+        """
+        Future showing the stats table, with counter rates if show_rates.
+        """
+
+        title, stats, total_row = self._counterRates(title, stats, show_rates, uptimes)
+        kwargs.update(self.mods)
+        return util.Future(self.view.showStats, title, stats, self.cluster
+                           , total_row=total_row, **kwargs)
+
     @CommandHelp('Displays bin, set, service, and namespace statistics'
                  , '  Options:'
                  , '    -t           - Set to show total column at the end. It contains node wise sum for statistics.'
+                 , '    -d           - Set to show per second rates and deltas of counters since the previous'
+                 , '                   run of the same command instead of their totals.'
                  , '    -r <int>     - Repeating output table title and row header after every r columns.'
                  , '                   default: 0, no repetition.')
     def _do_default(self, line):
+        # fetched once for the service table and the uptimes of the others
+        self._service_stats = util.Future(self.cluster.infoStatistics
+                                          , nodes=self.nodes).start()
         actions = (util.Future(self.do_bins, line).start()
                    , util.Future(self.do_sets, line).start()
                    , util.Future(self.do_service, line).start()
@@ -891,22 +972,28 @@ class ShowStatisticsController(CommandController):
     @CommandHelp('Displays service statistics'
                  , '  Options:'
                  , '    -t           - Set to show total column at the end. It contains node wise sum for statistics.'
+                 , '    -d           - Set to show per second rates and deltas of counters since the previous'
+                 , '                   run of the same command instead of their totals.'
                  , '    -r <int>     - Repeating output table title and row header after every r columns.'
                  , '                   default: 0, no repetition.')
     def do_service(self, line):
-        service_stats = self.cluster.infoStatistics(nodes=self.nodes)
+        service_stats = self._serviceStatistics()
         show_total = check_arg_and_delete_from_mods(line=line, arg="-t", default=False, modifiers=self.modifiers, mods=self.mods)
+        show_rates = self._showRates(line)
         title_every_nth = get_arg_and_delete_from_mods(line=line, arg="-r", return_type=int, default=0, modifiers=self.modifiers, mods=self.mods)
-        return util.Future(self.view.showStats, "Service Statistics", service_stats, self.cluster, show_total=show_total
-                            , title_every_nth=title_every_nth, **self.mods)
+        return self._showStats("Service Statistics", service_stats, show_rates
+                               , show_total=show_total, title_every_nth=title_every_nth)
 
     @CommandHelp('Displays namespace statistics'
                  , '  Options:'
                  , '    -t           - Set to show total column at the end. It contains node wise sum for statistics.'
+                 , '    -d           - Set to show per second rates and deltas of counters since the previous'
+                 , '                   run of the same command instead of their totals.'
                  , '    -r <int>     - Repeating output table title and row header after every r columns.'
                  , '                   default: 0, no repetition.')
     def do_namespace(self, line):
         show_total = check_arg_and_delete_from_mods(line=line, arg="-t", default=False, modifiers=self.modifiers, mods=self.mods)
+        show_rates = self._showRates(line)
         title_every_nth = get_arg_and_delete_from_mods(line=line, arg="-r", return_type=int, default=0, modifiers=self.modifiers, mods=self.mods)
         namespaces = self.cluster.infoNamespaces(nodes=self.nodes)
 
@@ -918,6 +1005,7 @@ class ShowStatisticsController(CommandController):
             namespace_set.update(namespace)
 
         namespace_set = set(util.filter_list(list(namespace_set), self.mods['for']))
+        uptimes = self._uptimes(show_rates)
 
         ns_stats = {}
         for namespace in namespace_set:
@@ -925,40 +1013,42 @@ class ShowStatisticsController(CommandController):
                                               , namespace
                                               , nodes=self.nodes).start()
 
-        return [util.Future(self.view.showStats
-                            , "%s Namespace Statistics"%(namespace)
-                            , ns_stats[namespace].result()
-                            , self.cluster
-                            , show_total=show_total, title_every_nth=title_every_nth
-                            , **self.mods)
+        return [self._showStats("%s Namespace Statistics"%(namespace)
+                                , ns_stats[namespace].result(), show_rates, uptimes
+                                , show_total=show_total, title_every_nth=title_every_nth)
                 for namespace in sorted(namespace_set)]
 
     @CommandHelp('Displays sindex statistics'
                  , '  Options:'
                  , '    -t           - Set to show total column at the end. It contains node wise sum for statistics.'
+                 , '    -d           - Set to show per second rates and deltas of counters since the previous'
+                 , '                   run of the same command instead of their totals.'
                  , '    -r <int>     - Repeating output table title and row header after every r columns.'
                  , '                   default: 0, no repetition.')
     def do_sindex(self, line):
         show_total = check_arg_and_delete_from_mods(line=line, arg="-t", default=False, modifiers=self.modifiers, mods=self.mods)
+        show_rates = self._showRates(line)
         title_every_nth = get_arg_and_delete_from_mods(line=line, arg="-r", return_type=int, default=0, modifiers=self.modifiers, mods=self.mods)
         sindex_stats = get_sindex_stats(self.cluster, self.nodes, self.mods['for'])
-        return [util.Future(self.view.showStats
-                            , "%s Sindex Statistics"%(ns_set_sindex)
-                            , sindex_stats[ns_set_sindex]
-                            , self.cluster
-                            , show_total=show_total, title_every_nth=title_every_nth
-                            , **self.mods)
+        uptimes = self._uptimes(show_rates)
+        return [self._showStats("%s Sindex Statistics"%(ns_set_sindex)
+                                , sindex_stats[ns_set_sindex], show_rates, uptimes
+                                , show_total=show_total, title_every_nth=title_every_nth)
                 for ns_set_sindex in sorted(sindex_stats.keys())]
 
     @CommandHelp('Displays set statistics'
                  , '  Options:'
                  , '    -t           - Set to show total column at the end. It contains node wise sum for statistics.'
+                 , '    -d           - Set to show per second rates and deltas of counters since the previous'
+                 , '                   run of the same command instead of their totals.'
                  , '    -r <int>     - Repeating output table title and row header after every r columns.'
                  , '                   default: 0, no repetition.')
     def do_sets(self, line):
         show_total = check_arg_and_delete_from_mods(line=line, arg="-t", default=False, modifiers=self.modifiers, mods=self.mods)
+        show_rates = self._showRates(line)
         title_every_nth = get_arg_and_delete_from_mods(line=line, arg="-r", return_type=int, default=0, modifiers=self.modifiers, mods=self.mods)
         sets = self.cluster.infoSetStatistics(nodes=self.nodes)
+        uptimes = self._uptimes(show_rates)
 
         set_stats = {}
         for host_id, key_values in sets.iteritems():
@@ -978,22 +1068,24 @@ class ShowStatisticsController(CommandController):
                 hv = host_vals[host_id]
                 hv.update(values)
 
-        return [util.Future(self.view.showStats, "%s %s Set Statistics"%(namespace, set_name)
-                            , stats
-                            , self.cluster
-                            , show_total=show_total, title_every_nth=title_every_nth
-                            , **self.mods)
+        return [self._showStats("%s %s Set Statistics"%(namespace, set_name)
+                                , stats, show_rates, uptimes
+                                , show_total=show_total, title_every_nth=title_every_nth)
                 for (namespace, set_name), stats in set_stats.iteritems()]
 
     @CommandHelp('Displays bin statistics'
                  , '  Options:'
                  , '    -t           - Set to show total column at the end. It contains node wise sum for statistics.'
+                 , '    -d           - Set to show per second rates and deltas of counters since the previous'
+                 , '                   run of the same command instead of their totals.'
                  , '    -r <int>     - Repeating output table title and row header after every r columns.'
                  , '                   default: 0, no repetition.')
     def do_bins(self, line):
         show_total = check_arg_and_delete_from_mods(line=line, arg="-t", default=False, modifiers=self.modifiers, mods=self.mods)
+        show_rates = self._showRates(line)
         title_every_nth = get_arg_and_delete_from_mods(line=line, arg="-r", return_type=int, default=0, modifiers=self.modifiers, mods=self.mods)
         bin_stats = self.cluster.infoBinStatistics(nodes=self.nodes)
+        uptimes = self._uptimes(show_rates)
         new_bin_stats = {}
 
         for node_id, bin_stat in bin_stats.iteritems():
@@ -1014,38 +1106,41 @@ class ShowStatisticsController(CommandController):
                 node_stats.update(stats)
 
         views = []
-        return [util.Future(self.view.showStats, "%s Bin Statistics"%(namespace)
-                            , bin_stats
-                            , self.cluster
-                            , show_total=show_total, title_every_nth=title_every_nth
-                            , **self.mods)
+        return [self._showStats("%s Bin Statistics"%(namespace)
+                                , bin_stats, show_rates, uptimes
+                                , show_total=show_total, title_every_nth=title_every_nth)
                 for namespace, bin_stats in new_bin_stats.iteritems()]
 
     @CommandHelp('Displays XDR statistics'
                  , '  Options:'
                  , '    -t           - Set to show total column at the end. It contains node wise sum for statistics.'
+                 , '    -d           - Set to show per second rates and deltas of counters since the previous'
+                 , '                   run of the same command instead of their totals.'
                  , '    -r <int>     - Repeating output table title and row header after every r columns.'
                  , '                   default: 0, no repetition.')
     def do_xdr(self, line):
         show_total = check_arg_and_delete_from_mods(line=line, arg="-t", default=False, modifiers=self.modifiers, mods=self.mods)
+        show_rates = self._showRates(line)
         title_every_nth = get_arg_and_delete_from_mods(line=line, arg="-r", return_type=int, default=0, modifiers=self.modifiers, mods=self.mods)
         xdr_stats = self.cluster.infoXDRStatistics(nodes=self.nodes)
 
-        return util.Future(self.view.showStats, "XDR Statistics"
-                            , xdr_stats
-                            , self.cluster
-                            , show_total=show_total, title_every_nth=title_every_nth
-                            , **self.mods)
+        return self._showStats("XDR Statistics", xdr_stats, show_rates
+                               , self._uptimes(show_rates)
+                               , show_total=show_total, title_every_nth=title_every_nth)
 
     @CommandHelp('Displays datacenter statistics'
                  , '  Options:'
                  , '    -t           - Set to show total column at the end. It contains node wise sum for statistics.'
+                 , '    -d           - Set to show per second rates and deltas of counters since the previous'
+                 , '                   run of the same command instead of their totals.'
                  , '    -r <int>     - Repeating output table title and row header after every r columns.'
                  , '                   default: 0, no repetition.')
     def do_dc(self, line):
         show_total = check_arg_and_delete_from_mods(line=line, arg="-t", default=False, modifiers=self.modifiers, mods=self.mods)
+        show_rates = self._showRates(line)
         title_every_nth = get_arg_and_delete_from_mods(line=line, arg="-r", return_type=int, default=0, modifiers=self.modifiers, mods=self.mods)
         all_dc_stats = self.cluster.infoAllDCStatistics(nodes=self.nodes)
+        uptimes = self._uptimes(show_rates)
         dc_stats = {}
         for host, stats in all_dc_stats.iteritems():
             if not stats or isinstance(stats,Exception):
@@ -1058,8 +1153,8 @@ class ShowStatisticsController(CommandController):
                     dc_stats[dc][host].update(stat)
                 except KeyError:
                     dc_stats[dc][host] = stat
-        return [util.Future(self.view.showConfig, "%s DC Statistics"%(dc)
-                            , stats, self.cluster, show_total=show_total, title_every_nth=title_every_nth, **self.mods)
+        return [self._showStats("%s DC Statistics"%(dc), stats, show_rates, uptimes
+                                , show_total=show_total, title_every_nth=title_every_nth)
                 for dc, stats in dc_stats.iteritems()]
 
 class ClusterController(CommandController):
@@ -1247,6 +1342,8 @@ class ClusterController(CommandController):
 
 @CommandHelp('"collectinfo" is used to collect system stats on the local node.')
 class CollectinfoController(CommandController):
+    # cmd -> {node: response} for raw info commands fetched in one batch
+    cluster_batch = {}
 
     def collect_local_file(self,src,dest_dir):
         print "[INFO] Copying file %s to %s"%(src,dest_dir)
@@ -1292,7 +1389,10 @@ class CollectinfoController(CommandController):
                     self.cmds_error.add(parm[0])
 
         elif func == 'cluster':
-            o = self.cluster.info(parm)
+            if parm in self.cluster_batch:
+                o = self.cluster_batch[parm]
+            else:
+                o = self.cluster.info(parm)
         else:
             o = capture_stdout(func,parm)
         self.write_log(sep+str(o))
@@ -1634,6 +1734,15 @@ class CollectinfoController(CommandController):
             sys.stdout = sys.__stdout__
 
         try:
+            # fetch all raw info commands from each node in one round trip
+            self.cluster_batch = {}
+            responses = self.cluster.infoBatch(dignostic_aerospike_cluster_params)
+            for cmd in dignostic_aerospike_cluster_params:
+                self.cluster_batch[cmd] = dict(
+                    (node, response if isinstance(response, Exception)
+                     else response[cmd])
+                    for node, response in responses.iteritems())
+
             for cmd in dignostic_aerospike_cluster_params:
                 self.collectinfo_content('cluster', cmd)
         except Exception as e:
@@ -1934,3 +2043,19 @@ class PagerController(CommandController):
     @CommandHelp("Displays current selected pager option.")
     def do_show(self, line):
         CliView.print_pager()
+
+@CommandHelp("Displays and manages the cache of info responses")
+class CacheController(CommandController):
+    def __init__(self):
+        self.modifiers = set()
+
+    def _do_default(self, line):
+        return self.do_show(line)
+
+    @CommandHelp("Displays hit, miss and eviction counters of each info cache.")
+    def do_show(self, line):
+        return util.Future(self.view.showCacheStats, util.cached.stats())
+
+    @CommandHelp("Discards all cached info responses.")
+    def do_clear(self, line):
+        util.cached.clearAll()
@@ -0,0 +1,260 @@
+# Copyright 2013-2016 Aerospike, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Single threaded, non-blocking info client.
+
+info_fanout drives one info request per node from a single poll/select loop
+instead of one blocking thread per node. Connections are borrowed from, and
+returned to, each node's InfoConnectionPool; missing connections are opened
+and authenticated inside the loop.
+"""
+
+import errno
+import os
+import select
+import socket
+import struct
+from time import time
+
+from lib import citrusleaf
+from lib.infopool import InfoConnection
+
+# seconds each node has to connect, authenticate and answer
+DEFAULT_DEADLINE = 2.0
+
+# request states
+CONNECTING = 0
+AUTH_SEND = 1
+AUTH_RECV = 2
+SEND = 3
+RECV_HEADER = 4
+RECV_BODY = 5
+DONE = 6
+
+AUTH_RESPONSE_SIZE = 24
+INFO_HEADER_SIZE = 8
+
+class InfoRequest(object):
+    """
+    State machine for one info request against one node.
+    """
+
+    def __init__(self, pool, names, deadline):
+        self.pool = pool
+        self.names = names
+        self.deadline = deadline
+        self.result = None
+        self.state = None
+        self.sock = None
+        self._request_buf = citrusleaf.citrusleaf_info_buffer(names)
+
+        conn = pool.acquireIdle()
+        if conn is not None:
+            self._reused = True
+            self.sock = conn.sock
+            self.sock.setblocking(0)
+            self._startSend()
+        else:
+            self._connect()
+
+    def _connect(self):
+        self._reused = False
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setblocking(0)
+        rc = self.sock.connect_ex((self.pool.host, int(self.pool.port)))
+        if rc not in (0, errno.EINPROGRESS, errno.EWOULDBLOCK):
+            self.sock.close()
+            raise socket.error(rc, os.strerror(rc))
+        self.state = CONNECTING
+
+    def _startSend(self):
+        self._out = self._request_buf
+        self.state = SEND
+
+    def _expect(self, size, state):
+        self._in = ""
+        self._in_size = size
+        self.state = state
+
+    def done(self):
+        return self.state == DONE
+
+    def wantWrite(self):
+        return self.state in (CONNECTING, AUTH_SEND, SEND)
+
+    def onWritable(self):
+        try:
+            if self.state == CONNECTING:
+                err = self.sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                if err:
+                    raise socket.error(err, os.strerror(err))
+
+                if self.pool.user is not None:
+                    self._out = citrusleaf.authenticate_buffer(
+                        self.pool.user, self.pool.password).raw
+                    self.state = AUTH_SEND
+                else:
+                    self._startSend()
+                return
+
+            sent = self.sock.send(self._out)
+            self._out = self._out[sent:]
+            if self._out:
+                return
+
+            if self.state == AUTH_SEND:
+                self._expect(AUTH_RESPONSE_SIZE, AUTH_RECV)
+            else:
+                self._expect(INFO_HEADER_SIZE, RECV_HEADER)
+        except Exception as e:
+            self._fail(e)
+
+    def onReadable(self):
+        try:
+            chunk = self.sock.recv(self._in_size - len(self._in))
+            if not chunk:
+                raise socket.error("connection closed by peer")
+            self._in += chunk
+            if len(self._in) < self._in_size:
+                return
+
+            if self.state == AUTH_RECV:
+                rc = citrusleaf.adminParseHeader(self._in)[2]
+                if rc != 0:
+                    raise IOError("Authentication failed for %s: %s"%(
+                        self.pool.user, rc))
+                self._startSend()
+
+            elif self.state == RECV_HEADER:
+                q = struct.unpack_from("! Q", self._in, 0)
+                sz = q[0] & 0xFFFFFFFFFFFF
+                if sz == 0:
+                    self._finish(None)
+                else:
+                    self._expect(sz, RECV_BODY)
+
+            else:
+                self._finish(self._in)
+        except Exception as e:
+            self._fail(e)
+
+    def _finish(self, rsp_data):
+        self.sock.settimeout(self.pool.timeout)
+        self.pool.release(InfoConnection(self.pool.host, self.pool.port
+                                         , sock=self.sock))
+        self.result = citrusleaf.citrusleaf_info_parse(self.names, rsp_data)
+        self.state = DONE
+
+    def _fail(self, exc):
+        try:
+            self.sock.close()
+        except Exception:
+            pass
+
+        if self._reused and isinstance(exc, socket.error):
+            # stale pooled connection, reconnect once
+            try:
+                self._connect()
+                return
+            except Exception as e:
+                exc = e
+
+        self.result = exc
+        self.state = DONE
+
+    def timeout(self):
+        self._reused = False
+        self._fail(socket.timeout("Info request to %s:%s timed out"%(
+            self.pool.host, self.pool.port)))
+
+def _wait(requests, timeout):
+    """
+    Wait for socket events on requests. Returns a list of
+    (request, writable, readable).
+    """
+
+    if hasattr(select, "poll"):
+        poller = select.poll()
+        by_fd = {}
+        for request in requests:
+            fd = request.sock.fileno()
+            by_fd[fd] = request
+            if request.wantWrite():
+                poller.register(fd, select.POLLOUT)
+            else:
+                poller.register(fd, select.POLLIN)
+
+        events = poller.poll(timeout * 1000)
+        ready = []
+        for fd, event in events:
+            request = by_fd[fd]
+            # errors and hangups are reported through send/recv
+            if request.wantWrite():
+                ready.append((request, True, False))
+            else:
+                ready.append((request, False, True))
+        return ready
+
+    writers = [r.sock for r in requests if r.wantWrite()]
+    readers = [r.sock for r in requests if not r.wantWrite()]
+    readable, writable, _ = select.select(readers, writers, [], timeout)
+    readable = set(readable)
+    writable = set(writable)
+    return [(r, r.sock in writable, r.sock in readable) for r in requests
+            if r.sock in writable or r.sock in readable]
+
+def info_fanout(requests, timeout=DEFAULT_DEADLINE):
+    """
+    Run info requests against many nodes concurrently from one thread.
+
+    Arguments:
+    requests -- list of (key, InfoConnectionPool, names)
+    timeout -- seconds each node has to answer
+
+    Returns:
+    dict -- key -> result in the form citrusleaf.citrusleaf_info returns it,
+            or an Exception if the node failed or missed its deadline
+    """
+
+    results = {}
+    pending = {}
+    deadline = time() + timeout
+    for key, pool, names in requests:
+        try:
+            pending[key] = InfoRequest(pool, names, deadline)
+        except Exception as e:
+            results[key] = e
+
+    while pending:
+        now = time()
+        for key, request in pending.items():
+            if request.deadline <= now:
+                request.timeout()
+            if request.done():
+                results[key] = request.result
+                del pending[key]
+
+        if not pending:
+            break
+
+        wait = min(request.deadline for request in pending.itervalues()) - now
+        for request, writable, readable in _wait(pending.values()
+                                                 , max(wait, 0)):
+            if writable:
+                request.onWritable()
+            elif readable:
+                request.onReadable()
+
+    return results
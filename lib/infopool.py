@@ -0,0 +1,190 @@
+# Copyright 2013-2016 Aerospike, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import select
+import socket
+import threading
+from time import time
+
+from lib import citrusleaf
+
+# same socket timeout citrusleaf_info_request has always used
+DEFAULT_TIMEOUT = 0.5
+# maximum number of idle connections kept per (host, port)
+DEFAULT_MAX_IDLE = 4
+# idle connections older than this (in seconds) are closed instead of reused
+DEFAULT_IDLE_TIMEOUT = 55.0
+
+class InfoConnection(object):
+    """
+    A single connected, and if required authenticated, info socket.
+    """
+
+    def __init__(self, host, port, user=None, password=None
+                 , timeout=DEFAULT_TIMEOUT, sock=None):
+        """
+        Connect and authenticate, or wrap sock if it is already connected and
+        authenticated.
+        """
+
+        if sock is not None:
+            self.sock = sock
+            self.last_used = time()
+            return
+
+        self.sock = socket.create_connection((host, int(port)), timeout)
+
+        if user is not None:
+            rc = citrusleaf.authenticate(self.sock, user, password)
+            if rc != 0:
+                self.close()
+                raise IOError("Authentication failed for %s: %s"%(user, rc))
+
+        self.last_used = time()
+
+    def request(self, buf):
+        rsp_data = citrusleaf.citrusleaf_info_send(self.sock, buf)
+        self.last_used = time()
+        return rsp_data
+
+    def isHealthy(self):
+        """
+        An idle info socket should have nothing to read. If it is readable
+        the server has closed it (or left unread data on it), either way it
+        cannot be reused.
+        """
+
+        try:
+            readable, _, _ = select.select([self.sock], [], [], 0)
+        except Exception:
+            return False
+
+        return not readable
+
+    def close(self):
+        try:
+            self.sock.close()
+        except Exception:
+            pass
+
+class InfoConnectionPool(object):
+    """
+    Keep-alive info connections to one node.
+
+    Connections are authenticated once when created, health checked before
+    being reused, evicted after idle_timeout seconds and replaced once if a
+    request fails on them.
+    """
+
+    def __init__(self, host, port, user=None, password=None
+                 , timeout=DEFAULT_TIMEOUT, max_idle=DEFAULT_MAX_IDLE
+                 , idle_timeout=DEFAULT_IDLE_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.idle_timeout = idle_timeout
+
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        return InfoConnection(self.host, self.port, user=self.user
+                              , password=self.password, timeout=self.timeout)
+
+    def _isExpired(self, conn, now):
+        return now - conn.last_used > self.idle_timeout
+
+    def _evictIdle(self, now):
+        # called with self._lock held
+        live = []
+        for conn in self._idle:
+            if self._isExpired(conn, now):
+                conn.close()
+            else:
+                live.append(conn)
+        self._idle = live
+
+    def acquireIdle(self):
+        """
+        Return a healthy idle connection, or None if there is none.
+        """
+
+        while True:
+            with self._lock:
+                if not self._idle:
+                    return None
+                # most recently used first, older ones expire at the bottom
+                conn = self._idle.pop()
+
+            if not self._isExpired(conn, time()) and conn.isHealthy():
+                return conn
+            conn.close()
+
+    def _acquire(self):
+        conn = self.acquireIdle()
+        if conn is not None:
+            return conn, True
+
+        return self._connect(), False
+
+    def release(self, conn):
+        """
+        Return a connection, with no request in flight, to the pool.
+        """
+
+        with self._lock:
+            self._evictIdle(time())
+            if len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def info(self, names):
+        """
+        Same as citrusleaf.citrusleaf_info but over a pooled connection.
+
+        Raises IOError (or socket.error) if the node cannot be reached, returns
+        -1 for responses citrusleaf_info would reject.
+        """
+
+        buf = citrusleaf.citrusleaf_info_buffer(names)
+        conn, reused = self._acquire()
+        try:
+            rsp_data = conn.request(buf)
+        except Exception:
+            conn.close()
+            if not reused:
+                raise
+            # server may have dropped the connection since the health check,
+            # reconnect and try once more.
+            conn = self._connect()
+            try:
+                rsp_data = conn.request(buf)
+            except Exception:
+                conn.close()
+                raise
+
+        self.release(conn)
+        return citrusleaf.citrusleaf_info_parse(names, rsp_data)
+
+    def close(self):
+        with self._lock:
+            idle = self._idle
+            self._idle = []
+
+        for conn in idle:
+            conn.close()
@@ -389,6 +389,7 @@ class LogLatencyController(CommandController):
         'Displays latency information for Aerospike server log.',
         '  Options:',
         '    -h <string>  - Histogram Name, MANDATORY - NO DEFAULT',
+        '                   Comma separated names, e.g. -h reads,writes_master, are computed in one pass over the log.',
         '    -f <string>  - Log time from which to analyze e.g. head or "Sep 22 2011 22:40:14" or -3600 or -1:00:00,',
         '                   default: head',
         '    -d <string>  - Maximum duration for which to analyze, e.g. 3600 or 1:00:00',
@@ -402,7 +403,10 @@ class LogLatencyController(CommandController):
         '    -r <int>     - Repeating output table title and row header after every r node columns.',
         '                   default: 0, no repetition.',
         '    -ns <string> - Namespace name. It will display histogram latency for ns namespace.',
-        '                   This feature is available for namespace level histograms in server >= 3.9.')
+        '                   Comma separated names display every histogram for every namespace.',
+        '                   This feature is available for namespace level histograms in server >= 3.9.',
+        '    -F           - Follow the logs as they grow, like tail -f. Rotated logs are reopened. Stop with Ctrl-C.',
+        '                   Default start (-f) is the end of the logs and default page size (-p) is 1.')
     def _do_default(self, line):
         self.grepFile.do_latency(line)
 
@@ -710,6 +714,9 @@ class LogGrepServerController(CommandController):
         '    -i           - Perform case insensitive matching of search strings (-s) and non-matching strings (-v).',
         '                   By default it is case sensitive.',
         '    -u           - Set to find unique lines.',
+        '    -ue          - Set to find unique lines, comparing md5 digests of the lines: exact, but memory is not capped.',
+        '                   -u compares 64 bit hashes and caps their memory at 64MB (about 1M distinct lines), past the cap',
+        '                   a few new lines are taken for duplicates: about 1% after 56M distinct lines, 2.3% after 67M.',
         '    -f <string>  - Log time from which to analyze.',
         '                   May use the following formats:  \'Sep 22 2011 22:40:14\', -3600, or \'-1:00:00\'.',
         '                   Default: head',
@@ -717,7 +724,9 @@ class LogGrepServerController(CommandController):
         '                   May use the following formats: 3600 or 1:00:00.',
         '    -n <string>  - Comma separated node numbers. You can get these numbers by list command. Ex. : -n \'1,2,5\'.',
         '                   If not set then runs on all server logs in selected list.',
-        '    -p <int>     - Showing output in pages with p entries per page. default: 10.')
+        '    -p <int>     - Showing output in pages with p entries per page. default: 10.',
+        '    -F           - Follow the logs as they grow, like tail -f. Rotated logs are reopened. Stop with Ctrl-C.',
+        '                   Default start (-f) is the end of the logs and default page size (-p) is 1.')
     def do_show(self, line):
         self.grepFile.do_show(line)
 
@@ -732,6 +741,9 @@ class LogGrepServerController(CommandController):
         '    -i           - Perform case insensitive matching of search strings (-s) and non-matching strings (-v).',
         '                   By default it is case sensitive.',
         '    -u           - Set to find unique lines.',
+        '    -ue          - Set to find unique lines, comparing md5 digests of the lines: exact, but memory is not capped.',
+        '                   -u compares 64 bit hashes and caps their memory at 64MB (about 1M distinct lines), past the cap',
+        '                   a few new lines are taken for duplicates: about 1% after 56M distinct lines, 2.3% after 67M.',
         '    -f <string>  - Log time from which to analyze.',
         '                   May use the following formats:  \'Sep 22 2011 22:40:14\', -3600, or \'-1:00:00\'.',
         '                   default: head',
@@ -743,7 +755,9 @@ class LogGrepServerController(CommandController):
         '                   If not set then runs on all server logs in selected list.',
         '    -p <int>     - Showing output in pages with p entries per page. default: 10.',
         '    -r <int>     - Repeating output table title and row header after every r columns.',
-        '                   default: 0, no repetition.')
+        '                   default: 0, no repetition.',
+        '    -F           - Follow the logs as they grow, like tail -f. Rotated logs are reopened. Stop with Ctrl-C.',
+        '                   Default start (-f) is the end of the logs and default page size (-p) is 1.')
     def do_count(self, line):
         self.grepFile.do_count(line)
 
@@ -774,7 +788,9 @@ class LogGrepServerController(CommandController):
         '                   If not set then runs on all server logs in selected list.',
         '    -p <int>     - Showing output in pages with p entries per page. default: 10.',
         '    -r <int>     - Repeating output table title and row header after every r node columns.',
-        '                   default: 0, no repetition.')
+        '                   default: 0, no repetition.',
+        '    -F           - Follow the logs as they grow, like tail -f. Rotated logs are reopened. Stop with Ctrl-C.',
+        '                   Default start (-f) is the end of the logs and default page size (-p) is 1.')
     def do_diff(self, line):
         self.grepFile.do_diff(line)
 
@@ -784,6 +800,15 @@ class GrepFile(CommandController):
         self.grep_cluster = grep_cluster
         self.modifiers = modifiers
 
+    def follow_defaults(self, line, start_tm, output_page_size):
+        # following starts at the end of the logs and shows every new
+        # result as it comes, unless -f or -p say otherwise
+        if start_tm == "head":
+            start_tm = "-0"
+        if '-p' not in line:
+            output_page_size = 1
+        return start_tm, output_page_size
+
     def do_show(self, line):
         if not line:
             raise ShellException("Could not understand loggrep request, " +
@@ -803,7 +828,9 @@ class GrepFile(CommandController):
         is_casesensitive = True
         reading_strings = None
         uniq = False
+        uniq_exact = False
         system_grep = False
+        follow = False
         while tline:
             string_read = False
             word = tline.pop(0)
@@ -819,15 +846,19 @@ class GrepFile(CommandController):
                 is_casesensitive = False
             elif word == '-u' and not self.grep_cluster:
                 uniq = True
+            elif word == '-ue' and not self.grep_cluster:
+                uniq_exact = True
             elif word == '-sg' and not self.grep_cluster:
                 system_grep = True
+            elif word == '-F' and not self.grep_cluster:
+                follow = True
             elif word == '-f' and not self.grep_cluster:
                 start_tm = tline.pop(0)
                 start_tm = strip_string(start_tm)
             elif word == '-d' and not self.grep_cluster:
                 duration = tline.pop(0)
                 duration = strip_string(duration)
-            elif word == '-p' and not self.grep_cluster:
+            elif word == '-p':
                 try:
                     output_page_size = int(strip_string(tline.pop(0)))
                 except Exception:
@@ -851,6 +882,9 @@ class GrepFile(CommandController):
             if not string_read:
                 reading_strings = None
 
+        if follow:
+            start_tm, output_page_size = self.follow_defaults(line, start_tm, output_page_size)
+
         if search_strs:
             file_handlers = self.logger.get_files_by_index(
                 self.grep_cluster,
@@ -858,8 +892,8 @@ class GrepFile(CommandController):
             for display_name in sorted(file_handlers.keys()):
                 show_results = self.logger.grep(file_handlers[display_name],
                     search_strs=search_strs, ignore_strs=ignore_strs, is_and=is_and, is_casesensitive=is_casesensitive,
-                    start_tm_arg=start_tm, duration_arg=duration, uniq=uniq, system_grep=system_grep,
-                    grep_cluster_logs=self.grep_cluster, output_page_size=output_page_size
+                    start_tm_arg=start_tm, duration_arg=duration, uniq=uniq, uniq_exact=uniq_exact, system_grep=system_grep,
+                    grep_cluster_logs=self.grep_cluster, output_page_size=output_page_size, follow=follow
                     )
                 page_index = 1
                 for show_res in show_results:
@@ -890,7 +924,9 @@ class GrepFile(CommandController):
         reading_strings = None
         title_every_nth = 0
         uniq = False
+        uniq_exact = False
         system_grep = False
+        follow = False
         while tline:
             string_read = False
             word = tline.pop(0)
@@ -906,8 +942,12 @@ class GrepFile(CommandController):
                 is_casesensitive = False
             elif word == '-u' and not self.grep_cluster:
                 uniq = True
+            elif word == '-ue' and not self.grep_cluster:
+                uniq_exact = True
             elif word == '-sg' and not self.grep_cluster:
                 system_grep = True
+            elif word == '-F' and not self.grep_cluster:
+                follow = True
             elif word == '-p' and not self.grep_cluster:
                 try:
                     output_page_size = int(strip_string(tline.pop(0)))
@@ -946,6 +986,9 @@ class GrepFile(CommandController):
             if not string_read:
                 reading_strings = None
 
+        if follow:
+            start_tm, output_page_size = self.follow_defaults(line, start_tm, output_page_size)
+
         if search_strs:
             file_handlers = self.logger.get_files_by_index(
                 self.grep_cluster,
@@ -953,8 +996,9 @@ class GrepFile(CommandController):
             for display_name in sorted(file_handlers.keys()):
                 count_results = self.logger.grepCount(file_handlers[display_name],
                     search_strs=search_strs, ignore_strs=ignore_strs, is_and=is_and, is_casesensitive=is_casesensitive,
-                    start_tm_arg=start_tm, duration_arg=duration, slice_duration=slice_duration, uniq=uniq, system_grep=system_grep,
-                    grep_cluster_logs=self.grep_cluster, output_page_size =output_page_size)
+                    start_tm_arg=start_tm, duration_arg=duration, slice_duration=slice_duration, uniq=uniq, uniq_exact=uniq_exact,
+                    system_grep=system_grep, grep_cluster_logs=self.grep_cluster, output_page_size =output_page_size,
+                    follow=follow)
                 page_index = 1
                 for count_res in count_results:
                     if count_res:
@@ -983,6 +1027,7 @@ class GrepFile(CommandController):
         title_every_nth = 0
         reading_search_strings = False
         search_string_read = False
+        follow = False
 
         while tline:
             search_string_read = False
@@ -1028,6 +1073,8 @@ class GrepFile(CommandController):
             elif word == '-l' and tline:
                 limit = tline.pop(0)
                 limit = int(strip_string(limit))
+            elif word == '-F' and not self.grep_cluster:
+                follow = True
             elif reading_search_strings:
                 try:
                     search_strs.append(strip_string(word))
@@ -1040,13 +1087,16 @@ class GrepFile(CommandController):
             if not search_string_read:
                 reading_search_strings = False
 
+        if follow:
+            start_tm, output_page_size = self.follow_defaults(line, start_tm, output_page_size)
+
         if search_strs:
             file_handlers = self.logger.get_files_by_index(
                 self.grep_cluster,
                 sources)
             for display_name in sorted(file_handlers.keys()):
                 diff_results = self.logger.grepDiff(file_handlers[display_name], search_strs, is_casesensitive,
-                    start_tm, duration, slice_tm, show_count, limit, output_page_size=output_page_size)
+                    start_tm, duration, slice_tm, show_count, limit, output_page_size=output_page_size, follow=follow)
                 page_index = 1
                 for diff_res in diff_results:
                     if diff_res:
@@ -1073,6 +1123,7 @@ class GrepFile(CommandController):
         time_rounding = True
         title_every_nth = 0
         ns=None
+        follow = False
         while tline:
             word = tline.pop(0)
             if word == '-h':
@@ -1112,6 +1163,8 @@ class GrepFile(CommandController):
                     sources = []
             elif word == '-o':
                 time_rounding = False
+            elif word == '-F':
+                follow = True
             elif word == '-ns':
                 try:
                     ns = tline.pop(0)
@@ -1122,6 +1175,9 @@ class GrepFile(CommandController):
                 raise ShellException(
                     "Do not understand '%s' in '%s'" % (word, " ".join(line)))
 
+        if follow:
+            start_tm, output_page_size = self.follow_defaults(line, start_tm, output_page_size)
+
         if hist:
             file_handlers = self.logger.get_files_by_index(self.grep_cluster, sources)
             ns_hist = ""
@@ -1129,10 +1185,15 @@ class GrepFile(CommandController):
                 ns_hist += "%s - "%(ns)
             ns_hist += "%s"%(hist)
 
+            hists = [h.strip() for h in hist.split(",") if h.strip()]
+            namespaces = None
+            if ns:
+                namespaces = [n.strip() for n in ns.split(",") if n.strip()]
+
             for display_name in sorted(file_handlers.keys()):
                 latency_results = self.logger.loglatency(file_handlers[display_name],
-                    hist, start_tm, duration, slice_tm, bucket_count,
-                    every_nth_bucket, time_rounding, output_page_size=output_page_size, ns=ns)
+                    hists, start_tm, duration, slice_tm, bucket_count,
+                    every_nth_bucket, time_rounding, output_page_size=output_page_size, ns=namespaces, follow=follow)
                 page_index = 1
                 for latency_res in latency_results:
                     if latency_res:
@@ -1161,7 +1222,8 @@ class LogGrepClusterController(CommandController):
         '    -i           - Perform case insensitive matching of search strings (-s) and non-matching strings (-v).',
         '                   By default it is case sensitive.',
         '    -n <string>  - Comma separated cluster snapshot numbers. You can get these numbers by list command. Ex. : -n \'1,2,5\'.',
-        '                   If not set then runs on all cluster snapshots in selected list.')
+        '                   If not set then runs on all cluster snapshots in selected list.',
+        '    -p <int>     - Showing output in pages with p lines per page. default: 10.')
     def do_show(self, line):
         self.grepFile.do_show(line)
 
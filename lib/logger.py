@@ -1,10 +1,13 @@
 __author__ = 'aerospike'
 
 import copy
+import heapq
 import ntpath
 from lib import logutil
+from lib.compressedlog import is_compressed
 import os
 from lib.logsnapshot import LogSnapshot
+from lib.logworker import LogScanWorker, can_use_workers, max_workers
 from lib.serverlog import ServerLog
 from lib.logreader import LogReader, SHOW_RESULT_KEY, COUNT_RESULT_KEY, END_ROW_KEY, TOTAL_ROW_HEADER
 from lib import terminal
@@ -31,6 +34,9 @@ class Logger(object):
     selected_cluster_files = {}
     all_server_files = {}
     selected_server_files = {}
+    # scan server logs in worker processes (see server_log_iterators) for
+    # grep, grepCount and grepDiff
+    use_worker_processes = True
 
     def __init__(self, log_path):
         self.log_path = log_path
@@ -166,14 +172,40 @@ class Logger(object):
         except Exception:
             return []
 
+    def get_cluster_files(self, dir_path):
+        """
+        [(file, timestamp)] of the collectinfo files in dir_path, what is
+        known about unchanged files comes from the directory manifest. Like
+        get_files, [] if dir_path cannot be read.
+        """
+
+        try:
+            saved_manifest = self.log_reader.load_cluster_manifest(dir_path)
+            manifest = dict(saved_manifest)
+            files = logutil.get_all_files(dir_path)
+            cluster_files = []
+            for file in files:
+                try:
+                    is_cluster, timestamp = self.log_reader.get_cluster_file_info(file, manifest)
+                except Exception:
+                    continue
+                if is_cluster:
+                    cluster_files.append((file, timestamp))
+
+            manifest = dict((file, manifest[file]) for file in files if file in manifest)
+            if manifest != saved_manifest:
+                self.log_reader.save_cluster_manifest(dir_path, manifest)
+            return cluster_files
+        except Exception:
+            return []
+
     def add_cluster_snapshots(self, path=""):
         snapshots_added = 0
         if not path:
             return snapshots_added, ">>> Wrong path <<<"
         error = ""
         if os.path.isdir(path):
-            for file in self.get_files(True, path):
-                timestamp = self.log_reader.get_timestamp(file)
+            for file, timestamp in self.get_cluster_files(path):
                 if timestamp:
                     log_snapshot = self.create_log_snapshot(timestamp, file)
                     self.selected_cluster_files[timestamp] = log_snapshot
@@ -391,39 +423,85 @@ class Logger(object):
         return colors
 
 
+    def _log_size(self, file_handler):
+        try:
+            return os.path.getsize(file_handler.server_file)
+        except Exception:
+            return 0
+
+    def server_log_iterators(self, file_handlers, iterator_name, **input_args):
+        """
+        Returns {display_name: iterator} of file_handler.<iterator_name>()
+        after file_handler.set_input(**input_args). If possible the largest
+        logs, up to max_workers(), run in worker processes and the others
+        in this process. Followed logs are read in this process, the merge
+        waits on them in turn. So are compressed logs, the decompressor
+        checkpoints within a gzip member can not be saved and only last in
+        the process which made them, a worker would decompress from the
+        start of the member on every command.
+        """
+
+        iterators = {}
+        workers = 0
+        if self.use_worker_processes and can_use_workers() \
+                and not input_args.get("follow"):
+            workers = max_workers()
+        for file_handler in sorted(file_handlers, key=self._log_size, reverse=True):
+            if workers > 0 and not is_compressed(file_handler.server_file):
+                workers -= 1
+                iterators[file_handler.display_name] = LogScanWorker(file_handler, iterator_name, input_args)
+            else:
+                file_handler.set_input(**input_args)
+                iterators[file_handler.display_name] = getattr(file_handler, iterator_name)()
+        return iterators
+
     def grep(
             self,
             file_handlers, search_strs, ignore_strs=[], is_and=False, is_casesensitive=True, start_tm_arg="head", duration_arg="",
-            uniq=False, grep_cluster_logs=True, output_page_size = 10, system_grep=False
+            uniq=False, grep_cluster_logs=True, output_page_size = 10, system_grep=False, follow=False,
+            uniq_exact=False
             ):
         if file_handlers and search_strs:
             if grep_cluster_logs:
                 for file_handler in file_handlers:
                     file_handler.set_input(search_strs=search_strs, ignore_strs=ignore_strs, is_and=is_and, is_casesensitive=is_casesensitive)
                     show_it = file_handler.show_iterator()
-                    show_result = {}
-                    show_result[SHOW_RESULT_KEY] = show_it.next()
-                    yield show_result
-                    show_it.close()
+                    try:
+                        # matching lines in pages of output_page_size, an
+                        # empty result if the snapshot has none
+                        page = []
+                        pages = 0
+                        for line in show_it:
+                            page.append(line)
+                            if len(page) == output_page_size:
+                                yield {SHOW_RESULT_KEY: "".join(page)}
+                                pages += 1
+                                page = []
+                        if page or not pages:
+                            yield {SHOW_RESULT_KEY: "".join(page)}
+                    finally:
+                        show_it.close()
             else:
-                show_its = {}
                 min_start_tm = min(s.get_start_tm(start_tm=start_tm_arg) for s in file_handlers)
-                for file_handler in file_handlers:
-                    file_handler.set_input(search_strs=search_strs, ignore_strs=ignore_strs, is_and=is_and, is_casesensitive=is_casesensitive,
-                                           start_tm=min_start_tm, duration=duration_arg, system_grep=system_grep, uniq=uniq)
-                    show_its[file_handler.display_name] = file_handler.show_iterator()
+                show_its = self.server_log_iterators(file_handlers, "show_iterator"
+                                                     , search_strs=search_strs, ignore_strs=ignore_strs, is_and=is_and, is_casesensitive=is_casesensitive,
+                                                     start_tm=min_start_tm, duration=duration_arg, system_grep=system_grep, uniq=uniq,
+                                                     uniq_exact=uniq_exact, follow=follow)
                 merger = self.server_log_merger(show_its, return_strings=True, output_page_size=output_page_size)
-                for val in merger:
-                    yield val
-                for it in show_its:
-                    show_its[it].close()
-                merger.close()
+                try:
+                    for val in merger:
+                        yield val
+                finally:
+                    # stops the worker processes if the caller stops reading early
+                    for it in show_its:
+                        show_its[it].close()
+                    merger.close()
 
 
     def grepCount(self,
                   file_handlers, search_strs, ignore_strs=[], is_and=False, is_casesensitive=True, start_tm_arg="head", duration_arg="",
-                  uniq=False, slice_duration="600", grep_cluster_logs=True, output_page_size=10, system_grep=False
-                  ):
+                  uniq=False, slice_duration="600", grep_cluster_logs=True, output_page_size=10, system_grep=False,
+                  follow=False, uniq_exact=False):
         try:
             if file_handlers and search_strs:
                 try:
@@ -438,19 +516,21 @@ class Logger(object):
                             yield count_result
                             count_it.close()
                     else:
-                        count_its = {}
                         min_start_tm = min(s.get_start_tm(start_tm=start_tm_arg) for s in file_handlers)
-                        for file_handler in file_handlers:
-                            file_handler.set_input(search_strs=search_strs, ignore_strs=ignore_strs, is_and=is_and, is_casesensitive=is_casesensitive,
-                                                   start_tm=min_start_tm, duration=duration_arg, slice_duration=slice_duration, uniq=uniq, system_grep=system_grep)
-                            count_its[file_handler.display_name] = file_handler.count_iterator()
+                        count_its = self.server_log_iterators(file_handlers, "count_iterator"
+                                                              , search_strs=search_strs, ignore_strs=ignore_strs, is_and=is_and, is_casesensitive=is_casesensitive,
+                                                              start_tm=min_start_tm, duration=duration_arg, slice_duration=slice_duration, uniq=uniq, system_grep=system_grep,
+                                                              uniq_exact=uniq_exact, follow=follow)
 
                         merger = self.server_log_merger(count_its, output_page_size=output_page_size, default_value=0)
-                        for val in merger:
-                            yield val
-                        for it in count_its:
-                            count_its[it].close()
-                        merger.close()
+                        try:
+                            for val in merger:
+                                yield val
+                        finally:
+                            # stops the worker processes if the caller stops reading early
+                            for it in count_its:
+                                count_its[it].close()
+                            merger.close()
                 except Exception:
                     pass
         except Exception:
@@ -458,30 +538,31 @@ class Logger(object):
 
     def grepDiff(self,
                  file_handlers, search_strs, is_casesensitive=True, start_tm_arg="head", duration_arg="",
-                 slice_duration="600", every_nth_slice=1, upper_limit_check="", output_page_size=10
+                 slice_duration="600", every_nth_slice=1, upper_limit_check="", output_page_size=10, follow=False
                  ):
         try:
             if file_handlers and search_strs:
-                diff_its = {}
                 min_start_tm = min(s.get_start_tm(start_tm=start_tm_arg) for s in file_handlers)
-                for file_handler in file_handlers:
-                    file_handler.set_input(search_strs=search_strs, is_casesensitive=is_casesensitive, is_and=True,
-                                           start_tm=min_start_tm, duration=duration_arg, slice_duration=slice_duration, upper_limit_check=upper_limit_check,
-                                           every_nth_slice=every_nth_slice)
-                    diff_its[file_handler.display_name] = file_handler.diff_iterator()
+                diff_its = self.server_log_iterators(file_handlers, "diff_iterator"
+                                                     , search_strs=search_strs, is_casesensitive=is_casesensitive, is_and=True,
+                                                     start_tm=min_start_tm, duration=duration_arg, slice_duration=slice_duration, upper_limit_check=upper_limit_check,
+                                                     every_nth_slice=every_nth_slice, follow=follow)
 
                 merger = self.server_log_merger(diff_its, output_page_size=output_page_size)
-                for val in merger:
-                    yield val
-                for it in diff_its:
-                    diff_its[it].close()
-                merger.close()
+                try:
+                    for val in merger:
+                        yield val
+                finally:
+                    # stops the worker processes if the caller stops reading early
+                    for it in diff_its:
+                        diff_its[it].close()
+                    merger.close()
         except Exception:
             pass
 
     def loglatency(self,
                    file_handlers, hist, start_tm_arg="head", duration_arg="", slice_duration="10",
-                   bucket_count=3, every_nth_bucket=1, rounding_time=True, output_page_size=10, ns=None
+                   bucket_count=3, every_nth_bucket=1, rounding_time=True, output_page_size=10, ns=None, follow=False
                    ):
         try:
             if file_handlers and hist:
@@ -490,8 +571,15 @@ class Logger(object):
                 for file_handler in file_handlers:
                     file_handler.set_input(search_strs=hist, start_tm=min_start_tm, duration=duration_arg, slice_duration=slice_duration,
                                            bucket_count=bucket_count, every_nth_bucket=every_nth_bucket,
-                                           read_all_lines=True, rounding_time=rounding_time, ns=ns)
-                    latency_its[file_handler.display_name] = file_handler.latency_iterator()
+                                           read_all_lines=True, rounding_time=rounding_time, ns=ns, follow=follow)
+                    # several histograms of one log come from a single scan,
+                    # each is a row group of its own in the merged table
+                    hist_its = file_handler.latency_iterators()
+                    for name, hist_it in hist_its.iteritems():
+                        if len(hist_its) == 1:
+                            latency_its[file_handler.display_name] = hist_it
+                        else:
+                            latency_its["%s %s"%(file_handler.display_name, name)] = hist_it
 
                 merger = self.server_log_merger(latency_its, output_page_size=output_page_size)
                 for val in merger:
@@ -503,83 +591,104 @@ class Logger(object):
             pass
 
     def server_log_merger(self, file_streams, output_page_size=3, return_strings=False, end_key=END_ROW_KEY, default_value=[]):
+        """
+        Merge the (timestamp, result) streams of several server logs in
+        timestamp order. Streams with equal timestamps are emitted in the
+        sorted order of their keys. A heap keyed by (timestamp, key order)
+        gives the next timestamp in O(log n).
+        """
+
         latency_end={}
         result = {}
         merge_result = {}
-        tm_keys = {}
-        need_to_process = False
         keys_in_input = []
         result_count = 0
+
+        # position of every stream in output order, breaks timestamp ties
+        sorted_keys = sorted(file_streams.keys())
+        key_order = dict((key, i) for i, key in enumerate(sorted_keys))
+
+        def next_entry(file_key):
+            try:
+                tm, res = file_streams[file_key].next()
+            except StopIteration:
+                return None
+            if not tm:
+                return None
+            if tm == end_key:
+                latency_end[file_key] = res
+                return None
+            result[file_key] = res
+            return (tm, key_order[file_key], file_key)
+
+        heap = []
         for key in file_streams.keys():
             if not return_strings:
                 merge_result[key] = {}
-            try:
-                tm, res = file_streams[key].next()
-                if not tm:
-                    continue
-                if tm == end_key:
-                    latency_end[key] = res
-                    continue
-            except Exception:
+            entry = next_entry(key)
+            if entry is None:
                 continue
-            need_to_process = True
-            result[key] = {}
-            tm_keys[key] = {}
+            heap.append(entry)
             if not return_strings:
                 if not keys_in_input:
-                    keys_in_input = res.keys()
-            tm_keys[key] = tm
-            result[key] = res
+                    keys_in_input = result[key].keys()
+        heapq.heapify(heap)
 
         if return_strings:
             colors = self.get_fg_bg_color_index_list(len(file_streams))
-
-        while need_to_process:
-            need_to_process = False
-            try:
-                min_keys = [k for k, x in tm_keys.items() if not any(y < x for y in tm_keys.values())]
-            except Exception:
-                break
-            if not min_keys:
-                break
-            current_tm = tm_keys[min_keys[0]]
-            for file_key in sorted(file_streams.keys()):
-                if file_key in min_keys:
-                    if return_strings:
-                        try:
-                            merge_result[SHOW_RESULT_KEY] += "%s  %s%s::" % (self.bg_colors[colors[(file_streams.keys().index(file_key))][0]][1](), terminal.reset(), file_key)
-                        except Exception:
-                            merge_result[SHOW_RESULT_KEY] = "%s  %s%s::" % (self.bg_colors[colors[(file_streams.keys().index(file_key))][0]][1](), terminal.reset(), file_key)
-                        merge_result[SHOW_RESULT_KEY] += result[file_key]
-                    else:
-                        if merge_result[file_key]:
-                            for k in keys_in_input:
-                                merge_result[file_key][k].update(result[file_key][k])
-                        else:
-                            merge_result[file_key].update(result[file_key])
-                    del result[file_key]
-                    del tm_keys[file_key]
+            line_prefix = {}
+            for i, file_key in enumerate(file_streams.keys()):
+                line_prefix[file_key] = "%s  %s%s::" % (self.bg_colors[colors[i][0]][1](), terminal.reset(), file_key)
+
+        while heap:
+            # every stream at the lowest timestamp emits one row, in key order
+            current_tm = heap[0][0]
+            current_keys = []
+            while heap and heap[0][0] == current_tm:
+                current_keys.append(heapq.heappop(heap)[2])
+
+            next_entries = []
+            emitted = False
+            for file_key in current_keys:
+                if return_strings and result[file_key] is None:
+                    # heartbeat of a followed log, no line
+                    pass
+                elif return_strings:
+                    emitted = True
                     try:
-                        tm, res = file_streams[file_key].next()
-                        if not tm:
-                            continue
-                        if tm == end_key:
-                            latency_end[file_key] = res
-                            continue
-                    except Exception:
-                        continue
-                    need_to_process = True
-                    tm_keys[file_key] = tm
-                    result[file_key] = res
+                        merge_result[SHOW_RESULT_KEY] += line_prefix[file_key]
+                    except KeyError:
+                        merge_result[SHOW_RESULT_KEY] = line_prefix[file_key]
+                    merge_result[SHOW_RESULT_KEY] += result[file_key]
                 else:
-                    if file_key in tm_keys and tm_keys[file_key]:
-                        need_to_process = True
-                    if return_strings:
+                    emitted = True
+                    if merge_result[file_key]:
+                        for k in keys_in_input:
+                            merge_result[file_key][k].update(result[file_key][k])
+                    else:
+                        merge_result[file_key].update(result[file_key])
+                del result[file_key]
+                entry = next_entry(file_key)
+                if entry is not None:
+                    next_entries.append(entry)
+
+            if not return_strings:
+                # streams without a row at current_tm get default_value
+                current_tm_str = current_tm.strftime(DT_FMT)
+                current_key_set = set(current_keys)
+                for file_key in sorted_keys:
+                    if file_key in current_key_set:
                         continue
                     for k in keys_in_input:
                         if k not in merge_result[file_key]:
                             merge_result[file_key][k] = {}
-                        merge_result[file_key][k][current_tm.strftime(DT_FMT)] = default_value
+                        merge_result[file_key][k][current_tm_str] = default_value
+
+            for entry in next_entries:
+                heapq.heappush(heap, entry)
+
+            if not emitted:
+                continue
             result_count += 1
             if result_count == output_page_size:
                 yield merge_result
@@ -591,6 +700,14 @@ class Logger(object):
                     merge_result[key] = {}
         if not latency_end:
             yield merge_result
+        elif return_strings:
+            # closing notes of the streams (e.g. duplicates left out by a
+            # unique grep) after their lines
+            for file_key in sorted_keys:
+                if latency_end.get(file_key):
+                    merge_result[SHOW_RESULT_KEY] = merge_result.get(SHOW_RESULT_KEY, "") \
+                        + line_prefix[file_key] + latency_end[file_key]
+            yield merge_result
         else:
             self.balance_dict(latency_end, file_streams.keys(), default_value)
             for file_key in latency_end:
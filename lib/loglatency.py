@@ -27,6 +27,7 @@
 # Imports
 #
 
+import collections
 import datetime
 import getopt
 import os
@@ -48,6 +49,9 @@ from lib.logreader import END_ROW_KEY
 BUCKET_LABELS = ("00", "01", "02", "03", "04", "05", "06", "07", "08", "09",
                  "10", "11", "12", "13", "14", "15", "16")
 ALL_BUCKETS = len(BUCKET_LABELS)
+BUCKET_INDEX = dict((label, b) for b, label in enumerate(BUCKET_LABELS))
+# every "(NN: count)" pair of a histogram dump line
+BUCKET_VALUE_RE = re.compile(r"\((\d\d): (.*?)\)")
 DT_FMT = "%b %d %Y %H:%M:%S"
 DT_TO_MINUTE_FMT = "%b %d %Y %H:%M"
 DT_TIME_FMT = "%H:%M:%S"
@@ -61,6 +65,8 @@ class LogLatency(object):
 
     def __init__(self, log_reader):
         self.log_reader = log_reader
+        self.hist_tags = None
+        self.hist_tags_re = None
     #------------------------------------------------
     # Read a complete line from the log file.
     #
@@ -99,19 +105,20 @@ class LogLatency(object):
             return 0, 0, 0
         b_min = 0
         while True:
-            found = 0
-            for b in range(b_min, ALL_BUCKETS):
-                pattern = '.*?\(' + BUCKET_LABELS[b] + ': (.*?)\).*?'
-                r = re.compile(pattern)
-                if r.search(line):
-                    found = found + 1
-                    values[b] = long(r.search(line).group(1))
-            if found == 0:
+            # first value of every bucket from b_min on, in one pass
+            found = {}
+            for label, value in BUCKET_VALUE_RE.findall(line):
+                b = BUCKET_INDEX.get(label)
+                if b is not None and b >= b_min and b not in found:
+                    found[b] = value
+            if not found:
                 break
+            for b, value in found.iteritems():
+                values[b] = long(value)
             line = self.read_line(file_itr)
             if not line:
                 return 0, 0, 0
-            b_min = b_min + found
+            b_min = b_min + len(found)
         return total, values, line
 
     #------------------------------------------------
@@ -175,33 +182,47 @@ class LogLatency(object):
 
 
     def read_hist(self, hist_tags, after_dt, file_itr, line=0, end_dt=None, before_dt=None):
+        if hist_tags != self.hist_tags:
+            self.hist_tags = list(hist_tags)
+            self.hist_tags_re = re.compile("|".join("(?:%s)"%(ht) for ht in hist_tags))
+
+        # sum of the histograms from the first one at or after after_dt up to
+        # before_dt (a namespace histogram is dumped once per namespace)
+        total, values, first_dt = 0, 0, None
         if not line:
             line = self.read_line(file_itr)
         while True:
-            if not line:
-                return 0, 0, 0, 0
-            dt = self.log_reader.parse_dt(line)
-            if dt<after_dt:
+            while True:
+                if not line:
+                    if first_dt is None:
+                        return 0, 0, 0, 0
+                    return total, values, first_dt, 0
+                dt = self.log_reader.parse_dt(line)
+                if dt<after_dt:
+                    line = self.read_line(file_itr)
+                    continue
+                if (end_dt and dt>end_dt) or (before_dt and dt>before_dt):
+                    if first_dt is None:
+                        return 0, 0, dt, line
+                    return total, values, first_dt, line
+                if self.hist_tags_re.search(line):
+                    break
                 line = self.read_line(file_itr)
-                continue
-            if end_dt and dt>end_dt:
-                return 0, 0, dt, line
-            if before_dt and dt>before_dt:
-                return 0, 0, dt, line
-            if any(re.search(ht, line) for ht in hist_tags):
-                break
-            line = self.read_line(file_itr)
 
-        total, values, line = self.read_bucket_values(line, file_itr)
-        if not line:
-            return 0, 0, 0, 0
-        if not before_dt:
-            before_dt = dt+datetime.timedelta(seconds=NS_SLICE_SECONDS)
-        r_total, r_values, r_dt, line = self.read_hist(hist_tags,after_dt,file_itr,line,end_dt,before_dt)
-        total += r_total
-        if r_values:
-            values = self.add_buckets(values, r_values)
-        return total, values, dt, line
+            h_total, h_values, line = self.read_bucket_values(line, file_itr)
+            if not line:
+                if first_dt is None:
+                    return 0, 0, 0, 0
+                return total, values, first_dt, 0
+
+            if first_dt is None:
+                first_dt = dt
+                total, values = h_total, h_values
+                if not before_dt:
+                    before_dt = dt+datetime.timedelta(seconds=NS_SLICE_SECONDS)
+            else:
+                total += h_total
+                values = self.add_buckets(values, h_values)
 
     #------------------------------------------------
     # Get a timedelta in seconds.
@@ -222,6 +243,106 @@ class LogLatency(object):
             pad = pad + what
         return pad
 
+    #------------------------------------------------
+    # Get the log line patterns of a histogram dump.
+    #
+
+
+    def get_hist_tags(self, hist, ns=None):
+        if ns:
+            return [s%(ns,hist) for s in NS_HIST_TAG_PATTERNS]
+        return [s%(hist) for s in HIST_TAG_PATTERNS]
+
+    #------------------------------------------------
+    # Split a log iterator into one iterator per histogram.
+    #
+
+
+    def split_hist_lines(self, file_itr, hist_tags_list):
+        """
+        Returns one (timestamp, line) iterator per entry of hist_tags_list,
+        holding the dumps of that histogram only: the header, the bucket
+        lines and the line ending the dump. file_itr is read once, lines
+        read ahead for the other iterators are queued. Every iterator ends
+        with the last line of file_itr, so compute_latency sees the same
+        end of log as it would reading file_itr directly.
+        """
+
+        any_tag_re = re.compile("|".join("(?:%s)"%(ht) for hist_tags in hist_tags_list for ht in hist_tags))
+        tag_res = [re.compile("|".join("(?:%s)"%(ht) for ht in hist_tags)) for hist_tags in hist_tags_list]
+        queues = [collections.deque() for _ in hist_tags_list]
+        in_dump = [False] * len(hist_tags_list)
+        done = [False]
+        # last line of file_itr and the queues it went to
+        last = [None, ()]
+
+        def read_next():
+            # routes the next line of file_itr, False at the end of file_itr
+            try:
+                tm, line = file_itr.next()
+            except StopIteration:
+                tm, line = None, None
+            if not line:
+                done[0] = True
+                if last[0]:
+                    for i, queue in enumerate(queues):
+                        if i not in last[1]:
+                            queue.append(last[0])
+                return False
+            last[0], last[1] = (tm, line), ()
+            if not any(in_dump) and (HIST_TAG_PREFIX not in line or not any_tag_re.search(line)):
+                return True
+            routed = []
+            has_buckets = None
+            for i, tag_re in enumerate(tag_res):
+                if tag_re.search(line):
+                    routed.append(i)
+                    in_dump[i] = True
+                elif in_dump[i]:
+                    routed.append(i)
+                    if has_buckets is None:
+                        has_buckets = bool(BUCKET_VALUE_RE.search(line))
+                    in_dump[i] = has_buckets
+            for i in routed:
+                queues[i].append((tm, line))
+            last[1] = routed
+            return True
+
+        def hist_lines(queue):
+            while True:
+                while not queue:
+                    if done[0] or not read_next():
+                        return
+                yield queue.popleft()
+
+        return [hist_lines(queue) for queue in queues]
+
+    def compute_latencies(self, arg_log_itr, arg_hists, arg_slice, arg_from, arg_end_date, arg_num_buckets, arg_every_nth, arg_rounding_time=True, arg_ns=None):
+        """
+        compute_latency for every histogram in arg_hists, and every namespace
+        in arg_ns if given, in one pass over arg_log_itr. Returns
+        {name: iterator}, name is "<hist>" or "<ns> - <hist>".
+        """
+
+        if isinstance(arg_hists, str):
+            arg_hists = [arg_hists]
+        if not arg_ns or isinstance(arg_ns, str):
+            arg_ns = [arg_ns]
+        keys = [(ns, hist) for ns in arg_ns for hist in arg_hists]
+        if len(keys) == 1:
+            hist_itrs = [arg_log_itr]
+        else:
+            hist_itrs = self.split_hist_lines(arg_log_itr, [self.get_hist_tags(hist, ns) for ns, hist in keys])
+
+        latency_its = {}
+        for (ns, hist), hist_itr in zip(keys, hist_itrs):
+            name = "%s - %s"%(ns, hist) if ns else hist
+            # an instance each, read_hist caches the compiled tags
+            latency_its[name] = LogLatency(self.log_reader).compute_latency(
+                hist_itr, hist, arg_slice, arg_from, arg_end_date, arg_num_buckets, arg_every_nth
+                , arg_rounding_time=arg_rounding_time, arg_ns=ns)
+        return latency_its
+
     def compute_latency(self, arg_log_itr, arg_hist, arg_slice, arg_from, arg_end_date, arg_num_buckets, arg_every_nth, arg_rounding_time=True, arg_ns=None):
         latency = {}
         latency["ops/sec"] = {}
@@ -242,10 +363,7 @@ class LogLatency(object):
             file_itr = arg_log_itr
 
             # Set histogram tag:
-            if arg_ns:
-                hist_tags = [s%(arg_ns,arg_hist) for s in NS_HIST_TAG_PATTERNS]
-            else:
-                hist_tags = [s%(arg_hist) for s in HIST_TAG_PATTERNS]
+            hist_tags = self.get_hist_tags(arg_hist, arg_ns)
 
             init_dt = arg_from
             # Find first histogram:
@@ -6,7 +6,13 @@ import os
 import glob
 import re
 import time
+import calendar
 import datetime
+import hashlib
+import json
+import marshal
+import mmap
+from lib.compressedlog import CompressedLog, is_compressed
 from lib.util import shell_command
 import copy
 
@@ -25,17 +31,63 @@ HH = 0
 MM = 1
 SS = 2
 
-INDEX_DT_LEN = 4
+# server log lines start with "Mon DD YYYY HH:MM:SS GMT" (the GMT may carry
+# an offset, "GMT+05"), parse_dt decodes that fixed layout without strptime
+MONTHS = dict((m, i + 1) for i, m in enumerate(
+    ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct"
+     , "Nov", "Dec"]))
+DT_PREFIX_LEN = 20
+DT_MINUTE_PREFIX_LEN = 17
+
+# server log index granularity, parse_dt fields kept (5: down to minutes)
+INDEX_DT_LEN = 5
 STEP = 1000
+# decompressed bytes read at a time while indexing a compressed server log
+SCAN_BYTES = 4 * 1024 * 1024
+# server log indices are saved next to the log (<log>.asadm-idx) or, if that
+# directory is not writable, under INDEX_CACHE_DIR
+INDEX_FILE_EXT = ".asadm-idx"
+INDEX_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".aerospike", "asadm-idx")
+INDEX_VERSION = 1
+# per directory manifest of which files are collectinfos and their
+# timestamps, saved under INDEX_CACHE_DIR
+MANIFEST_FILE_EXT = ".asadm-manifest"
+MANIFEST_VERSION = 1
+# parsed collectinfo sections, saved under INDEX_CACHE_DIR keyed by the md5 of
+# the collectinfo. The header holds CACHE_VERSION (bump it when a parser
+# changes) and the marshal format version.
+CACHE_FILE_EXT = ".asadm-cache"
+CACHE_VERSION = 1
+CACHE_HEADER = "asadm-cache %d %d\n"%(CACHE_VERSION, marshal.version)
+# parsed sections kept under INDEX_CACHE_DIR, least recently used first out
+CACHE_MAX_BYTES = 256 * 1024 * 1024
+# md5 of a collectinfo along with its path, size, mtime and inode, so an
+# unchanged file is not read again to find its cache
+HASH_FILE_EXT = ".asadm-hash"
+HASH_VERSION = 1
 
 SHOW_RESULT_KEY = "show_result"
 COUNT_RESULT_KEY = "count_result"
 TOTAL_ROW_HEADER = "total"
+# count -u: lines left out as duplicates
+UNIQ_SUPPRESSED_HEADER = "duplicates"
 END_ROW_KEY = "End"
 
 SERVER_ID_FETCH_READ_SIZE = 10000
+# ascollectinfo sections read() parses
+SECTION_TYPES = ("config", "distribution", "latency", "statistics", "summary")
+# lines that can separate or start a section, see _section_type
+SECTION_LINE_RE = re.compile(r"=+ASCOLLECTINFO|\['(?:config|distribution|latency|statistics)'"
+                             r"|~[^~\n]+ Information~")
 FILE_READ_ENDS = ["tail","head"]
 
+def dt_to_epoch(dt):
+    """
+    Seconds since the epoch of a datetime as parse_dt returns it.
+    """
+
+    return calendar.timegm(dt.timetuple())
+
 class LogReader(object):
     ascollectinfoExt1 = "/ascollectinfo.log"
     ascollectinfoExt2 = "/*.log"
@@ -55,19 +107,22 @@ class LogReader(object):
     cluster_log_file_identifier = ["Configuration~~~", "Statistics~"]
     server_log_file_identifier = ["thr_info.c::", "heartbeat_received", "ClusterSize"]
     server_log_file_identifier_pattern = "(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec) \d{2} \d{4} \d{2}:\d{2}:\d{2} GMT([-+]\d+){0,1}: (?:INFO|WARNING|DEBUG|DETAIL) \([a-z_:]+\): \([A-Za-z_\.\[\]]+:{1,2}-?[\d]+\)"
+    # (prefix, dt_len, datetime) of the last parse_dt and (minute prefix,
+    # epoch) of the last parse_epoch
+    _dt_memo = (None, None, None)
+    _epoch_memo = (None, None)
 
     @staticmethod
     def getPrefixes(path):
         nodePrefixes = []
-        lines = open(path, 'r').readlines()
-        line = lines.pop(0)
-        while(line):
-            if re.search(LogReader.serviceStartPattern, line):
-                line = lines.pop(0)
-                nodes = line.split()
-                nodePrefixes = nodes[2:len(nodes)]
-                break
-            line = lines.pop(0)
+        with open(path, 'r') as f:
+            line = f.readline()
+            while(line):
+                if re.search(LogReader.serviceStartPattern, line):
+                    nodes = f.readline().split()
+                    nodePrefixes = nodes[2:len(nodes)]
+                    break
+                line = f.readline()
         return nodePrefixes
 
     def get_timestamp(self, file):
@@ -103,7 +158,13 @@ class LogReader(object):
         if not file:
             return not_found
         try:
-            out, err = shell_command(['%s -n %d "%s"'%(fetch_end, read_block_size, file)])
+            if is_compressed(file):
+                # tail would decompress the whole log, the node id is logged
+                # from its start as well
+                fetch_end = "head"
+                out, err = self.read_head(file, read_block_size), ""
+            else:
+                out, err = shell_command(['%s -n %d "%s"'%(fetch_end, read_block_size, file)])
         except Exception:
             return not_found
         if err or not out:
@@ -163,11 +224,30 @@ class LogReader(object):
                 return False
         return True
 
+    def read_head(self, file, line_count):
+        """
+        First line_count lines of a compressed log, as head prints them.
+        """
+
+        f = CompressedLog(file)
+        try:
+            lines = []
+            for line in f:
+                lines.append(line)
+                if len(lines) == line_count:
+                    break
+            return "".join(lines)
+        finally:
+            f.close()
+
     def is_server_log_file(self, file=""):
         if not file:
             return False
         try:
-            out, err = shell_command(['head -n 10 "%s"'%(file)])
+            if is_compressed(file):
+                out, err = self.read_head(file, 10), ""
+            else:
+                out, err = shell_command(['head -n 10 "%s"'%(file)])
         except Exception:
             return False
         if err or not out:
@@ -201,65 +281,107 @@ class LogReader(object):
             return filename
 
     def get_nodes(self, path):
-        nodes = []
-        lines = open(path, 'r').readlines()
-        line = lines.pop(0)
-        while(line):
-            if re.search(self.serviceStartPattern, line):
-                line = lines.pop(0)
-                node_ids = line.split()
-                nodes = node_ids[2:len(node_ids)]
-                break
-            if lines:
-                line = lines.pop(0)
-            else:
-                break
-        return nodes
+        return LogReader.getPrefixes(path)
+
+    def _is_section_separator(self, line):
+        return re.search(self.section_separator, line) or re.search(self.section_separator_with_date, line)
+
+    def _section_type(self, line):
+        if re.search(self.configPattern, line):
+            if re.search(self.configDiffPattern, line):
+                return None
+            return "config"
+        elif re.search(self.distributionPattern, line):
+            return "distribution"
+        elif re.search(self.latencyPattern, line):
+            return "latency"
+        elif re.search(self.statsPattern, line):
+            return "statistics"
+        elif re.search(self.summary_pattern, line):
+            return "summary"
+        return None
+
+    def index_sections(self, path):
+        """
+        One pass over an ascollectinfo file. Returns a list of
+        (type, header line, start, end) for every section read() parses,
+        the section body runs from byte offset start (after its header line)
+        to end (the next ASCOLLECTINFO separator or the end of the file).
+        """
+
+        sections = []
+        with open(path, "r") as f:
+            try:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (ValueError, EnvironmentError):
+                # empty file
+                return sections
+
+            try:
+                size = len(data)
+                lines = []
+                for m in SECTION_LINE_RE.finditer(data):
+                    if lines and m.start() < lines[-1][1]:
+                        continue
+                    line_start = data.rfind("\n", 0, m.start()) + 1
+                    line_end = data.find("\n", m.end())
+                    line_end = size if line_end < 0 else line_end + 1
+                    lines.append((line_start, line_end, data[line_start:line_end]))
+            finally:
+                data.close()
+
+        i = 0
+        while i < len(lines):
+            line_start, line_end, line = lines[i]
+            i += 1
+            section_type = self._section_type(line)
+            if not section_type:
+                continue
+
+            # the section is read up to and including the next separator
+            while i < len(lines) and not self._is_section_separator(lines[i][2]):
+                i += 1
+            end = lines[i][0] if i < len(lines) else size
+            sections.append((section_type, line, line_end, end))
+            i += 1
+
+        return sections
+
+    def read(self, path, types=SECTION_TYPES, sections=None):
+        """
+        Parse the sections of the given types of an ascollectinfo file.
+        sections is the index_sections(path) result if the caller keeps it.
+        """
+
+        if sections is None:
+            sections = self.index_sections(path)
 
-    def read(self, path):
         logInfo = {}
-        logInfo["statistics"] = {}
-        logInfo["config"] = {}
-        logInfo["distribution"] = {}
-        logInfo["summary"] = {}
+        for section_type in ("statistics", "config", "distribution", "summary"):
+            if section_type in types:
+                logInfo[section_type] = {}
+
         file_id = open(path, "r")
-        line = file_id.readline()
-        while(line):
-            config_pattern_matched = re.search(self.configPattern, line)
-            distribution_pattern_matched = re.search(self.distributionPattern, line)
-            latency_pattern_matched = re.search(self.latencyPattern, line)
-            stats_pattern_matched = re.search(self.statsPattern, line)
-            summary_pattern_matched = re.search(self.summary_pattern, line)
-            if config_pattern_matched:
+        try:
+            for section_type, header, start, end in sections:
+                if section_type not in types:
+                    continue
+                file_id.seek(start, 0)
                 try:
-                    if not re.search(self.configDiffPattern, line):
+                    if section_type == "config":
                         logInfo["config"].update(self.readConfig(file_id))
+                    elif section_type == "distribution":
+                        logInfo["distribution"].update(self.readDistribution(file_id))
+                    elif section_type == "latency":
+                        logInfo["latency"] = self.readLatency(file_id)
+                    elif section_type == "statistics":
+                        logInfo["statistics"].update(self.readStats(file_id))
+                    elif section_type == "summary":
+                        logInfo["summary"].update(self.readSummary(file_id, header))
                 except Exception:
                     pass
-            elif distribution_pattern_matched:
-                try:
-                    logInfo["distribution"].update(self.readDistribution(file_id))
-                except Exception:
-                    pass
-            elif latency_pattern_matched:
-                try:
-                    logInfo["latency"] = self.readLatency(file_id)
-                except Exception:
-                    pass
-            elif stats_pattern_matched:
-                try:
-                    logInfo["statistics"].update(self.readStats(file_id))
-                except Exception:
-                    pass
-            elif summary_pattern_matched:
-                try:
-                    logInfo["summary"].update(self.readSummary(file_id, line))
-                except Exception:
-                    pass
-            try:
-                line = file_id.readline()
-            except IndexError:
-                break
+        finally:
+            file_id.close()
         return logInfo
 
     def htableToString(self, file_id):
@@ -721,9 +843,70 @@ class LogReader(object):
     def get_dt(self, line):
         return line[0: line.find(" GMT")]
 
+    def _decode_dt(self, line):
+        """
+        (year, month, day, hour, minute, second) of a line starting with a
+        fixed layout timestamp, None if it does not.
+        """
+
+        if line[DT_PREFIX_LEN:DT_PREFIX_LEN + 4] != " GMT" \
+                and line[DT_PREFIX_LEN:DT_PREFIX_LEN + 1] != ",":
+            return None
+        if line[3] != " " or line[6] != " " or line[11] != " " \
+                or line[14] != ":" or line[17] != ":":
+            return None
+        try:
+            return (int(line[7:11]), MONTHS[line[0:3]], int(line[4:6])
+                    , int(line[12:14]), int(line[15:17]), int(line[18:20]))
+        except (KeyError, ValueError):
+            return None
+
     def parse_dt(self, line, dt_len = 6):
-        prefix = line[0: line.find(" GMT")].split(",")[0]
-        return datetime.datetime(*(time.strptime(prefix, DT_FMT)[0:dt_len]))
+        """
+        datetime of a server log line, truncated to its first dt_len fields.
+        A GMT offset is not applied, lines keep the time they were logged
+        with. The last decoded second is memoized, consecutive lines mostly
+        share it.
+        """
+
+        prefix = line[0:DT_PREFIX_LEN]
+        memo = self._dt_memo
+        if memo[0] == prefix and memo[1] == dt_len:
+            return memo[2]
+
+        fields = self._decode_dt(line)
+        if fields is None:
+            prefix = line[0: line.find(" GMT")].split(",")[0]
+            return datetime.datetime(*(time.strptime(prefix, DT_FMT)[0:dt_len]))
+
+        dt = datetime.datetime(*fields[0:dt_len])
+        self._dt_memo = (line[0:DT_PREFIX_LEN], dt_len, dt)
+        return dt
+
+    def parse_epoch(self, line):
+        """
+        parse_dt(line) as integer seconds since the epoch, for callers that
+        only compare timestamps. The epoch of the last minute is memoized.
+        """
+
+        memo = self._epoch_memo
+        if memo[0] == line[0:DT_MINUTE_PREFIX_LEN] \
+                and line[DT_MINUTE_PREFIX_LEN:DT_MINUTE_PREFIX_LEN + 1] == ":" \
+                and line[DT_PREFIX_LEN:DT_PREFIX_LEN + 4] == " GMT":
+            try:
+                return memo[1] + int(line[18:20])
+            except ValueError:
+                pass
+
+        fields = self._decode_dt(line)
+        if fields is None:
+            return dt_to_epoch(self.parse_dt(line))
+
+        # validates the fields as parse_dt does
+        datetime.datetime(*fields)
+        minute_epoch = calendar.timegm(fields[0:5] + (0,))
+        self._epoch_memo = (line[0:DT_MINUTE_PREFIX_LEN], minute_epoch)
+        return minute_epoch + fields[5]
 
     def grepDiff(
             self,
@@ -1001,18 +1184,372 @@ class LogReader(object):
         else:
             return self.get_next_timestamp(f, min, last_read, last)
 
+    def _index_file_paths(self, file_path):
+        file_path = os.path.abspath(file_path)
+        cache_name = hashlib.md5(file_path).hexdigest() + INDEX_FILE_EXT
+        return [file_path + INDEX_FILE_EXT
+                , os.path.join(INDEX_CACHE_DIR, cache_name)]
+
+    def _load_server_log_index(self, file_path):
+        for index_path in self._index_file_paths(file_path):
+            try:
+                with open(index_path, "r") as f:
+                    saved = json.load(f)
+                if saved["version"] == INDEX_VERSION \
+                        and saved["path"] == os.path.abspath(file_path):
+                    return saved
+            except Exception:
+                continue
+        return None
+
+    def _save_server_log_index(self, file_path, file_stat, indices, blocks=None):
+        saved = {"version": INDEX_VERSION
+                 , "path": os.path.abspath(file_path)
+                 , "size": file_stat.st_size
+                 , "mtime": file_stat.st_mtime
+                 , "inode": file_stat.st_ino
+                 , "indices": [[calendar.timegm(tm.timetuple()), pos]
+                               for tm, pos in indices]}
+        if blocks is not None:
+            saved["blocks"] = blocks
+
+        for index_path in self._index_file_paths(file_path):
+            tmp_path = "%s.%d.tmp"%(index_path, os.getpid())
+            try:
+                index_dir = os.path.dirname(index_path)
+                if not os.path.isdir(index_dir):
+                    os.makedirs(index_dir)
+                with open(tmp_path, "w") as f:
+                    json.dump(saved, f)
+                os.rename(tmp_path, index_path)
+                return True
+            except Exception:
+                try:
+                    os.remove(tmp_path)
+                except Exception:
+                    pass
+        return False
+
+    def _content_hash(self, path):
+        md5 = hashlib.md5()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), ""):
+                md5.update(chunk)
+        return md5.hexdigest()
+
+    def _hash_record_path(self, path):
+        name = hashlib.md5(os.path.abspath(path)).hexdigest() + HASH_FILE_EXT
+        return os.path.join(INDEX_CACHE_DIR, name)
+
+    def file_hash(self, path):
+        """
+        md5 of the content of path, the key of its cached sections. It is
+        saved with the path, size, mtime and inode of the file and computed
+        again only once one of them changes.
+        """
+
+        file_stat = os.stat(path)
+        key = {"path": os.path.abspath(path), "size": file_stat.st_size
+               , "mtime": file_stat.st_mtime, "inode": file_stat.st_ino}
+        record_path = self._hash_record_path(path)
+        try:
+            with open(record_path, "r") as f:
+                saved = json.load(f)
+            if saved["version"] == HASH_VERSION and saved["key"] == key:
+                return saved["hash"].encode("utf-8")
+        except Exception:
+            pass
+
+        file_hash = self._content_hash(path)
+        tmp_path = "%s.%d.tmp"%(record_path, os.getpid())
+        try:
+            if not os.path.isdir(INDEX_CACHE_DIR):
+                os.makedirs(INDEX_CACHE_DIR)
+            with open(tmp_path, "w") as f:
+                json.dump({"version": HASH_VERSION, "key": key, "hash": file_hash}, f)
+            os.rename(tmp_path, record_path)
+        except Exception:
+            try:
+                os.remove(tmp_path)
+            except Exception:
+                pass
+        return file_hash
+
+    def _cache_path(self, file_hash, name):
+        return os.path.join(INDEX_CACHE_DIR, "%s-%s%s"%(file_hash, name, CACHE_FILE_EXT))
+
+    def load_cache(self, file_hash, name):
+        """
+        Returns (True, data) saved by save_cache, (False, None) if there is
+        no cache or it was written by another version.
+        """
+
+        cache_path = self._cache_path(file_hash, name)
+        try:
+            with open(cache_path, "rb") as f:
+                if f.readline() != CACHE_HEADER:
+                    return False, None
+                data = marshal.load(f)
+        except Exception:
+            return False, None
+
+        try:
+            # recently used, see prune_cache
+            os.utime(cache_path, None)
+        except Exception:
+            pass
+        return True, data
+
+    def save_cache(self, file_hash, name, data):
+        cache_path = self._cache_path(file_hash, name)
+        tmp_path = "%s.%d.tmp"%(cache_path, os.getpid())
+        try:
+            if not os.path.isdir(INDEX_CACHE_DIR):
+                os.makedirs(INDEX_CACHE_DIR)
+            with open(tmp_path, "wb") as f:
+                f.write(CACHE_HEADER)
+                marshal.dump(data, f)
+            os.rename(tmp_path, cache_path)
+            return True
+        except Exception:
+            try:
+                os.remove(tmp_path)
+            except Exception:
+                pass
+        return False
+
+    def prune_cache(self):
+        """
+        Remove the saved hashes of files which no longer exist, then the least
+        recently used cached sections while they take more than
+        CACHE_MAX_BYTES.
+        """
+
+        try:
+            names = os.listdir(INDEX_CACHE_DIR)
+        except Exception:
+            return
+
+        caches = []
+        total = 0
+        for name in names:
+            path = os.path.join(INDEX_CACHE_DIR, name)
+            try:
+                if name.endswith(HASH_FILE_EXT):
+                    with open(path, "r") as f:
+                        saved = json.load(f)
+                    if not os.path.exists(saved["key"]["path"]):
+                        os.remove(path)
+                elif name.endswith(CACHE_FILE_EXT):
+                    file_stat = os.stat(path)
+                    caches.append((file_stat.st_mtime, file_stat.st_size, path))
+                    total += file_stat.st_size
+            except Exception:
+                continue
+
+        caches.sort()
+        for mtime, size, path in caches:
+            if total <= CACHE_MAX_BYTES:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except Exception:
+                pass
+
+    def _manifest_path(self, dir_path):
+        name = hashlib.md5(os.path.abspath(dir_path)).hexdigest() + MANIFEST_FILE_EXT
+        return os.path.join(INDEX_CACHE_DIR, name)
+
+    def load_cluster_manifest(self, dir_path):
+        """
+        {file: entry} saved by save_cluster_manifest for dir_path, {} if
+        there is none.
+        """
+
+        try:
+            with open(self._manifest_path(dir_path), "r") as f:
+                saved = json.load(f)
+            if saved["version"] == MANIFEST_VERSION \
+                    and saved["path"] == os.path.abspath(dir_path):
+                return saved["files"]
+        except Exception:
+            pass
+        return {}
+
+    def save_cluster_manifest(self, dir_path, manifest):
+        saved = {"version": MANIFEST_VERSION
+                 , "path": os.path.abspath(dir_path)
+                 , "files": manifest}
+        manifest_path = self._manifest_path(dir_path)
+        tmp_path = "%s.%d.tmp"%(manifest_path, os.getpid())
+        try:
+            if not os.path.isdir(INDEX_CACHE_DIR):
+                os.makedirs(INDEX_CACHE_DIR)
+            with open(tmp_path, "w") as f:
+                json.dump(saved, f)
+            os.rename(tmp_path, manifest_path)
+            return True
+        except Exception:
+            try:
+                os.remove(tmp_path)
+            except Exception:
+                pass
+        return False
+
+    def get_cluster_file_info(self, file, manifest):
+        """
+        (is collectinfo, timestamp) of file. Taken from manifest while the
+        file keeps its size and mtime, otherwise found out from the file and
+        stored in manifest.
+        """
+
+        try:
+            file_stat = os.stat(file)
+        except Exception:
+            return False, ""
+
+        entry = manifest.get(file)
+        if entry and entry["size"] == file_stat.st_size \
+                and entry["mtime"] == file_stat.st_mtime:
+            return entry["cluster"], entry["timestamp"].encode("utf-8")
+
+        try:
+            is_cluster = self.is_cluster_log_file(file)
+        except Exception:
+            is_cluster = False
+        timestamp = self.get_timestamp(file) if is_cluster else ""
+        manifest[file] = {"size": file_stat.st_size, "mtime": file_stat.st_mtime
+                          , "cluster": is_cluster, "timestamp": timestamp}
+        return is_cluster, timestamp
+
     def generate_server_log_indices(self, file_path):
-        indices = {}
+        """
+        Index of a server log: sorted list of (minute, offset of the first
+        line logged in that minute).
+
+        The index is saved alongside the log keyed by its path, size, mtime
+        and inode. A saved index is reused as is while the log is unchanged
+        and extended from its last entry if the log has only grown.
+
+        Offsets in the index of a compressed log are decompressed offsets,
+        its block index (see CompressedLog) is saved with it.
+        """
+
+        try:
+            file_stat = os.stat(file_path)
+        except Exception:
+            return []
+
+        compressed = is_compressed(file_path)
+        indices = []
+        saved = self._load_server_log_index(file_path)
+        if saved and saved["inode"] == file_stat.st_ino \
+                and saved["size"] <= file_stat.st_size:
+            unchanged = saved["size"] == file_stat.st_size \
+                and saved["mtime"] == file_stat.st_mtime
+            if unchanged or not compressed:
+                indices = [(datetime.datetime.utcfromtimestamp(tm), pos)
+                           for tm, pos in saved["indices"]]
+            if unchanged and compressed and "blocks" in saved:
+                f = CompressedLog(file_path)
+                f.blocks.load(saved["blocks"])
+                f.close()
+                return indices
+            if unchanged and not compressed:
+                return indices
+
+        if compressed:
+            f = CompressedLog(file_path)
+            try:
+                indices = self._scan_server_log_indices(f)
+                blocks = f.blocks.saved()
+            finally:
+                f.close()
+            if indices:
+                self._save_server_log_index(file_path, file_stat, indices, blocks=blocks)
+            return indices
+
+        indices = self._build_server_log_indices(file_path, indices)
+        if indices:
+            self._save_server_log_index(file_path, file_stat, indices)
+        return indices
+
+    def _scan_server_log_indices(self, f):
+        """
+        Index a log which can only be read forward in one pass. The lines
+        of a piece are looked at only if its last line is in a later minute
+        than the last entry.
+        """
+
+        indices = []
+        last_timestamp = None
+        offset = 0
+        rest = ""
+        while True:
+            data = f.read(SCAN_BYTES)
+            piece = rest + data
+            if not piece:
+                break
+            end = piece.rfind("\n") + 1
+            if not data:
+                end = len(piece)
+            if not end:
+                rest = piece
+                continue
+            rest = piece[end:]
+
+            last_line = piece[piece.rfind("\n", 0, end - 1) + 1:end]
+            try:
+                tm = self.parse_dt(last_line, dt_len=INDEX_DT_LEN)
+            except Exception:
+                tm = None
+            if tm is None or last_timestamp is None or tm > last_timestamp:
+                line_start = 0
+                while line_start < end:
+                    line_end = piece.find("\n", line_start, end) + 1 or end
+                    try:
+                        tm = self.parse_dt(piece[line_start:line_end], dt_len=INDEX_DT_LEN)
+                        if last_timestamp is None or tm > last_timestamp:
+                            indices.append((tm, offset + line_start))
+                            last_timestamp = tm
+                    except Exception:
+                        # not a timestamped line
+                        pass
+                    line_start = line_end
+
+            offset += end
+            if not data:
+                break
+        return indices
+
+    def _build_server_log_indices(self, file_path, indices):
+        """
+        Binary search the log for the first line of every minute after the
+        last entry of indices.
+        """
+
+        indices = list(indices)
         try:
             f = open(file_path, 'r')
-            start_timestamp = self.parse_dt(f.readline(), dt_len=INDEX_DT_LEN)
-            indices[start_timestamp.strftime(DT_FMT)] = 0
             min_seek_pos = 0
+            if indices:
+                # resume only if the last indexed line is still there
+                last_timestamp, min_seek_pos = indices[-1]
+                f.seek(min_seek_pos)
+                if self.parse_dt(f.readline(), dt_len=INDEX_DT_LEN) != last_timestamp:
+                    indices = []
+                    min_seek_pos = 0
+
+            if not indices:
+                f.seek(0,0)
+                last_timestamp = self.parse_dt(f.readline(), dt_len=INDEX_DT_LEN)
+                indices.append((last_timestamp, 0))
+
             f.seek(0,2)
             self.set_next_line(f,0)
             last_pos = f.tell()
-            f.seek(0,0)
-            last_timestamp = start_timestamp
+            f.seek(min_seek_pos,0)
 
             while True:
                 if last_pos<(min_seek_pos+STEP):
@@ -1036,10 +1573,15 @@ class LogReader(object):
                 pos, tm = self.get_next_timestamp(f, min_seek_pos, max_seek_pos, last_timestamp)
                 if not tm and not pos:
                     break
-                indices[tm.strftime(DT_FMT)] = pos
+                indices.append((tm, pos))
                 f.seek(pos)
                 min_seek_pos = pos
                 last_timestamp = tm
         except Exception:
             pass
+        finally:
+            try:
+                f.close()
+            except Exception:
+                pass
         return indices
@@ -0,0 +1,253 @@
+"""
+Find the lines of a server log that can match a grep.
+
+LogScanner maps the log with mmap and runs one compiled pattern, the
+alternation of every search term, over the mapped bytes. The regex engine
+skips over lines without any search term, only lines holding a match are
+cut out as Python strings. Ignore terms are compiled the same way and
+checked on those lines only.
+
+In follow mode the scanner stops at the last complete line, remap picks up
+the lines written since.
+
+A compressed log can not be mapped, it is read a window of lines at a time
+and each window is scanned the same way.
+"""
+
+__author__ = 'aerospike'
+
+import mmap
+import re
+from lib.compressedlog import CompressedLog
+
+# decompressed bytes per window of a compressed log
+WINDOW_BYTES = 4 * 1024 * 1024
+
+def _term_pattern(term, is_casesensitive):
+    # case sensitive terms are plain substrings, case insensitive terms have
+    # always been matched with re.search
+    if is_casesensitive:
+        return re.escape(term)
+    try:
+        re.compile(term)
+        return term
+    except re.error:
+        return re.escape(term)
+
+def compile_terms(terms, is_casesensitive=True):
+    """
+    Compile terms into one pattern matching any of them, None if there are
+    no terms. The pattern is searched over many lines at once, MULTILINE
+    keeps ^ and $ matching at every line start and end as they do on a
+    single line.
+    """
+
+    if not terms:
+        return None
+    flags = re.MULTILINE if is_casesensitive else re.IGNORECASE | re.MULTILINE
+    return re.compile("|".join("(?:%s)"%(_term_pattern(term, is_casesensitive))
+                               for term in terms), flags)
+
+class LogScanner(object):
+    """
+    Line reader over file_stream between byte offsets start and end (both
+    at line starts). read_line returns the next line containing a search
+    term, or every line if read_all_lines is set; is_match tells if such a
+    line passes the is_and and ignore checks.
+    """
+
+    def __init__(self, file_stream, start=0, end=None, search_strs=[]
+                 , ignore_strs=[], is_and=False, is_casesensitive=True
+                 , read_all_lines=False, follow=False):
+        self._file_stream = file_stream
+        self.read_all_lines = read_all_lines
+        self.search_re = compile_terms(search_strs, is_casesensitive)
+        self.ignore_re = compile_terms(ignore_strs, is_casesensitive)
+        self.all_res = None
+        if is_and and len(search_strs) > 1:
+            self.all_res = [compile_terms([term], is_casesensitive)
+                            for term in search_strs]
+
+        # offset of _map in the file, and the file object if _map is a
+        # window of a compressed log
+        self._base = 0
+        self._stream = None
+        if isinstance(file_stream, CompressedLog):
+            self._stream = file_stream
+            self._stream_end = end
+            self._rest = ""
+            self._base = start
+            file_stream.seek(start)
+            self._map = ""
+            size = start = end = 0
+        else:
+            try:
+                self._map = mmap.mmap(file_stream.fileno(), 0
+                                      , access=mmap.ACCESS_READ)
+                size = len(self._map)
+            except (ValueError, EnvironmentError):
+                # empty file
+                self._map = None
+                size = 0
+
+        # a scan up to a given end does not follow
+        self.follow = follow and end is None and self._stream is None
+        self._pos = min(start, size)
+        self._end = size if end is None else min(end, size)
+        if self.follow and self._map is not None:
+            # a line still being written is read once it is complete
+            self._end = self._map.rfind("\n", 0, self._end) + 1
+            self._pos = min(self._pos, self._end)
+        if not read_all_lines and self.search_re is None:
+            # nothing can match
+            self._pos = self._end
+            self._stream = None
+        self._line = None
+        self._pushed_back = False
+
+    def _line_at(self, line_start):
+        line_end = self._map.find("\n", line_start, self._end)
+        if line_end < 0:
+            line_end = self._end
+        else:
+            line_end += 1
+        return self._map[line_start:line_end], line_end
+
+    def _next_candidate(self):
+        while self._pos < self._end:
+            m = self.search_re.search(self._map, self._pos, self._end)
+            if not m:
+                self._pos = self._end
+                return None
+
+            line_start = self._map.rfind("\n", self._pos, m.start()) + 1
+            if not line_start:
+                line_start = self._pos
+            line, self._pos = self._line_at(line_start)
+            # a match running into the next line (e.g. \s) does not count
+            if m.end() <= self._pos or self.search_re.search(line):
+                return line
+        return None
+
+    def _next_window(self):
+        """
+        Compressed log: load the next window, ending after its last complete
+        line. False at the end.
+        """
+
+        if self._stream is None:
+            return False
+
+        self._base += self._end
+        window = self._rest
+        while True:
+            size = WINDOW_BYTES
+            if self._stream_end is not None:
+                size = min(size, self._stream_end - self._base - len(window))
+            data = self._stream.read(size) if size > 0 else ""
+            window += data
+            if not data:
+                # the last line may have no line end
+                end = len(window)
+                break
+            end = window.rfind("\n") + 1
+            if end:
+                break
+
+        self._rest = window[end:]
+        self._map = window[0:end]
+        self._pos = 0
+        self._end = end
+        return end > 0
+
+    def read_line(self):
+        if self._pushed_back:
+            self._pushed_back = False
+            return self._line
+
+        while True:
+            if self._pos >= self._end and not self._next_window():
+                line = None
+                break
+            if self.read_all_lines:
+                line, self._pos = self._line_at(self._pos)
+                break
+            line = self._next_candidate()
+            if line is not None:
+                break
+
+        self._line = line
+        return line
+
+    def seek_back(self):
+        """
+        Return the last line again from the next read_line.
+        """
+
+        if self._line is not None:
+            self._pushed_back = True
+
+    def tell(self):
+        """
+        Offset of the next line read_line looks at.
+        """
+
+        return self._base + self._pos
+
+    def remap(self):
+        """
+        Follow mode: map the file again, up to its last complete line.
+        Returns True if there are new lines to read.
+        """
+
+        if not self.follow:
+            return False
+        try:
+            new_map = mmap.mmap(self._file_stream.fileno(), 0
+                                , access=mmap.ACCESS_READ)
+        except (ValueError, EnvironmentError):
+            # still empty
+            return False
+
+        end = new_map.rfind("\n") + 1
+        if end <= self._end:
+            new_map.close()
+            return False
+
+        if self._map is not None:
+            self._map.close()
+        self._map = new_map
+        if not self.read_all_lines and self.search_re is None:
+            self._pos = end
+        self._end = end
+        return True
+
+    def mapped_end(self):
+        """
+        Offset after the last complete line mapped.
+        """
+
+        return self._base + self._end
+
+    def last_line(self):
+        """
+        Last line mapped, None if the file is empty.
+        """
+
+        if self._map is None or not self._end:
+            return None
+        return self._map[self._map.rfind("\n", 0, self._end - 1) + 1:self._end]
+
+    def is_match(self, line):
+        if self.read_all_lines:
+            return True
+        if self.all_res is not None and not all(r.search(line) for r in self.all_res):
+            return False
+        if self.ignore_re is not None and self.ignore_re.search(line):
+            return False
+        return True
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._map = None
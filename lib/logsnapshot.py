@@ -1,6 +1,8 @@
 import copy
+import re
 from lib import logutil
 from lib.logreader import LogReader
+from lib.logscan import LogScanner
 
 __author__ = 'aerospike'
 
@@ -51,16 +53,30 @@ class LogSnapshot(object):
         self.nodes = {}
         self.prefixes = {}
         self.cluster_data = {}
-        self.file_stream = open(self.cluster_file, "r")
+        # section offsets of cluster_file and the section types parsed so far
+        self.sections = None
+        self.file_hash = None
+        self.parsed_types = set()
+        self.summary_lines = {}
+        # opened by the first grep
+        self.file_stream = None
+        self.scanner = None
 
     def destroy(self):
         try:
+            if self.scanner:
+                self.scanner.close()
             if self.file_stream:
                 self.file_stream.close()
+            del self.scanner
             del self.timestamp
             del self.cluster_file
             del self.log_reader
             del self.cluster_data
+            del self.sections
+            del self.file_hash
+            del self.parsed_types
+            del self.summary_lines
             del self.nodes
             del self.prefixes
         except Exception:
@@ -85,23 +101,64 @@ class LogSnapshot(object):
     def getNodeNames(self):
         return self.get_prefixes()
 
+    def read_sections(self, types):
+        """
+        Parse the sections of the given types which are not parsed yet.
+        Parsed sections (and the section index) are cached by the hash of
+        cluster_file, a collectinfo seen before is not parsed again. The hash
+        is only computed again if the file changed (see LogReader.file_hash).
+        """
+
+        types = [t for t in types if t not in self.parsed_types]
+        if not types:
+            return
+        if self.file_hash is None:
+            self.file_hash = self.log_reader.file_hash(self.cluster_file)
+
+        missing = []
+        for section_type in types:
+            found, data = self.log_reader.load_cache(self.file_hash, section_type)
+            if found:
+                self.cluster_data.update(data)
+            else:
+                missing.append(section_type)
+
+        if missing:
+            if self.sections is None:
+                found, self.sections = self.log_reader.load_cache(self.file_hash, "sections")
+                if not found:
+                    self.sections = self.log_reader.index_sections(self.cluster_file)
+                    self.log_reader.save_cache(self.file_hash, "sections", self.sections)
+
+            data = self.log_reader.read(self.cluster_file, types=missing, sections=self.sections)
+            self.cluster_data.update(data)
+            for section_type in missing:
+                self.log_reader.save_cache(self.file_hash, section_type
+                                           , dict((k, v) for k, v in data.iteritems() if k == section_type))
+            self.log_reader.prune_cache()
+
+        self.parsed_types.update(types)
+
     def get_data(self, type="", stanza=""):
         if not type or not stanza:
             return {}
         try:
             if not self.cluster_data:
-                self.cluster_data = self.log_reader.read(self.cluster_file)
-                if self.cluster_data and "config" in self.cluster_data and "service" in self.cluster_data["config"]:
+                # nodes come from the service config (or statistics), their
+                # ids, ips and builds from the summaries
+                self.read_sections(["config", "summary"])
+                if "service" in self.cluster_data["config"]:
                     self.set_nodes(self.cluster_data["config"]["service"].keys())
-                elif self.cluster_data and "statistics" in self.cluster_data and "service" in self.cluster_data["statistics"]:
-                    self.set_nodes(self.cluster_data["statistics"]["service"].keys())
+                else:
+                    self.read_sections(["statistics"])
+                    if "service" in self.cluster_data["statistics"]:
+                        self.set_nodes(self.cluster_data["statistics"]["service"].keys())
                 self.set_node_id()
                 self.set_ip()
                 self.set_xdr_build()
                 self.set_asd_build()
                 self.set_asd_version()
-            elif type not in self.cluster_data:
-                self.cluster_data.update(self.log_reader.read(self.cluster_file))
+            self.read_sections([type])
 
             return copy.deepcopy(self.cluster_data[type][stanza])
         except Exception:
@@ -198,10 +255,16 @@ class LogSnapshot(object):
                     self.nodes[node].set_asd_version(asd_versions[node])
 
     def fetch_columns_for_nodes(self, type, stanza, header_columns, column_to_find, symbol_to_neglct):
-        summary = self.get_data(type=type, stanza=stanza)
+        key = (type, stanza)
+        if key not in self.summary_lines:
+            summary = self.get_data(type=type, stanza=stanza)
+            if summary and isinstance(summary, str):
+                self.summary_lines[key] = summary.split('\n')
+            else:
+                self.summary_lines[key] = None
+        lines = self.summary_lines[key]
         node_value = {}
-        if summary and isinstance(summary, str):
-            lines = summary.split('\n')
+        if lines:
             column_found = False
             header_search_incomplete = False
             column_to_find_index = 0
@@ -270,60 +333,37 @@ class LogSnapshot(object):
             pass
         return asd_version
 
-    def set_input(self, search_strs, ignore_str="", is_and=False, is_casesensitive=True):
-        if is_casesensitive:
-            self.search_strings=[search_str for search_str in search_strs]
-        else:
-            self.search_strings=[search_str.lower() for search_str in search_strs]
-        self.ignore_str = ignore_str
-        self.is_and = is_and
-        self.is_casesensitive = is_casesensitive
-        self.file_stream.seek(0,0)
+    def set_input(self, search_strs, ignore_strs=[], is_and=False, is_casesensitive=True):
+        if not is_casesensitive:
+            # LogScanner takes case insensitive terms as regular expressions,
+            # collectinfo grep matches plain substrings
+            search_strs = [re.escape(search_str) for search_str in search_strs]
+            ignore_strs = [re.escape(ignore_str) for ignore_str in ignore_strs]
+        if not self.file_stream:
+            self.file_stream = open(self.cluster_file, "r")
+        if self.scanner:
+            self.scanner.close()
+        self.scanner = LogScanner(self.file_stream, search_strs=search_strs, ignore_strs=ignore_strs
+                                  , is_and=is_and, is_casesensitive=is_casesensitive)
         self.show_it = self.show()
         self.count_it = self.count()
 
-    def next_line(self, read_all_lines=None):
+    def next_line(self):
         while True:
-            fail = False
-            line = self.file_stream.readline()
-            if not line:
-                return None
-            if read_all_lines:
+            line = self.scanner.read_line()
+            if line is None or self.scanner.is_match(line):
                 return line
-            if self.search_strings:
-                tmp_line = copy.deepcopy(line)
-                if not self.is_casesensitive:
-                    tmp_line = tmp_line.lower()
-                for search_str in self.search_strings:
-                    if search_str in tmp_line:
-                        if not self.is_and:
-                            fail = False
-                            break
-                    else:
-                        fail = True
-                        if self.is_and:
-                            break
-                if fail:
-                    continue
-            if self.ignore_str and self.ignore_str in line:
-                continue
-            if not fail:
-                break
-
-        return line
 
     def show(self):
+        """
+        Yields the matching lines one by one, Logger.grep pages them.
+        """
+
         line = self.next_line()
-        show_result = ""
         while line:
-            try:
-                show_result += line
-            except Exception:
-                show_result = line
+            yield line
             line = self.next_line()
 
-        yield show_result
-
     def show_iterator(self):
         return self.show_it
 
@@ -0,0 +1,153 @@
+"""
+Run the scan of one server log in its own process.
+
+A ServerLog iterator (show, count or diff) is CPU bound: reading, filtering
+and timestamp parsing of every line. LogScanWorker forks a process for a
+server log which runs set_input and the iterator, and streams the
+(timestamp, result) pairs back in batches, so the logs of several nodes are
+scanned in parallel while Logger.server_log_merger merges them exactly as
+it merges in-process iterators. At most max_workers() logs get a process,
+the others are scanned in the parent. An error in the child is raised again
+in the parent as a LogScanError.
+"""
+
+__author__ = 'aerospike'
+
+import copy
+import multiprocessing
+import os
+import Queue
+import traceback
+from time import time
+from lib.compressedlog import open_log
+
+# (timestamp, result) pairs sent per batch
+BATCH_SIZE = 256
+# send a partial batch if it has been waiting this long (seconds), keeps
+# paged grep output flowing when matches are sparse
+BATCH_INTERVAL = 0.2
+# batches buffered per worker before it blocks, bounds memory if the
+# consumer stops reading (e.g. a paged grep that is not continued)
+QUEUE_BATCHES = 16
+
+class LogScanError(Exception):
+    """
+    The scan of a server log failed in its worker process, the message
+    holds the child's traceback.
+    """
+    pass
+
+def can_use_workers():
+    # the ServerLog is handed to the worker by fork, not by pickling
+    return hasattr(os, "fork")
+
+def max_workers():
+    """
+    Number of logs scanned in worker processes at the same time.
+    """
+
+    try:
+        return multiprocessing.cpu_count()
+    except NotImplementedError:
+        return 1
+
+def _is_last(tm):
+    # show yields (None, None) forever once it is done
+    return not tm
+
+def _scan(file_handler, iterator_name, input_args, queue, batch_size
+          , batch_interval):
+    try:
+        # do not share the file offset with the parent
+        file_handler.file_stream = open_log(file_handler.server_file)
+        file_handler.set_input(**input_args)
+        iterator = getattr(file_handler, iterator_name)()
+
+        batch = []
+        last_sent = time()
+        for tm, res in iterator:
+            # iterators reuse their result dicts
+            batch.append((tm, copy.deepcopy(res)))
+            if _is_last(tm):
+                break
+            if len(batch) >= batch_size or time() - last_sent >= batch_interval:
+                queue.put(batch)
+                batch = []
+                last_sent = time()
+
+        if batch:
+            queue.put(batch)
+    except Exception:
+        # raised again by the parent, as the in-process iterator would
+        queue.put(LogScanError("scan of %s failed:\n%s"
+                               %(file_handler.display_name, traceback.format_exc())))
+    except BaseException:
+        # interrupted, the parent sees the worker die
+        return
+
+    try:
+        queue.put(None)
+        queue.close()
+        queue.join_thread()
+    except BaseException:
+        pass
+
+class LogScanWorker(object):
+    """
+    Iterator over getattr(file_handler, iterator_name)() after
+    file_handler.set_input(**input_args), computed in a child process.
+    The child starts immediately so several workers scan concurrently.
+    """
+
+    def __init__(self, file_handler, iterator_name, input_args
+                 , batch_size=BATCH_SIZE, batch_interval=BATCH_INTERVAL):
+        self.display_name = file_handler.display_name
+        self._batch = []
+        self._done = False
+        self._queue = multiprocessing.Queue(QUEUE_BATCHES)
+        self._process = multiprocessing.Process(
+            target=_scan, args=(file_handler, iterator_name, input_args
+                                , self._queue, batch_size, batch_interval))
+        self._process.daemon = True
+        self._process.start()
+
+    def __iter__(self):
+        return self
+
+    def _fetch(self):
+        while True:
+            try:
+                return self._queue.get(timeout=1.0)
+            except Queue.Empty:
+                if not self._process.is_alive():
+                    try:
+                        return self._queue.get_nowait()
+                    except Queue.Empty:
+                        return LogScanError("scan of %s exited with code %s"
+                                            %(self.display_name, self._process.exitcode))
+
+    def next(self):
+        while not self._batch:
+            if self._done:
+                raise StopIteration
+            batch = self._fetch()
+            if batch is None:
+                self.close()
+                raise StopIteration
+            if isinstance(batch, LogScanError):
+                self.close()
+                raise batch
+            self._batch = batch
+            self._batch.reverse()
+
+        return self._batch.pop()
+
+    def close(self):
+        if self._done:
+            return
+        self._done = True
+        self._batch = []
+        if self._process.is_alive():
+            self._process.terminate()
+        self._process.join()
+        self._queue.close()
@@ -15,8 +15,8 @@ import copy
 import datetime
 import re
 
-from lib import citrusleaf
 from lib import util
+from lib.infopool import InfoConnectionPool
 import lib
 from telnetlib import Telnet
 from time import time
@@ -43,6 +43,44 @@ def getfqdn(address, timeout=0.5):
 
     return result[0]
 
+# Seconds to cache responses of info commands that rarely or never change.
+STATIC_INFO_TTL = {
+    'node':300.0
+    , 'build':60.0
+    , 'version':60.0
+    , 'edition':60.0
+    , 'build_os':60.0
+    , 'features':60.0
+    , 'service':60.0
+    , 'namespaces':5.0
+}
+# Commands that change state on the node, never cached.
+UNCACHED_INFO_PREFIXES = ('set-', 'dun', 'undun', 'recluster', 'dump-'
+                          , 'log-set', 'tip', 'jem-', 'sindex-repair'
+                          , 'xdr-command', 'truncate')
+# Everything else (statistics, configs, latency...) is only cached long
+# enough to coalesce the calls of a single command.
+DEFAULT_INFO_TTL = 0.5
+
+def _command_ttl(command):
+    if command in STATIC_INFO_TTL:
+        return STATIC_INFO_TTL[command]
+    if command.startswith(UNCACHED_INFO_PREFIXES):
+        return 0
+    return DEFAULT_INFO_TTL
+
+def info_cache_ttl(key):
+    """
+    Cache policy for the (node, command[, port]) keys of Node info calls.
+    """
+
+    command = key[1]
+    if isinstance(command, tuple):
+        if not command:
+            return 0
+        return min(map(_command_ttl, command))
+    return _command_ttl(command)
+
 def return_exceptions(func):
     def wrapper(*args, **kwargs):
         try:
@@ -78,6 +116,9 @@ class Node(object):
         self._use_telnet = use_telnet
         self.user = user
         self.password = password
+        # port -> InfoConnectionPool, see _getInfoPool
+        self._info_pools = {}
+        self._info_pools_lock = threading.Lock()
         # hack, _key needs to be defines before info calls... but may have
         # wrong (localhost) address before infoService is called. Will set
         # again after that call.
@@ -145,6 +186,35 @@ class Node(object):
     def __str__(self):
         return self.sockName()
 
+    def _getInfoPool(self, port):
+        """
+        Return the info connection pool for port, replacing it if this node's
+        ip has changed since the pool was created.
+        """
+
+        with self._info_pools_lock:
+            pool = self._info_pools.get(port, None)
+            if pool is None or pool.host != self.ip:
+                if pool is not None:
+                    pool.close()
+                pool = InfoConnectionPool(self.ip, port, user=self.user
+                                          , password=self.password)
+                self._info_pools[port] = pool
+
+        return pool
+
+    def close(self):
+        """
+        Close any pooled info connections held by this node.
+        """
+
+        with self._info_pools_lock:
+            pools = self._info_pools.values()
+            self._info_pools = {}
+
+        for pool in pools:
+            pool.close()
+
     def isXDREnabled(self):
         config = self.infoGetConfig('xdr')
         if isinstance(config, Exception):
@@ -164,7 +234,7 @@ class Node(object):
         return (feature in features)
 
     @return_exceptions
-    @util.cached
+    @util.cached_with(ttl=info_cache_ttl, name='info-telnet')
     def _infoTelnet(self, command, port = None):
         # TODO: Handle socket failures
         if port == None:
@@ -185,22 +255,27 @@ class Node(object):
                 raise IOError("Could not connect to node %s"%self.ip)
         return result
 
-    @return_exceptions
-    @util.cached
-    def _infoCInfo(self, command, port = None):
-        # TODO: citrusleaf.py does not support passing a timeout default is 0.5s
-        if port == None:
-            port = self.port
-
-        result = citrusleaf.citrusleaf_info(self.ip, port, command
-                                            , user=self.user
-                                            , password=self.password)
+    def _infoCInfoRequest(self, command, port):
+        # TODO: pooled connections use citrusleaf's default 0.5s timeout
+        result = self._getInfoPool(port).info(command)
         if result != -1 and result is not None:
             return result
         else:
             raise IOError(
                 "Invalid command or Could not connect to node %s "%self.ip)
 
+    # keyed by (node, command, port), shared with the cluster's info event
+    # loop through cachedInfo and infoResponse
+    info_cache = util.cached(_infoCInfoRequest, ttl=info_cache_ttl
+                             , name='info')
+
+    @return_exceptions
+    def _infoCInfo(self, command, port = None):
+        if port == None:
+            port = self.port
+
+        return Node.info_cache(self, command, port)
+
     @return_exceptions
     def info(self, command):
         """
@@ -215,7 +290,76 @@ class Node(object):
             return self._infoCInfo(command)
 
     @return_exceptions
-    @util.cached
+    def infoBatch(self, commands):
+        """
+        Run several info commands in a single request to this node.
+
+        Arguments:
+        commands -- iterable of info commands
+
+        Returns:
+        dict -- command -> response, commands the node did not answer map to
+                an IOError
+        """
+        commands = tuple(util.unique(commands))
+        if not commands:
+            return {}
+
+        if self._use_telnet:
+            return dict((command, self._infoTelnet(command))
+                        for command in commands)
+
+        responses = self._infoCInfo(commands)
+        if isinstance(responses, Exception):
+            return responses
+
+        return self._splitInfoBatch(commands, responses)
+
+    def _splitInfoBatch(self, commands, responses):
+        results = {}
+        for command in commands:
+            if command in responses:
+                results[command] = responses[command]
+            else:
+                results[command] = IOError(
+                    "No response for %s from node %s"%(command, self.ip))
+        return results
+
+    def cachedInfo(self, names):
+        """
+        Raw response to names if it is still in the info cache, else None.
+        """
+
+        hit, response = Node.info_cache.peek((self, names, self.port))
+        if hit:
+            return response
+        return None
+
+    def infoResponse(self, names, response, store=True):
+        """
+        Convert a raw response from the info event loop (see
+        lib.infoloop.info_fanout) into what info(names) or infoBatch(names)
+        would have returned. Unless store is False the response is cached
+        like info would have cached it.
+        """
+
+        if response == -1 or response is None:
+            response = IOError(
+                "Invalid command or Could not connect to node %s "%self.ip)
+
+        if isinstance(response, Exception):
+            self.alive = False
+            return response
+
+        if store:
+            Node.info_cache[(self, names, self.port)] = response
+
+        if isinstance(names, tuple):
+            return self._splitInfoBatch(names, response)
+        return response
+
+    @return_exceptions
+    @util.cached_with(ttl=info_cache_ttl, name='xdr-info')
     def xdrInfo(self, command):
         """
         asinfo -p [xdr-port] equivalent
@@ -325,12 +469,21 @@ class Node(object):
         if isinstance(namespaces, Exception):
             return namespaces
 
+        responses = self.infoBatch(["namespace/%s"%(ns) for ns in namespaces])
+        if isinstance(responses, Exception):
+            return responses
+
         stats = {}
         for ns in namespaces:
-            stats[ns] = self.infoNamespaceStatistics(ns)
+            stats[ns] = self._infoBatchToDict(responses["namespace/%s"%(ns)])
 
         return stats
 
+    def _infoBatchToDict(self, response):
+        if isinstance(response, Exception):
+            return response
+        return util.info_to_dict(response)
+
     @return_exceptions
     def infoSetStatistics(self):
         stats = self.info("sets")
@@ -395,13 +548,7 @@ class Node(object):
                 config[stanza] = {namespace:util.info_to_dict(
                     self.info("get-config:context=namespace;id=%s"%namespace))}
             else:
-                namespace_configs = {}
-                namespaces = self.infoNamespaces()
-                for namespace in namespaces:
-                    namespace_config = self.infoGetConfig('namespace', namespace)
-                    namespace_config = namespace_config['namespace'][namespace]
-                    namespace_configs[namespace] = namespace_config
-                config['namespace'] = namespace_configs
+                config['namespace'] = self._infoNamespaceConfigs()[0]
 
         elif stanza == '':
             config['service'] = util.info_to_dict(self.info("get-config:"))
@@ -409,18 +556,42 @@ class Node(object):
             config[stanza] = util.info_to_dict(
                 self.info("get-config:context=%s"%stanza))
         elif stanza == "all":
-            namespace_configs = {}
-            namespaces = self.infoNamespaces()
-            for namespace in namespaces:
-                namespace_config = self.infoGetConfig('namespace', namespace)
-                namespace_config = namespace_config['namespace'][namespace]
-                namespace_configs[namespace] = namespace_config
+            service_cmd = "get-config:context=service"
+            namespace_configs, responses = self._infoNamespaceConfigs(
+                [service_cmd])
             config['namespace'] = namespace_configs
-            config['service'] = self.infoGetConfig("service")
+            service_config = self._infoBatchToDict(responses[service_cmd])
+            if isinstance(service_config, Exception):
+                config['service'] = service_config
+            else:
+                config['service'] = {'service':service_config}
             # Server lumps this with service
             # config["network"] = self.infoGetConfig("network")
         return config
 
+    def _infoNamespaceConfigs(self, extra_commands=None):
+        """
+        Fetch the config of every namespace, along with any extra_commands,
+        in a single batch.
+
+        Returns:
+        tuple -- ({namespace:config, ...}, {command:response, ...})
+        """
+
+        namespaces = self.infoNamespaces()
+        commands = ["get-config:context=namespace;id=%s"%(namespace)
+                    for namespace in namespaces]
+        responses = self.infoBatch(commands + (extra_commands or []))
+        if isinstance(responses, Exception):
+            raise responses
+
+        namespace_configs = {}
+        for namespace, command in zip(namespaces, commands):
+            if isinstance(responses[command], Exception):
+                raise responses[command]
+            namespace_configs[namespace] = util.info_to_dict(responses[command])
+        return namespace_configs, responses
+
     def update_total_latency(self, t_rows, row):
         if not row or not isinstance(row, list):
             return t_rows
@@ -619,11 +790,16 @@ class Node(object):
     def infoHistogram(self, histogram):
         namespaces = self.infoNamespaces()
 
+        commands = ["hist-dump:ns=%s;hist=%s"%(namespace, histogram)
+                    for namespace in namespaces]
+        responses = self.infoBatch(commands)
+        if isinstance(responses, Exception):
+            return responses
+
         data = {}
-        for namespace in namespaces:
+        for namespace, command in zip(namespaces, commands):
             try:
-                datum = self.info("hist-dump:ns=%s;hist=%s"%(namespace
-                                                             , histogram))
+                datum = responses[command]
                 datum = datum.split(',')
                 datum.pop(0) # don't care about ns, hist_name, or length
                 width = int(datum.pop(0))
@@ -1,46 +1,79 @@
-import hashlib
 import pipes
 import shlex
 import subprocess
 
 __author__ = 'aerospike'
 
+import bisect
 import copy
 import datetime
+import os
 import re
-from lib.logreader import COUNT_RESULT_KEY, TOTAL_ROW_HEADER, END_ROW_KEY
+import time
+from lib.logreader import COUNT_RESULT_KEY, TOTAL_ROW_HEADER, END_ROW_KEY, \
+    UNIQ_SUPPRESSED_HEADER, dt_to_epoch
+from lib.compressedlog import CompressedLog, open_log
 from lib.loglatency import LogLatency
+from lib.logscan import LogScanner
+from lib.uniqlines import UniqLines
 
 DT_FMT = "%b %d %Y %H:%M:%S"
-READ_BLOCK_BYTES = 4096
-RETURN_REQUIRED_EVERY_NTH_BLOCK = 5
 TIME_ZONE = "GMT"
+# value formats diff understands, %s is the last search string. The first
+# one matching the first line is used for the whole log.
+DIFF_PATTERNS = ['%s (\d+)', '%s \(([0-9,\s]+)\)', '(\d+)\((\d+)\) %s', '%s \((\d+)']
+# follow mode: seconds between checks of a log for new lines
+FOLLOW_POLL_SECONDS = 1
+# follow mode: end time if no duration is given
+FOLLOW_END_TM = datetime.datetime(9999, 12, 31)
+
+def compile_in_order(sub_strs):
+    """
+    Pattern matching lines holding sub_strs one after the other (an empty
+    string ends the list).
+    """
+
+    terms = []
+    for sub_str in sub_strs:
+        if not sub_str:
+            break
+        terms.append(re.escape(sub_str))
+    return re.compile(".*?".join(terms), re.DOTALL)
+
+def diff_values(m):
+    # groups are a single number, a comma separated list or two numbers
+    return [int(v) for v in ",".join(m.groups()).split(",")]
 
 class ServerLog(object):
     def __init__(self, display_name, server_file, log_reader):
         self.display_name = display_name
         self.server_file = server_file
         self.log_reader = log_reader
-        self.indices = self.log_reader.generate_server_log_indices(self.server_file)
-        self.file_stream = open(self.server_file, "r")
-        self.file_stream.seek(0,0)
-        self.server_start_tm = self.log_reader.parse_dt(self.file_stream.readline())
-        self.server_end_tm = self.log_reader.parse_dt(self.log_reader.read_next_line(self.file_stream, jump=0, whence=2))
+        self.file_stream = open_log(self.server_file)
+        self.read_log_info()
         self.log_latency = LogLatency(self.log_reader)
+        self.scanner = None
+        self.follow = False
 
     def destroy(self):
         try:
+            if self.scanner:
+                self.scanner.close()
             if self.file_stream:
                 self.file_stream.close()
             del self.display_name
             del self.server_file
             del self.log_reader
             del self.indices
+            del self.index_tms
             del self.file_stream
             del self.prefixes
             del self.server_start_tm
             del self.server_end_tm
+            del self.file_inode
+            del self.file_size
             del self.log_latency
+            del self.scanner
             del self.indices
             del self.file_stream
             del self.search_strings
@@ -52,14 +85,51 @@ class ServerLog(object):
             del self.read_all_lines
             del self.diff_it
             del self.show_it
-            del self.latency_it
+            del self.latency_args
             del self.count_it
             del self.slice_show_count
-            del self.uniq_lines_track
+            del self.uniq_lines
+            del self.follow
+            del self.follow_epoch
         except Exception:
             pass
 
+    def read_log_info(self):
+        """
+        Read the index, first and last timestamps of the log open in
+        file_stream.
+        """
+
+        self.indices = self.log_reader.generate_server_log_indices(self.server_file)
+        self.index_tms = [tm for tm, _ in self.indices]
+        file_stat = os.fstat(self.file_stream.fileno())
+        self.file_inode = file_stat.st_ino
+        self.file_size = file_stat.st_size
+        self.file_stream.seek(0,0)
+        self.server_start_tm = self.log_reader.parse_dt(self.file_stream.readline())
+        self.server_end_tm = self.log_reader.parse_dt(self.log_reader.read_next_line(self.file_stream, jump=0, whence=2))
+
+    def refresh(self):
+        """
+        Catch up with a log which grew, or was rotated (new inode), since it
+        was last read.
+        """
+
+        try:
+            file_stat = os.stat(self.server_file)
+        except OSError:
+            # rotated away, the new log is not there yet
+            return
+
+        if file_stat.st_ino != self.file_inode:
+            self.file_stream.close()
+            self.file_stream = open_log(self.server_file)
+        elif file_stat.st_size == self.file_size:
+            return
+        self.read_log_info()
+
     def get_start_tm(self, start_tm="head"):
+        self.refresh()
         if start_tm == "head":
             return self.server_start_tm
         else:
@@ -67,15 +137,23 @@ class ServerLog(object):
 
     def set_start_and_end_tms(self, start_tm, duration=""):
         self.process_start_tm = start_tm
-        if self.process_start_tm > self.server_end_tm:
+        if self.process_start_tm > self.server_end_tm and not self.follow:
             self.process_start_tm = self.server_end_tm + self.log_reader.parse_timedelta("10")
 
         if duration:
             duration_tm = self.log_reader.parse_timedelta(duration)
             self.process_end_tm = self.process_start_tm + duration_tm
-        if not duration or self.process_end_tm > self.server_end_tm:
+        if self.follow:
+            # lines not written yet are in the range
+            if not duration:
+                self.process_end_tm = FOLLOW_END_TM
+        elif not duration or self.process_end_tm > self.server_end_tm:
             self.process_end_tm = self.server_end_tm + self.log_reader.parse_timedelta("10")
 
+        # next_line compares line timestamps as epoch seconds
+        self.process_start_epoch = dt_to_epoch(self.process_start_tm)
+        self.process_end_epoch = dt_to_epoch(self.process_end_tm)
+
     def run_linux_cmd(self, cmd):
         cmd = pipes.quote(" ".join(cmd))
         cmd = ['sh', '-c', "'%s'"%(cmd)]
@@ -101,28 +179,45 @@ class ServerLog(object):
                 #print "Error in system grep command, reading file line by line.\n"
                 self.set_file_stream(system_grep=False)
         else:
-            self.start_hr_tm = self.neglect_minutes_seconds_time(self.process_start_tm)
-            self.server_start_hr_tm = self.neglect_minutes_seconds_time(self.server_start_tm)
-            self.server_end_hr_tm = self.neglect_minutes_seconds_time(self.server_end_tm)
-
-            if self.start_hr_tm.strftime(DT_FMT) in self.indices:
-                self.file_stream.seek(self.indices[self.start_hr_tm.strftime(DT_FMT)])
-            elif self.start_hr_tm < self.server_start_hr_tm:
-                self.file_stream.seek(0)
-            elif self.start_hr_tm > self.server_end_hr_tm:
-                self.file_stream.seek(0,2)
+            # first indexed minute at or after the start minute, lines of the
+            # start minute come at or after its offset
+            start_minute_tm = self.neglect_seconds_time(self.process_start_tm)
+            i = bisect.bisect_left(self.index_tms, start_minute_tm)
+            if i < len(self.indices):
+                self.file_stream.seek(self.indices[i][1])
             else:
-                while(self.start_hr_tm < self.server_end_hr_tm):
-                    if self.start_hr_tm.strftime(DT_FMT) in self.indices:
-                        self.file_stream.seek(self.indices[self.start_hr_tm.strftime(DT_FMT)])
-                        return
-                    self.start_hr_tm = self.start_hr_tm + datetime.timedelta(hours=1)
                 self.file_stream.seek(0,2)
 
+            # lines after the end minute can not be in the range
+            end_minute_tm = self.neglect_seconds_time(self.process_end_tm)
+            j = bisect.bisect_right(self.index_tms, end_minute_tm)
+            end = self.indices[j][1] if j < len(self.indices) else None
+
+            self.set_scanner(start=self.file_stream.tell(), end=end)
+
+    def set_scanner(self, start=0, end=None):
+        if self.scanner:
+            self.scanner.close()
+        # in follow mode a scan to the end of the log goes on as it grows
+        self.scanner = LogScanner(self.file_stream, start=start, end=end
+                                  , search_strs=self.search_strings, ignore_strs=self.ignore_strs
+                                  , is_and=self.is_and, is_casesensitive=self.is_casesensitive
+                                  , read_all_lines=self.read_all_lines, follow=self.follow)
+        self.follow_epoch = None
+        if self.follow:
+            self.set_follow_end()
+
     # system_grep parameter added to test and compare with system_grep. We are not using this but keeping it here for future reference.
     def set_input(self, search_strs, ignore_strs=[], is_and=False, is_casesensitive=True, start_tm="", duration="",
                   slice_duration="10", every_nth_slice=1, upper_limit_check="", bucket_count=3, every_nth_bucket=1,
-                  read_all_lines=False, rounding_time=True, system_grep=False, uniq=False, ns=None):
+                  read_all_lines=False, rounding_time=True, system_grep=False, uniq=False, uniq_exact=False, ns=None,
+                  follow=False):
+        self.refresh()
+        if isinstance(self.file_stream, CompressedLog):
+            # grep can not read it, and it does not grow
+            system_grep = False
+        # follow reads through the scanner only
+        self.follow = follow and not system_grep
         if isinstance(search_strs, str):
             search_strs = [search_strs]
         self.search_strings=[search_str for search_str in search_strs]
@@ -135,10 +230,6 @@ class ServerLog(object):
         self.upper_limit_check = upper_limit_check
         self.read_all_lines = read_all_lines
         self.set_start_and_end_tms(start_tm=start_tm, duration=duration)
-        self.read_block = []
-        self.read_block_index = 0
-        self.read_block_size = 0
-        self.read_block_count = 0
         self.system_grep = system_grep
         self.set_file_stream(system_grep=system_grep)
         self.diff_it = self.diff()
@@ -146,56 +237,74 @@ class ServerLog(object):
         latency_start_tm = self.process_start_tm
         if latency_start_tm < self.server_start_tm:
             latency_start_tm = self.server_start_tm
-        self.latency_it = self.log_latency.compute_latency(self.show_it, self.search_strings[0], self.slice_duration, latency_start_tm,
-                                                           self.process_end_tm, bucket_count, every_nth_bucket, arg_rounding_time=rounding_time,
-                                                           arg_ns=ns)
+        # search_strings are histogram names, the iterators are made by
+        # latency_iterators
+        self.latency_args = (latency_start_tm, bucket_count, every_nth_bucket, rounding_time, ns)
         self.count_it = self.count()
         self.slice_show_count = every_nth_slice
-        self.uniq = uniq
-        self.uniq_lines_track = {}
+        self.uniq = uniq or uniq_exact
+        self.uniq_lines = UniqLines(exact=uniq_exact) if self.uniq else None
         self.read_prev_line = False
         self.prev_line = None
 
 
-    def read_line_block(self):
+    def set_follow_end(self):
+        """
+        Follow mode: take server_end_tm from the last line read so far.
+        """
+
+        line = self.scanner.last_line()
+        if not line:
+            return
         try:
-            while(True):
-                self.read_block = []
-                self.read_block = self.file_stream.readlines(READ_BLOCK_BYTES)
-                self.read_block_count += 1
-                if not self.read_block or self.read_all_lines:
-                    break
-                if self.search_strings:
-                    one_string = " ".join(self.read_block)
-                    if self.is_and:
-                        if self.is_casesensitive:
-                            if all(substring in one_string for substring in self.search_strings):
-                                break
-                        else:
-                            if all(re.search(substring, one_string, re.IGNORECASE) for substring in self.search_strings):
-                                break
-                    else:
-                        if self.is_casesensitive:
-                            if any(substring in one_string for substring in self.search_strings):
-                                break
-                        else:
-                            if any(re.search(substring, one_string, re.IGNORECASE) for substring in self.search_strings):
-                                break
-
-                    if (self.read_block_count%RETURN_REQUIRED_EVERY_NTH_BLOCK==0):
-                        line = self.read_block[-1]
-                        self.read_block = []
-                        self.read_block.append(line)
-                        break
-                else:
-                    break
+            self.server_end_tm = self.log_reader.parse_dt(line)
+            # never behind an idle poll (see wait_for_lines)
+            self.follow_epoch = max(dt_to_epoch(self.server_end_tm), self.follow_epoch)
         except Exception:
-            self.read_block = []
-        self.read_block_count = 0
-        self.read_block_index = 0
-        self.read_block_size = len(self.read_block)
+            # not a timestamped line, keep the previous end
+            return
+
+        if self.index_tms and self.neglect_seconds_time(self.server_end_tm) > self.index_tms[-1]:
+            # a new minute, extend the index
+            self.indices = self.log_reader.generate_server_log_indices(self.server_file)
+            self.index_tms = [tm for tm, _ in self.indices]
+
+    def wait_for_lines(self):
+        """
+        Follow mode: wait for the log to grow. Reopens the log if it was
+        rotated (new inode) or truncated.
+        """
+
+        time.sleep(FOLLOW_POLL_SECONDS)
+        if self.scanner.remap():
+            self.set_follow_end()
+            return
+
+        try:
+            file_stat = os.stat(self.server_file)
+        except OSError:
+            # rotated away, the new log is not there yet
+            return
+
+        if file_stat.st_ino != self.file_inode or file_stat.st_size < self.scanner.tell():
+            self.file_stream.close()
+            self.file_stream = open_log(self.server_file)
+            self.read_log_info()
+            # the whole new log is after what was read
+            self.set_scanner()
+        elif file_stat.st_size == self.scanner.mapped_end():
+            # nothing new, not even part of a line: lines written from now
+            # on are not older than now. An idle log (e.g. of a node which
+            # is down) moves on with the clock, merges with it do not wait.
+            self.follow_epoch = max(int(time.time()), self.follow_epoch)
+
+    def read_line(self, follow_until=None):
+        """
+        Next candidate line, None at the end. In follow mode it waits for
+        new lines instead, until the log has gone past follow_until (epoch
+        seconds) if that is given.
+        """
 
-    def read_line(self):
         line = None
         if self.system_grep:
             try:
@@ -211,105 +320,98 @@ class ServerLog(object):
             except Exception:
                 pass
         else:
-            if not self.read_block or self.read_block_index+1>self.read_block_size:
-                self.read_line_block()
-            if self.read_block and self.read_block_index+1<=self.read_block_size:
-                line = self.read_block[self.read_block_index]
-                self.read_block_index += 1
-
-            # try:
-            #     line = self.file_stream.readline()
-            # except:
-            #     pass
+            line = self.scanner.read_line()
+            while line is None and self.scanner.follow:
+                if follow_until is not None and self.follow_epoch is not None \
+                        and self.follow_epoch > follow_until:
+                    break
+                self.wait_for_lines()
+                line = self.scanner.read_line()
         return line
 
     def seek_back_line(self, line_lenght = 1):
         if self.system_grep:
             self.read_prev_line = True
         else:
-            #self.log_reader.set_next_line(file_stream=self.file_stream, jump=-(line_lenght))
-            self.read_block_index -= 1
+            self.scanner.seek_back()
 
-    def next_line(self, read_start_tm = None, read_end_tm = None):
+    def next_line(self, read_start_tm = None, read_end_tm = None, follow_until = None):
         seek_back_line = False
         if not read_start_tm:
-            read_start_tm = self.process_start_tm
+            read_start = self.process_start_epoch
+        else:
+            read_start = dt_to_epoch(read_start_tm)
         if not read_end_tm:
-            read_end_tm = self.process_end_tm
+            read_end = self.process_end_epoch
         else:
+            read_end = dt_to_epoch(read_end_tm)
             seek_back_line = True
+            if follow_until is None:
+                follow_until = read_end
         while True:
             fail = True
-            line = self.read_line()
+            line = self.read_line(follow_until=follow_until)
             if not line:
                 return None
-            line_tm = self.log_reader.parse_dt(line)
-            if line_tm > read_end_tm:
+            line_tm = self.log_reader.parse_epoch(line)
+            if line_tm > read_end:
                 try:
                     if seek_back_line:
                         self.seek_back_line(line_lenght=len(line))
                 except Exception:
                     pass
                 return None
-            if line_tm < read_start_tm:
+            if line_tm < read_start:
                 continue
             if self.read_all_lines:
                 return line
             if not self.system_grep:
-                if self.search_strings:
-                    if self.is_and:
-                        if self.is_casesensitive:
-                            if all(substring in line for substring in self.search_strings):
-                                fail = False
-                        else:
-                            if all(re.search(substring, line, re.IGNORECASE) for substring in self.search_strings):
-                                fail = False
-                    else:
-                        if self.is_casesensitive:
-                            if any(substring in line for substring in self.search_strings):
-                                fail = False
-                        else:
-                            if any(re.search(substring, line, re.IGNORECASE) for substring in self.search_strings):
-                                fail = False
-                if fail:
+                if not self.scanner.is_match(line):
                     continue
-                if self.ignore_strs:
-                    if self.is_casesensitive:
-                        if any(substring in line for substring in self.ignore_strs):
-                            continue
-                    else:
-                        if any(re.search(substring, line, re.IGNORECASE) for substring in self.ignore_strs):
-                            continue
+                fail = False
             else:
                 fail = False
             if self.uniq:
+                # lines are compared without their timestamp
+                line_data = line
                 if TIME_ZONE in line:
-                    try:
-                        line_data = line.split(TIME_ZONE)[1]
-                    except Exception:
-                        line_data = line
-                else:
-                    line_data = line
-                m = hashlib.md5(line_data)
-                if m.hexdigest() in self.uniq_lines_track:
+                    line_data = line.split(TIME_ZONE, 1)[1]
+                if not self.uniq_lines.add(line_data):
                     fail = True
                     continue
-                else:
-                    self.uniq_lines_track[m.hexdigest()] = True
             if not fail:
                 break
 
         return line
 
-    def show(self):
+    def show(self, heartbeat=False):
+        uniq_reported = False
         while True:
             tm = None
-            line = self.next_line()
+            follow_until = None
+            if heartbeat:
+                follow_until = self.follow_epoch or 0
+            line = self.next_line(follow_until=follow_until)
             if line:
                 tm = self.log_reader.parse_dt(line)
+            elif heartbeat and self.follow_epoch is not None \
+                    and self.follow_epoch <= self.process_end_epoch:
+                # the log went on without a match, or stayed idle: there is
+                # no match up to follow_epoch
+                tm = datetime.datetime.utcfromtimestamp(self.follow_epoch)
+            elif self.uniq and not uniq_reported:
+                # once at the end, how many duplicates were left out
+                uniq_reported = True
+                report = self.uniq_lines.report()
+                if report:
+                    yield END_ROW_KEY, report
             yield tm, line
 
     def show_iterator(self):
+        if self.scanner and self.scanner.follow:
+            # heartbeats let a merge of followed logs go on while some of
+            # them have no matches
+            return self.show(heartbeat=True)
         return self.show_it
 
     def neglect_minutes_seconds_time(self, tm):
@@ -317,6 +419,11 @@ class ServerLog(object):
             return None
         return tm + datetime.timedelta(minutes=-tm.minute, seconds=-tm.second, microseconds=-tm.microsecond)
 
+    def neglect_seconds_time(self, tm):
+        if not tm or type(tm) is not datetime.datetime:
+            return None
+        return tm + datetime.timedelta(seconds=-tm.second, microseconds=-tm.microsecond)
+
     def get_next_slice_start_and_end_tm(self, old_slice_start, old_slice_end, slice_duration, current_line_tm):
         slice_jump = 0
 
@@ -359,30 +466,13 @@ class ServerLog(object):
             current_slice_count += 1
 
         count_result[COUNT_RESULT_KEY][TOTAL_ROW_HEADER] = total_count
+        if self.uniq:
+            count_result[COUNT_RESULT_KEY][UNIQ_SUPPRESSED_HEADER] = self.uniq_lines.suppressed
         yield END_ROW_KEY, count_result
 
     def count_iterator(self):
         return self.count_it
 
-    def contains_substrings_in_order(self, main_str="", sub_strs=[]):
-        if not sub_strs:
-            return True
-        if not main_str:
-            return False
-        s_str = sub_strs[0]
-        if not s_str:
-            return True
-        if s_str in main_str:
-            try:
-                main_str = main_str.split(s_str, 1)[1]
-            except Exception:
-                main_str = ""
-            if len(sub_strs) <= 1:
-                return True
-            return self.contains_substrings_in_order(main_str, sub_strs[1:])
-        else:
-            return False
-
     def get_value_and_diff(self, prev, slice_val):
         diff  = []
         value = []
@@ -404,163 +494,108 @@ class ServerLog(object):
         return value,diff
 
     def diff(self):
-        latencyPattern1 = '%s (\d+)'
-        latencyPattern2 = '%s \(([0-9,\s]+)\)'
-        latencyPattern3 = '(\d+)\((\d+)\) %s'
-        latencyPattern4 = '%s \((\d+)'
         grep_str = self.search_strings[-1]
-        line = self.next_line()
-        if line:
-
-            value = []
-            diff = []
+        flags = 0 if self.is_casesensitive else re.IGNORECASE
+        value_res = [re.compile(value_fmt % (grep_str), flags) for value_fmt in DIFF_PATTERNS]
+        in_order = compile_in_order(self.search_strings)
 
-            slice_start = self.process_start_tm
-            slice_end = slice_start + self.slice_duration
-            while(self.log_reader.parse_dt(line) < slice_start):
-                line = self.next_line()
-                if not line:
-                    break
+        slice_start = self.process_start_tm
+        slice_end = slice_start + self.slice_duration
+        line = self.next_line()
+        while line and self.log_reader.parse_dt(line) < slice_start:
+            line = self.next_line()
 
-        if line:
-            if self.contains_substrings_in_order(main_str=line, sub_strs=self.search_strings):
-                if self.is_casesensitive:
-                    m1 = re.search(latencyPattern1 % (grep_str), line)
-                    m2 = re.search(latencyPattern2 % (grep_str), line)
-                    m3 = re.search(latencyPattern3 % (grep_str), line)
-                    m4 = re.search(latencyPattern4 % (grep_str), line)
-                else:
-                    m1 = re.search(latencyPattern1 % (grep_str), line, re.IGNORECASE)
-                    m2 = re.search(latencyPattern2 % (grep_str), line, re.IGNORECASE)
-                    m3 = re.search(latencyPattern3 % (grep_str), line, re.IGNORECASE)
-                    m4 = re.search(latencyPattern4 % (grep_str), line, re.IGNORECASE)
-
-            while(not m1 and not m2 and not m3 and not m4):
-                try:
-                    line = self.next_line()
-                    if not line:
+        # the first line with a value fixes the pattern
+        m = None
+        value_re = None
+        while line:
+            if in_order.search(line):
+                for candidate_re in value_res:
+                    m = candidate_re.search(line)
+                    if m:
+                        value_re = candidate_re
                         break
-                    if not self.contains_substrings_in_order(main_str=line, sub_strs=self.search_strings):
-                        continue
-                except Exception:
+                if m:
                     break
+            line = self.next_line()
 
-                if self.is_casesensitive:
-                    m1 = re.search(latencyPattern1 % (grep_str), line)
-                    m2 = re.search(latencyPattern2 % (grep_str), line)
-                    m3 = re.search(latencyPattern3 % (grep_str), line)
-                    m4 = re.search(latencyPattern4 % (grep_str), line)
-                else:
-                    m1 = re.search(latencyPattern1 % (grep_str), line, re.IGNORECASE)
-                    m2 = re.search(latencyPattern2 % (grep_str), line, re.IGNORECASE)
-                    m3 = re.search(latencyPattern3 % (grep_str), line, re.IGNORECASE)
-                    m4 = re.search(latencyPattern4 % (grep_str), line, re.IGNORECASE)
-
-        if line:
-            slice_count = 0
-            if (self.log_reader.parse_dt(line) >= slice_end):
-                slice_start, slice_end, slice_count = self.get_next_slice_start_and_end_tm(slice_start, slice_end, self.slice_duration,self.log_reader.parse_dt(line))
-                # slice_count -= 1
-            if slice_end > self.process_end_tm:
-                slice_end = self.process_end_tm
-            pattern = ""
-            prev = []
-            slice_val = []
-            pattern_type = 0
-            if m1:
-                pattern = latencyPattern1 % (grep_str)
-                if not slice_count%self.slice_show_count:
-                    slice_val.append(int(m1.group(1)))
-            elif m2:
-                pattern = latencyPattern2 % (grep_str)
-                if not slice_count%self.slice_show_count:
-                    slice_val = map(lambda x: int(x), m2.group(1).split(","))
-                pattern_type = 1
-            elif m3:
-                pattern = latencyPattern3 % (grep_str)
-                if not slice_count%self.slice_show_count:
-                    slice_val = map(lambda x: int(x), list(m3.groups()))
-                pattern_type = 2
-            elif m4:
-                pattern = latencyPattern4 % (grep_str)
-                if not slice_count%self.slice_show_count:
-                    slice_val.append(int(m4.group(1)))
-                pattern_type = 3
+        if not line:
+            return
 
-            result = {}
-            result["value"] = {}
-            result["diff"] = {}
+        slice_count = 0
+        line_tm = self.log_reader.parse_dt(line)
+        if line_tm >= slice_end:
+            slice_start, slice_end, slice_count = self.get_next_slice_start_and_end_tm(slice_start, slice_end, self.slice_duration, line_tm)
+        if slice_end > self.process_end_tm:
+            slice_end = self.process_end_tm
 
-            for line_tm, line in self.show_it:
-                if not line:
-                    break
+        prev = []
+        # column-wise running sum of the values in the current slice
+        slice_val = []
+        if not slice_count%self.slice_show_count:
+            slice_val = diff_values(m)
 
-                if not self.contains_substrings_in_order(main_str=line, sub_strs=self.search_strings):
-                    continue
+        result = {}
+        result["value"] = {}
+        result["diff"] = {}
+
+        for line_tm, line in self.show_it:
+            if not line:
+                break
 
+            if not in_order.search(line):
+                continue
+
+            if line_tm >= slice_end or line_tm >= self.process_end_tm:
+                if not slice_count%self.slice_show_count:
+                    value, diff = self.get_value_and_diff(prev, slice_val)
+                    if value and diff:
+                        tm = slice_start.strftime(DT_FMT)
+                        result["value"][tm]=value
+                        result["diff"][tm]=diff
+                        yield slice_start, result
+                        result["value"] = {}
+                        result["diff"] = {}
+                    prev = slice_val
+                slice_val = []
                 if line_tm >= self.process_end_tm:
-                    if not slice_count%self.slice_show_count:
-                        value, diff = self.get_value_and_diff(prev, slice_val)
-                        if value and diff:
-                            tm = slice_start.strftime(DT_FMT)
-                            result["value"][tm]=value
-                            result["diff"][tm]=diff
-                            yield slice_start, result
-                            result["value"] = {}
-                            result["diff"] = {}
-                            value = []
-                            diff = []
-                    slice_val = []
                     break
 
-                if line_tm >= slice_end:
-                    if not slice_count%self.slice_show_count:
-                        value, diff = self.get_value_and_diff(prev, slice_val)
-                        if value and diff:
-                            tm = slice_start.strftime(DT_FMT)
-                            result["value"][tm]=value
-                            result["diff"][tm]=diff
-                            yield slice_start, result
-                            result["value"] = {}
-                            result["diff"] = {}
-                            value = []
-                            diff = []
-                        prev = slice_val
-                    slice_start, slice_end, slice_count_jump = self.get_next_slice_start_and_end_tm(slice_start, slice_end, self.slice_duration,line_tm)
-                    slice_count = (slice_count+slice_count_jump)%self.slice_show_count
-                    slice_val = []
-                    if slice_end > self.process_end_tm:
-                        slice_end = self.process_end_tm
+                slice_start, slice_end, slice_count_jump = self.get_next_slice_start_and_end_tm(slice_start, slice_end, self.slice_duration,line_tm)
+                slice_count = (slice_count+slice_count_jump)%self.slice_show_count
+                if slice_end > self.process_end_tm:
+                    slice_end = self.process_end_tm
 
-                if not slice_count%self.slice_show_count:
-                    if self.is_casesensitive:
-                        m = re.search(pattern, line)
+            if not slice_count%self.slice_show_count:
+                m = value_re.search(line)
+                if m:
+                    vals = diff_values(m)
+                    if slice_val:
+                        slice_val = [a + b for a, b in zip(slice_val, vals)]
                     else:
-                        m = re.search(pattern, line, re.IGNORECASE)
+                        slice_val = vals
 
-                    if m:
-                        if pattern_type == 2:
-                            current = map(lambda x: int(x), list(m.groups()))
-                        else:
-                            current = map(lambda x: int(x), m.group(1).split(","))
-                        if slice_val:
-                            slice_val = ([b + a for b, a in zip(current, slice_val)])
-                        else:
-                            slice_val = ([b for b in current])
-
-            if not slice_count%self.slice_show_count and slice_val:
-                value, diff = self.get_value_and_diff(prev, slice_val)
-                if value and diff:
-                    tm = slice_start.strftime(DT_FMT)
-                    result["value"][tm]=value
-                    result["diff"][tm]=diff
-                    yield slice_start, result
+        if not slice_count%self.slice_show_count and slice_val:
+            value, diff = self.get_value_and_diff(prev, slice_val)
+            if value and diff:
+                tm = slice_start.strftime(DT_FMT)
+                result["value"][tm]=value
+                result["diff"][tm]=diff
+                yield slice_start, result
 
     def diff_iterator(self):
         return self.diff_it
 
-    def latency_iterator(self):
-        return self.latency_it
+    def latency_iterators(self):
+        """
+        Returns {name: latency iterator} for every histogram in search_strings
+        (in every namespace of ns), all computed in one pass over the log.
+        """
+
+        latency_start_tm, bucket_count, every_nth_bucket, rounding_time, ns = self.latency_args
+        return self.log_latency.compute_latencies(self.show_it, self.search_strings, self.slice_duration, latency_start_tm,
+                                                  self.process_end_tm, bucket_count, every_nth_bucket, arg_rounding_time=rounding_time,
+                                                  arg_ns=ns)
 
 
 
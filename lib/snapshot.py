@@ -0,0 +1,325 @@
+# Copyright 2013-2016 Aerospike, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Typed, columnar view of per node statistics.
+
+Cluster calls return {node: {stat: "string"}}. A StatsSnapshot parses every
+value once into one array('d') column per metric (NaN where a node does not
+report the metric or reports something non numeric) so views and health
+checks can aggregate and compare numbers without re-parsing strings.
+"""
+
+from array import array
+import re
+import threading
+from time import time
+
+NAN = float('nan')
+
+# name fragments of cumulative counters, e.g. stat_read_reqs,
+# client_write_success, err_tsvc_requests, fabric_msgs_sent, evicted_objects
+COUNTER_PATTERN = re.compile(
+    r"(^|[_-])(reqs|requests|success|successes|errs|errors?|timeouts?"
+    r"|not_found|filtered_out|fail|failed|failures|sent|rcvd|recv|received"
+    r"|initiate|complete|completed|succeeded|aborted|abandoned|deleted"
+    r"|expired|evicted|reaped|dropped|retries|shipped|written|hits|misses"
+    r"|transactions|ops)([_-]|$)")
+
+def is_counter(metric):
+    """
+    True if metric looks like a cumulative counter rather than a gauge.
+    """
+
+    return bool(COUNTER_PATTERN.search(metric))
+
+def _is_nan(value):
+    return value != value
+
+def to_number(value):
+    """
+    Parse an info value into a float, returns (number, is_integer). number
+    is NaN if value is not numeric.
+    """
+
+    try:
+        return float(int(value)), True
+    except (TypeError, ValueError):
+        pass
+
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return NAN, False
+
+    if number in (float('inf'), float('-inf')):
+        return NAN, False
+    return number, False
+
+class StatsSnapshot(object):
+    """
+    node x metric matrix built from one fetch of {node: {stat: value}}.
+    Nodes whose entry is an Exception are kept in errors only.
+
+    uptimes is {node: service uptime} fetched along with stats, used to
+    detect restarts in tables which do not report uptime (namespace, sets,
+    bins, xdr, dc). By default it is taken from the "uptime" metric.
+    """
+
+    def __init__(self, stats, timestamp=None, uptimes=None):
+        self.timestamp = time() if timestamp is None else timestamp
+        self.errors = {}
+        self.raw = {}
+
+        for node, node_stats in stats.iteritems():
+            if isinstance(node_stats, Exception):
+                self.errors[node] = node_stats
+            elif node_stats is not None:
+                self.raw[node] = node_stats
+
+        self.nodes = sorted(self.raw.keys())
+        self._rows = dict((node, i) for i, node in enumerate(self.nodes))
+
+        metrics = set()
+        for node_stats in self.raw.itervalues():
+            metrics.update(node_stats.iterkeys())
+        self.metrics = sorted(metrics)
+
+        self._columns = {}
+        self._integral = {}
+        n_nodes = len(self.nodes)
+        for metric in self.metrics:
+            column = array('d', [NAN]) * n_nodes
+            integral = True
+            numeric = False
+            for i, node in enumerate(self.nodes):
+                if metric not in self.raw[node]:
+                    continue
+                number, is_int = to_number(self.raw[node][metric])
+                if _is_nan(number):
+                    continue
+                column[i] = number
+                numeric = True
+                integral = integral and is_int
+
+            self._columns[metric] = column
+            self._integral[metric] = numeric and integral
+
+        self.uptimes = {}
+        for node in self.nodes:
+            if uptimes is not None:
+                uptime, _ = to_number(uptimes.get(node))
+            else:
+                uptime = self.value(node, "uptime", NAN)
+            if not _is_nan(uptime):
+                self.uptimes[node] = uptime
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __contains__(self, metric):
+        return metric in self._columns
+
+    def column(self, metric):
+        """
+        Return the array('d') column for metric. metric may be a tuple of
+        aliases (e.g. old and new stat names), for every node the first alias
+        that node reports is used.
+        """
+
+        if not isinstance(metric, tuple):
+            column = self._columns.get(metric)
+            if column is None:
+                column = array('d', [NAN]) * len(self.nodes)
+            return column
+
+        columns = [self._columns[m] for m in metric if m in self._columns]
+        if len(columns) == 1:
+            return columns[0]
+
+        merged = array('d', [NAN]) * len(self.nodes)
+        for i, node in enumerate(self.nodes):
+            node_stats = self.raw[node]
+            for alias in metric:
+                if alias in node_stats:
+                    merged[i] = self._columns[alias][i]
+                    break
+        return merged
+
+    def isIntegral(self, metric):
+        """
+        True if every node reporting metric reports an integer.
+        """
+
+        if isinstance(metric, tuple):
+            return all(self._integral[m] for m in metric if m in self._integral) \
+                and any(m in self._integral for m in metric)
+        return self._integral.get(metric, False)
+
+    def value(self, node, metric, default=None):
+        """
+        Numeric value of metric on node, or default if missing or not
+        numeric.
+        """
+
+        i = self._rows.get(node)
+        if i is None:
+            return default
+
+        number = self.column(metric)[i]
+        if _is_nan(number):
+            return default
+        return number
+
+    def get(self, node, metric, default=None):
+        """
+        Raw (string) value of metric on node.
+        """
+
+        return self.raw.get(node, {}).get(metric, default)
+
+    def _numbers(self, metric):
+        return [v for v in self.column(metric) if not _is_nan(v)]
+
+    def sum(self, metric, default=None):
+        numbers = self._numbers(metric)
+        if not numbers:
+            return default
+        return sum(numbers)
+
+    def min(self, metric, default=None):
+        numbers = self._numbers(metric)
+        if not numbers:
+            return default
+        return min(numbers)
+
+    def max(self, metric, default=None):
+        numbers = self._numbers(metric)
+        if not numbers:
+            return default
+        return max(numbers)
+
+    def totals(self):
+        """
+        Cluster wide sum of the values made of digits only, as {metric: int}.
+        Like the Total row always did, a metric is summed over the nodes
+        where it is such a value, signed, decimal and non numeric values are
+        left out.
+        """
+
+        totals = {}
+        for node in self.nodes:
+            for metric, value in self.raw[node].iteritems():
+                if isinstance(value, basestring) and value.isdigit():
+                    totals[metric] = totals.get(metric, 0) + int(value)
+        return totals
+
+    def rates(self, previous):
+        """
+        Per node rates of counter metrics since previous, as
+        {node: {metric: (per_second, delta)}}. A counter that went down, or
+        every counter of a node whose uptime went down, is reported as None
+        (the node restarted and its counters were reset). Uptimes come from
+        the uptimes each snapshot was built with.
+        """
+
+        elapsed = self.timestamp - previous.timestamp
+        if elapsed <= 0:
+            return {}
+
+        counters = [m for m in self.metrics
+                    if self._integral[m] and m in previous._columns
+                    and is_counter(m)]
+
+        rates = {}
+        for node in self.nodes:
+            i = self._rows[node]
+            j = previous._rows.get(node)
+            if j is None:
+                continue
+
+            uptime = self.uptimes.get(node)
+            prev_uptime = previous.uptimes.get(node)
+            restarted = uptime is not None and prev_uptime is not None \
+                and uptime < prev_uptime
+
+            node_rates = {}
+            for metric in counters:
+                current = self._columns[metric][i]
+                last = previous._columns[metric][j]
+                if _is_nan(current) or _is_nan(last):
+                    continue
+                delta = current - last
+                if restarted or delta < 0:
+                    node_rates[metric] = None
+                else:
+                    node_rates[metric] = (delta / elapsed, int(delta))
+            rates[node] = node_rates
+
+        return rates
+
+class CounterRates(object):
+    """
+    Keeps the previous snapshot of each statistics table so repeated runs
+    can report counter rates instead of raw totals.
+    """
+
+    def __init__(self):
+        self._previous = {}
+        self._lock = threading.Lock()
+
+    def update(self, key, stats, timestamp=None, uptimes=None):
+        """
+        Record stats as the latest snapshot for key. Returns the rates
+        since the previous snapshot (see StatsSnapshot.rates) or None if
+        this is the first snapshot for key. uptimes is {node: service
+        uptime}, see StatsSnapshot.
+        """
+
+        snapshot = StatsSnapshot(stats, timestamp=timestamp, uptimes=uptimes)
+        with self._lock:
+            previous = self._previous.get(key)
+            self._previous[key] = snapshot
+
+        if previous is None:
+            return None
+        return snapshot.rates(previous)
+
+    def latest(self, key):
+        """
+        The snapshot last recorded for key, None if there is none.
+        """
+
+        with self._lock:
+            return self._previous.get(key)
+
+    def clear(self):
+        with self._lock:
+            self._previous = {}
+
+def namespace_snapshots(stats, timestamp=None):
+    """
+    Split infoAllNamespaceStatistics output, {node: {ns: {stat: value}}},
+    into {ns: StatsSnapshot}.
+    """
+
+    by_namespace = {}
+    for node, ns_stats in stats.iteritems():
+        if isinstance(ns_stats, Exception):
+            continue
+        for ns, node_stats in ns_stats.iteritems():
+            by_namespace.setdefault(ns, {})[node] = node_stats
+
+    return dict((ns, StatsSnapshot(ns_stats, timestamp=timestamp))
+                for ns, ns_stats in by_namespace.iteritems())
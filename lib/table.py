@@ -15,6 +15,7 @@
 from lib import filesize
 from lib import terminal
 import re
+import threading
 
 class Extractors(object):
     # standard set of extractors
@@ -93,7 +94,56 @@ class Styles(object):
     HORIZONTAL = 0
     VERTICAL   = 1
 
+class TableDiff(object):
+    """
+    Cell values of every table rendered during one iteration of watch. The
+    next iteration compares its cells against them, so changed values are
+    found on the table data rather than on the rendered text.
+    """
+
+    def __init__(self):
+        self._previous = {}
+        self._current = {}
+        self._lock = threading.Lock()
+
+    def changedCells(self, title, rows):
+        """
+        Record rows, {row_key: {column: value}}, as the cells of table title
+        and return the set of (row_key, column) that differ from the
+        previous iteration. Rows of a table that is new are not changes.
+        """
+
+        with self._lock:
+            self._current[title] = rows
+            previous = self._previous.get(title)
+
+        changed = set()
+        if previous is None:
+            return changed
+
+        for row_key, cells in rows.iteritems():
+            prev_cells = previous.get(row_key)
+            for column, value in cells.iteritems():
+                if prev_cells is None or prev_cells.get(column) != value:
+                    changed.add((row_key, column))
+
+        return changed
+
+    def nextIteration(self):
+        """
+        Start the next iteration, True if tables were rendered in this one.
+        """
+
+        with self._lock:
+            rendered = bool(self._current)
+            self._previous = self._current
+            self._current = {}
+        return rendered
+
 class Table(object):
+    # set by watch to highlight cells that changed since the last iteration
+    diff = None
+
     def __init__(self
                  ,title
                  ,column_names
@@ -105,6 +155,7 @@ class Table(object):
 
         self._data = []
         self._need_sort = False
+        self._changed = set()
         self._data_source = {}
         self._no_alert_style = lambda: ''
         self._cell_alert = {}
@@ -335,12 +386,50 @@ class Table(object):
         output = "\n".join(map(lambda r: "".join(r), output))
         return output
 
+    def _diffCells(self):
+        """
+        Set of (row index, column index) of the cells that changed since the
+        previous watch iteration. Rows are identified by their sort column
+        and their position among rows with the same sort value.
+        """
+
+        diff = Table.diff
+        if diff is None:
+            return set()
+
+        rows = {}
+        row_index = {}
+        seen = {}
+        for r, drow in enumerate(self._data):
+            ident = drow[self._sort_by][1]
+            n = seen.get(ident, 0)
+            seen[ident] = n + 1
+            key = (ident, n)
+            row_index[key] = r
+            rows[key] = dict((self._column_names[i], cell)
+                             for i, (_, cell) in enumerate(drow))
+
+        changed = diff.changedCells(self._title, rows)
+        if not changed:
+            return set()
+
+        columns = dict((name, i) for i, name in enumerate(self._column_names))
+        return set((row_index[key], columns[column])
+                   for key, column in changed)
+
+    def _formatCell(self, row_index, column_index, cell_format, cell):
+        if (row_index, column_index) in self._changed:
+            return "%s%s%s%s"%(cell_format(), terminal.inverse(), cell
+                               , terminal.uninverse())
+        return "%s%s"%(cell_format(), cell)
+
     def __str__(self, horizontal_title_every_nth=0):
         if len(self._render_column_ids) == 0:
             return ''
         if self._need_sort:
             self._do_sort()
         self._genRenderData()
+        self._changed = self._diffCells()
 
         if self._style == Styles.HORIZONTAL:
             return self._str_horizontal()
@@ -353,7 +442,7 @@ class Table(object):
     def _str_horizontal(self):
         output = []
         output.append(self._getHorizontalHeader())
-        for drow in self._data:
+        for r, drow in enumerate(self._data):
             row = []
             for i, (cell_format, cell) in enumerate(drow):
                 row.append(terminal.style(
@@ -362,6 +451,7 @@ class Table(object):
                 if i not in self._render_column_ids:
                     continue
 
+                column_index = i
                 i = self._render_remap[i]
 
                 column_name = self._render_column_names[i]
@@ -374,7 +464,7 @@ class Table(object):
                     raise ValueError(
                         "Unknown column type: '%s'"%self._render_column_types[i])
 
-                row.append("%s%s"%(cell_format(),cell))
+                row.append(self._formatCell(r, column_index, cell_format, cell))
                 row.append(self._column_padding)
 
             output.append(''.join(row))
@@ -440,7 +530,7 @@ class Table(object):
                     row.append(":")
                     row.append(self._column_padding)
                 cell = cell.ljust(self._render_column_widths[j])
-                row.append("%s%s"%(cell_format(), cell))
+                row.append(self._formatCell(j - 1, i, cell_format, cell))
                 row.append(self._column_padding)
                 added_columns +=1
 
@@ -0,0 +1,121 @@
+"""
+Track the lines already seen by a unique (-u) grep.
+
+UniqLines keeps a 64 bit hash (the builtin str hash) of every distinct line
+in a set. Once the set would use more than max_bytes, its hashes move to a
+Bloom filter of max_bytes and memory stays capped from there on, at the cost
+of a rare new line taken for a duplicate. With the default 64MB (537M bits,
+7 bits set per line) that is about 1% of new lines once some 56M distinct lines
+were seen, 2.3% at 67M. In exact mode the md5 digest of every line is kept
+instead, with no cap.
+"""
+
+__author__ = 'aerospike'
+
+import hashlib
+
+# memory for the hashes of seen lines before switching to a Bloom filter
+MAX_BYTES = 64 * 1024 * 1024
+# approximate memory per hash in the set: the int and its share of the table
+ENTRY_BYTES = 64
+# bits set per line in the Bloom filter
+BLOOM_HASHES = 7
+HASH_MASK = (1 << 64) - 1
+
+class BloomFilter(object):
+    """
+    Fixed size Bloom filter over 64 bit hashes, bit positions come from
+    the two halves of the mixed hash (double hashing).
+    """
+
+    def __init__(self, size_bytes, hash_count=BLOOM_HASHES):
+        self.bits = bytearray(size_bytes)
+        self.bit_count = size_bytes * 8
+        self.hash_count = hash_count
+
+    def _positions(self, h):
+        # str hashes of similar lines differ in a few bits only, mix them
+        # first (the 64 bit finalizer of MurmurHash3)
+        h &= HASH_MASK
+        h ^= h >> 33
+        h = (h * 0xff51afd7ed558ccd) & HASH_MASK
+        h ^= h >> 33
+        h = (h * 0xc4ceb9fe1a85ec53) & HASH_MASK
+        h ^= h >> 33
+        h1 = h & 0xffffffff
+        h2 = (h >> 32) | 1
+        for i in xrange(self.hash_count):
+            yield (h1 + i * h2) % self.bit_count
+
+    def add(self, h):
+        """
+        Set the bits of h, True if they were not all set already.
+        """
+
+        added = False
+        bits = self.bits
+        for pos in self._positions(h):
+            mask = 1 << (pos & 7)
+            if not bits[pos >> 3] & mask:
+                bits[pos >> 3] |= mask
+                added = True
+        return added
+
+class UniqLines(object):
+    """
+    Set of lines seen so far. add returns False for a line seen before and
+    counts it in suppressed.
+    """
+
+    def __init__(self, exact=False, max_bytes=MAX_BYTES):
+        self.exact = exact
+        self.max_bytes = max_bytes
+        self.max_entries = max(1, max_bytes // ENTRY_BYTES)
+        self.seen = set()
+        self.bloom = None
+        self.suppressed = 0
+
+    def add(self, line):
+        if self.exact:
+            key = hashlib.md5(line).digest()
+        else:
+            key = hash(line)
+            if self.bloom is not None:
+                if self.bloom.add(key):
+                    return True
+                self.suppressed += 1
+                return False
+
+        if key in self.seen:
+            self.suppressed += 1
+            return False
+        self.seen.add(key)
+        if not self.exact and len(self.seen) > self.max_entries:
+            self._to_bloom()
+        return True
+
+    def _to_bloom(self):
+        self.bloom = BloomFilter(self.max_bytes)
+        for key in self.seen:
+            self.bloom.add(key)
+        self.seen = set()
+
+    def is_capped(self):
+        """
+        True once lines are tracked by the Bloom filter.
+        """
+
+        return self.bloom is not None
+
+    def report(self):
+        """
+        One line summary of the suppressed lines, empty if there were none.
+        """
+
+        if not self.suppressed:
+            return ""
+        report = "%d duplicate line%s suppressed" \
+            %(self.suppressed, "" if self.suppressed == 1 else "s")
+        if self.is_capped():
+            report += " (memory cap reached, a few may be false duplicates)"
+        return report + "\n"
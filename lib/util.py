@@ -13,45 +13,81 @@
 # limitations under the License.
 
 import re
+import collections
 import itertools
 import threading
+import Queue
 from time import time
 import subprocess
 import pipes
 import sys, StringIO
 
+from lib.timeout import TimeoutException
+
 def info_to_dict(value, delimiter = ';'):
     """
     Simple function to convert string to dict
     """
 
+    items = value.split(delimiter)
+
+    # Fast path: every item is a single key=value and no key repeats.
+    pairs = [item.split('=') for item in items]
+    try:
+        stat_dict = dict(pairs)
+        if len(stat_dict) == len(pairs):
+            return stat_dict
+    except ValueError:
+        pass
+
     stat_dict = {}
-    stat_param = itertools.imap(lambda sp: info_to_tuple(sp, "="),
-                                info_to_list(value, delimiter))
-    for g in itertools.groupby(stat_param, lambda x: x[0]):
-        try:
-            value = map(lambda v: v[1], g[1])
-            value = ",".join(sorted(value)) if len(value) > 1 else value[0]
-            stat_dict[g[0]] = value
-        except Exception:
-            # NOTE: 3.0 had a bug in stats at least prior to 3.0.44. This will
-            # ignore that bug.
-
-            # Not sure if this bug is fixed or not.. removing this try/catch
-            # results in things not working. TODO: investigate.
-            pass
+    # Consecutive items with the same key are merged into one sorted, comma
+    # separated value. An item without '=' invalidates its whole group.
+    # NOTE: 3.0 had a bug in stats at least prior to 3.0.44, this ignores it.
+    group_key = _NO_KEY
+    group_values = []
+    group_valid = False
+    for item in items:
+        key, sep, item_value = item.partition('=')
+        if key != group_key:
+            if group_valid:
+                if len(group_values) == 1:
+                    stat_dict[group_key] = group_values[0]
+                else:
+                    stat_dict[group_key] = ",".join(sorted(group_values))
+            group_key = key
+            group_values = []
+            group_valid = True
+
+        if not sep:
+            group_valid = False
+            continue
+
+        if '=' in item_value:
+            # 'a=b=c' yields 'b'
+            item_value = item_value[:item_value.index('=')]
+        group_values.append(item_value)
+
+    if group_valid:
+        if len(group_values) == 1:
+            stat_dict[group_key] = group_values[0]
+        else:
+            stat_dict[group_key] = ",".join(sorted(group_values))
+
     return stat_dict
 
+# sentinel that never equals a key parsed by info_to_dict
+_NO_KEY = object()
+
 def info_to_dict_multi_level(value, keyname, delimiter1 = ';', delimiter2 = ':'):
     """
     Simple function to convert string to dict where string is format like
     field1_section1=value1<delimiter2>field2_section1=value2<delimiter2>... <delimiter1> field1_section2=value3<delimiter2>field2_section2=value4<delimiter2>...
     """
-    value_list = info_to_list(value, delimiter1)
     value_dict = {}
-    for v in value_list:
+    for v in value.split(delimiter1):
         values = info_to_dict(v, delimiter2)
-        if not values or isinstance(values,Exception) or keyname not in values.keys():
+        if keyname not in values:
             continue
         value_dict[values[keyname]] = values
     return value_dict
@@ -63,35 +99,172 @@ def info_colon_to_dict(value):
     return info_to_dict(value, ':')
 
 def info_to_list(value, delimiter = ";"):
-    return re.split(delimiter, value)
+    """
+    Split an info response on delimiter (a literal string, not a regex).
+    """
+    return value.split(delimiter)
 
 def info_to_tuple(value, delimiter = ":"):
-    return tuple(info_to_list(value, delimiter))
+    return tuple(value.split(delimiter))
 
-def concurrent_map(func, data):
+def unique(iterable):
+    """
+    Return the items of iterable as a list with duplicates removed, keeping
+    the first occurrence of each.
+    """
+
+    seen = set()
+    result = []
+    for item in iterable:
+        if item not in seen:
+            seen.add(item)
+            result.append(item)
+    return result
+
+class _Task(object):
+    """
+    A unit of work submitted to a WorkerPool.
+
+    A task runs exactly once, either on a pool worker or, if no worker has
+    picked it up yet when somebody waits on it, in the waiting thread. The
+    latter keeps nested use of the pool (a task waiting on other tasks) from
+    deadlocking when all workers are busy.
+    """
+
+    def __init__(self, func, args, kwargs):
+        self._func = func
+        self._args = args
+        self._kwargs = kwargs
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._claimed = False
+        self.started = None
+        self.result = None
+        self.exc = None
+
+    def claim(self):
+        with self._lock:
+            if self._claimed:
+                return False
+            self._claimed = True
+            self.started = time()
+            return True
+
+    def run(self):
+        try:
+            self.result = self._func(*self._args, **self._kwargs)
+        except Exception as e:
+            self.exc = e
+        finally:
+            self._done.set()
+
+    def wait(self, timeout=None):
+        """
+        Wait for the task to finish, at most timeout seconds after it started.
+        Returns True if the task has finished.
+        """
+
+        if self.claim():
+            self.run()
+            return True
+
+        if timeout is None:
+            self._done.wait()
+        else:
+            self._done.wait(max(0, self.started + timeout - time()))
+
+        return self._done.is_set()
+
+class WorkerPool(object):
+    """
+    Size limited pool of daemon worker threads. Workers are started on demand
+    up to max_workers and live for the rest of the process.
     """
-    Similar to the builtin function map(). But spawn a thread for each argument
-    and apply 'func' concurrently.
+
+    def __init__(self, max_workers):
+        self.max_workers = max_workers
+        self._queue = Queue.Queue()
+        self._lock = threading.Lock()
+        self._workers = 0
+        self._idle = 0
+
+    def submit(self, func, *args, **kwargs):
+        task = _Task(func, args, kwargs)
+        self._queue.put(task)
+
+        with self._lock:
+            if (self._queue.qsize() > self._idle
+                    and self._workers < self.max_workers):
+                self._workers += 1
+                self._idle += 1
+                worker = threading.Thread(target=self._work)
+                worker.daemon = True
+                worker.start()
+
+        return task
+
+    def _work(self):
+        while True:
+            task = self._queue.get()
+            with self._lock:
+                self._idle -= 1
+
+            if task.claim():
+                task.run()
+
+            with self._lock:
+                if self._workers > self.max_workers:
+                    # pool was shrunk by set_max_workers
+                    self._workers -= 1
+                    return
+                self._idle += 1
+
+# default limit on the number of concurrent info requests / tasks
+DEFAULT_MAX_WORKERS = 64
+_worker_pool = WorkerPool(DEFAULT_MAX_WORKERS)
+
+def set_max_workers(max_workers):
+    """
+    Set the number of worker threads shared by concurrent_map and Future.
+    """
+
+    max_workers = int(max_workers)
+    if max_workers < 1:
+        raise ValueError("max workers should be at least 1")
+    _worker_pool.max_workers = max_workers
+
+def get_max_workers():
+    return _worker_pool.max_workers
+
+def concurrent_map(func, data, timeout=None):
+    """
+    Similar to the builtin function map(). But apply 'func' concurrently on the
+    shared worker pool.
 
     Note: unlie map(), we cannot take an iterable argument. 'data' should be an
     indexable sequence.
-    """
 
-    N = len(data)
-    result = [None] * N
+    timeout -- seconds to wait on each element once it has started, elements
+    that take longer are returned as a TimeoutException.
+
+    An element whose call raised gets the exception as its result, the other
+    elements are not affected.
+    """
 
     # Uncomment following line to run single threaded.
     #return [func(datum) for datum in data]
 
-    #wrapper to dispose the result in the right slot
-    def task_wrapper(i):
-        result[i] = func(data[i])
+    tasks = [_worker_pool.submit(func, datum) for datum in data]
 
-    threads = [threading.Thread(target=task_wrapper, args=(i,)) for i in xrange(N)]
-    for t in threads:
-        t.start()
-    for t in threads:
-        t.join()
+    result = []
+    for task in tasks:
+        if not task.wait(timeout):
+            result.append(TimeoutException(
+                "Task did not finish within %s seconds"%(timeout)))
+        elif task.exc:
+            result.append(task.exc)
+        else:
+            result.append(task.result)
 
     return result
 
@@ -101,56 +274,175 @@ class Future(object):
     """
 
     def __init__(self, func, *args, **kwargs):
-        self._result = None
+        self._func = func
+        self._args = args
+        self._kwargs = kwargs
+        self._task = None
 
-        args = list(args)
-        args.insert(0, func)
-        self.exc = None
+    def start(self):
+        if self._task is None:
+            self._task = _worker_pool.submit(self._func, *self._args
+                                             , **self._kwargs)
+        return self
 
-        def wrapper(func, *args, **kwargs):
-            self.exc = None
-            try:
-                self._result = func(*args, **kwargs)
-            except Exception as e:
-                self.exc = e
+    def result(self, timeout=None):
+        self.start()
+        if not self._task.wait(timeout):
+            raise TimeoutException(
+                "Future did not finish within %s seconds"%(timeout))
+        if self._task.exc:
+            raise self._task.exc
+        return self._task.result
 
-        self._worker = threading.Thread(target=wrapper,
-                                        args=args, kwargs=kwargs)
+class _Flight(object):
+    """
+    A call in progress for some cache key, other callers asking for the same
+    key wait on it instead of repeating the call.
+    """
 
-    def start(self):
-        self._worker.start()
-        return self
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.exc = None
 
-    def result(self):
-        if self.exc:
-            raise self.exc
-        self._worker.join()
-        return self._result
+# default number of entries kept per cached function
+DEFAULT_CACHE_SIZE = 4096
 
 class cached(object):
+    """
+    Memoize func for ttl seconds.
+
+    ttl is either a number of seconds or a callable that takes the argument
+    tuple of a call and returns the seconds its result may be kept (0 means
+    do not cache). At most max_size results are kept, least recently used
+    first out. Concurrent calls with the same arguments share one call to
+    func.
+    """
     # Doesn't support lists, dicts and other unhashables
     # Also doesn't support kwargs for reason above.
 
-    def __init__(self, func, ttl=0.5):
+    # every cached function, see stats() and clearAll()
+    registry = []
+
+    def __init__(self, func, ttl=0.5, max_size=DEFAULT_CACHE_SIZE, name=None):
         self.func = func
         self.ttl = ttl
-        self.cache = {}
+        self.max_size = max_size
+        self.name = name if name else getattr(func, '__name__', str(func))
+        self.cache = collections.OrderedDict()
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+        self.evictions = 0
+        cached.registry.append(self)
+
+    def _ttl(self, key):
+        if callable(self.ttl):
+            return self.ttl(key)
+        return self.ttl
 
     def __setitem__(self, key, value):
-        self.cache[key] = (value, time() + self.ttl)
+        ttl = self._ttl(key)
+        if ttl <= 0:
+            return
+
+        with self._lock:
+            self.cache.pop(key, None)
+            self.cache[key] = (value, time() + ttl)
+            while len(self.cache) > self.max_size:
+                self.cache.popitem(last=False)
+                self.evictions += 1
 
     def __getitem__(self, key):
-        if key in self.cache:
-            value, eol = self.cache[key]
-            if eol > time():
-                return value
+        with self._lock:
+            if key in self.cache:
+                value, eol = self.cache.pop(key)
+                if eol > time():
+                    # re-insert as most recently used
+                    self.cache[key] = (value, eol)
+                    self.hits += 1
+                    return value
+
+            flight = self._flights.get(key, None)
+            if flight is None:
+                flight = _Flight()
+                self._flights[key] = flight
+                self.misses += 1
+                leader = True
+            else:
+                self.shared += 1
+                leader = False
+
+        if not leader:
+            flight.done.wait()
+            if flight.exc:
+                raise flight.exc
+            return flight.value
 
-        self[key] = self.func(*key)
-        return self.cache[key][0]
+        try:
+            flight.value = self.func(*key)
+            self[key] = flight.value
+            return flight.value
+        except Exception as e:
+            flight.exc = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
 
     def __call__(self, *args):
         return self[args]
 
+    def peek(self, key):
+        """
+        Return (True, value) if key has a live entry, else (False, None).
+        Never calls func.
+        """
+
+        with self._lock:
+            if key in self.cache:
+                value, eol = self.cache[key]
+                if eol > time():
+                    self.hits += 1
+                    return True, value
+        return False, None
+
+    def clear(self):
+        with self._lock:
+            self.cache.clear()
+
+    def getStats(self):
+        with self._lock:
+            return {'name':self.name
+                    , 'entries':len(self.cache)
+                    , 'max_size':self.max_size
+                    , 'hits':self.hits
+                    , 'misses':self.misses
+                    , 'shared':self.shared
+                    , 'evictions':self.evictions}
+
+    @staticmethod
+    def stats():
+        return [c.getStats() for c in cached.registry]
+
+    @staticmethod
+    def clearAll():
+        for c in cached.registry:
+            c.clear()
+
+def cached_with(ttl=0.5, max_size=DEFAULT_CACHE_SIZE, name=None):
+    """
+    Decorator form of cached that accepts its options.
+    """
+
+    def decorator(func):
+        return cached(func, ttl=ttl, max_size=max_size, name=name)
+
+    return decorator
+
 def shell_command(command):
     """
     command is a list of ['cmd','arg1','arg2',...]
@@ -15,7 +15,7 @@ import math
 from lib.logger import DT_FMT
 from lib.logreader import TOTAL_ROW_HEADER, COUNT_RESULT_KEY
 
-from lib.table import Table, Extractors, TitleFormats, Styles
+from lib.table import Table, TableDiff, Extractors, TitleFormats, Styles
 import sys
 from cStringIO import StringIO
 import re
@@ -27,8 +27,14 @@ import sys
 import itertools
 from pydoc import pipepager
 from lib.util import get_value_from_dict, set_value_in_dict
+from lib.snapshot import StatsSnapshot, namespace_snapshots
 
 
+MIGRATE_TX_REMAINING = ('migrate-tx-partitions-remaining', 'migrate_tx_partitions_remaining')
+MIGRATE_RX_REMAINING = ('migrate-rx-partitions-remaining', 'migrate_rx_partitions_remaining')
+MIGRATE_TX_INITIAL = ('migrate-tx-partitions-initial', 'migrate_tx_partitions_initial')
+MIGRATE_RX_INITIAL = ('migrate-rx-partitions-initial', 'migrate_rx_partitions_initial')
+
 class CliView(object):
     NO_PAGER, LESS, MORE = range(3)
     pager = NO_PAGER
@@ -142,6 +148,13 @@ class CliView(object):
 
         CliView.print_result(t)
 
+    @staticmethod
+    def _remainingPct(remaining, initial):
+        try:
+            return "%d"%(math.ceil((remaining / initial) * 100))
+        except Exception:
+            return "0"
+
     @staticmethod
     def infoNamespace(stats, cluster, title_suffix="", **ignore):
         prefixes = cluster.getNodeNames()
@@ -228,7 +241,9 @@ class CliView(object):
                        ,lambda data: data['node'] is " "
                        , color=terminal.fg_blue)
 
-        total_res = {}
+        # parse every namespace's statistics once, per row percentages and
+        # the total rows below read numbers from these snapshots
+        snapshots = namespace_snapshots(stats)
 
         # Need to maintain Node column ascending order per namespace. If set sort_by in table, it will affect total rows.
         # So we need to add rows as Nodes ascending order. So need to sort stats.keys as per respective Node value (prefixes[node_key]).
@@ -251,60 +266,7 @@ class CliView(object):
                 else:
                     row = ns_stats
 
-                if ns not in total_res:
-                    total_res[ns] = {}
-                    total_res[ns]["master_objects"] = 0
-                    total_res[ns]["prole_objects"] = 0
-                    total_res[ns]["used-bytes-memory"] = 0
-                    total_res[ns]["used-bytes-disk"] = 0
-                    total_res[ns]["evicted_objects"] = 0
-                    total_res[ns]["migrate_tx_partitions_remaining"] = 0
-                    total_res[ns]["migrate_rx_partitions_remaining"] = 0
-                    total_res[ns]["migrate_tx_partitions_initial"] = 0
-                    total_res[ns]["migrate_rx_partitions_initial"] = 0
-                try:
-                    total_res[ns]["master_objects"] += get_value_from_dict(ns_stats,('master-objects','master_objects'),return_type=int)
-                except Exception:
-                    pass
-                try:
-                    total_res[ns]["prole_objects"] += get_value_from_dict(ns_stats,('prole-objects','prole_objects'),return_type=int)
-                except Exception:
-                    pass
-
-                try:
-                    total_res[ns]["used-bytes-memory"] += get_value_from_dict(ns_stats,('used-bytes-memory','memory_used_bytes'),return_type=int)
-                except Exception:
-                    pass
-                try:
-                    total_res[ns]["used-bytes-disk"] += get_value_from_dict(ns_stats,('used-bytes-disk','device_used_bytes'),return_type=int)
-                except Exception:
-                    pass
-
-                try:
-                    total_res[ns]["evicted_objects"] += get_value_from_dict(ns_stats,('evicted-objects','evicted_objects'),return_type=int)
-                except Exception:
-                    pass
-
-                try:
-                    total_res[ns]["migrate_tx_partitions_remaining"] += get_value_from_dict(ns_stats,('migrate-tx-partitions-remaining','migrate_tx_partitions_remaining'),return_type=int)
-                except Exception:
-                    pass
-
-                try:
-                    total_res[ns]["migrate_rx_partitions_remaining"] += get_value_from_dict(ns_stats,('migrate-rx-partitions-remaining','migrate_rx_partitions_remaining'),return_type=int)
-                except Exception:
-                    pass
-
-                try:
-                    total_res[ns]["migrate_tx_partitions_initial"] += get_value_from_dict(ns_stats,('migrate-tx-partitions-initial','migrate_tx_partitions_initial'),return_type=int)
-                except Exception:
-                    pass
-
-                try:
-                    total_res[ns]["migrate_rx_partitions_initial"] += get_value_from_dict(ns_stats,('migrate-rx-partitions-initial','migrate_rx_partitions_initial'),return_type=int)
-                except Exception:
-                    pass
-
+                snapshot = snapshots[ns]
                 row['namespace'] = ns
                 row['real_node_id'] = node.node_id
                 row['node'] = prefixes[node_key]
@@ -312,17 +274,15 @@ class CliView(object):
                 set_value_in_dict(row,"free_pct_disk",get_value_from_dict(row,('free-pct-disk','device_free_pct')))
                 set_value_in_dict(row,"free_pct_memory",get_value_from_dict(row,('free-pct-memory','memory_free_pct')))
                 set_value_in_dict(row,"stop_writes",get_value_from_dict(row,('stop-writes','stop_writes')))
-                try:
-                    row["migrate_rx_partitions_remaining_pct"] = "%d"%(math.ceil((get_value_from_dict(ns_stats,('migrate-rx-partitions-remaining','migrate_rx_partitions_remaining'),return_type=float)/get_value_from_dict(ns_stats,('migrate-rx-partitions-initial','migrate_rx_partitions_initial'),return_type=float))*100))
-                except Exception:
-                    row["migrate_rx_partitions_remaining_pct"] = "0"
-                try:
-                    row["migrate_tx_partitions_remaining_pct"] = "%d"%(math.ceil((get_value_from_dict(ns_stats,('migrate-tx-partitions-remaining','migrate_tx_partitions_remaining'),return_type=float)/get_value_from_dict(ns_stats,('migrate-tx-partitions-initial','migrate_tx_partitions_initial'),return_type=float))*100))
-                except Exception:
-                    row["migrate_tx_partitions_remaining_pct"] = "0"
+                row["migrate_rx_partitions_remaining_pct"] = CliView._remainingPct(
+                    snapshot.value(node_key, MIGRATE_RX_REMAINING)
+                    , snapshot.value(node_key, MIGRATE_RX_INITIAL))
+                row["migrate_tx_partitions_remaining_pct"] = CliView._remainingPct(
+                    snapshot.value(node_key, MIGRATE_TX_REMAINING)
+                    , snapshot.value(node_key, MIGRATE_TX_INITIAL))
                 t.insertRow(row)
 
-        for ns in total_res:
+        for ns, snapshot in snapshots.iteritems():
             row = {}
             row['node'] = " "
             row['available_pct'] = " "
@@ -335,22 +295,17 @@ class CliView(object):
             row["stop-writes-pct"] = " "
 
             row['namespace'] = ns
-            row["master_objects"] = str(total_res[ns]["master_objects"])
-            row["prole_objects"] = str(total_res[ns]["prole_objects"])
-            row["used-bytes-memory"] = str(total_res[ns]["used-bytes-memory"])
-            row["used-bytes-disk"] = str(total_res[ns]["used-bytes-disk"])
-            row["evicted_objects"] = str(total_res[ns]["evicted_objects"])
-            row["migrate_tx_partitions_remaining"] = str(total_res[ns]["migrate_tx_partitions_remaining"])
-            row["migrate_rx_partitions_remaining"] = str(total_res[ns]["migrate_rx_partitions_remaining"])
-
-            try:
-                row["migrate_rx_partitions_remaining_pct"] = "%d"%(math.ceil((float(total_res[ns]["migrate_rx_partitions_remaining"])/float(total_res[ns]["migrate_rx_partitions_initial"]))*100))
-            except Exception:
-                row["migrate_rx_partitions_remaining_pct"] = "0"
-            try:
-                row["migrate_tx_partitions_remaining_pct"] = "%d"%(math.ceil((float(total_res[ns]["migrate_tx_partitions_remaining"])/float(total_res[ns]["migrate_tx_partitions_initial"]))*100))
-            except Exception:
-                row["migrate_tx_partitions_remaining_pct"] = "0"
+            row["master_objects"] = "%d"%(snapshot.sum(('master-objects','master_objects'), 0))
+            row["prole_objects"] = "%d"%(snapshot.sum(('prole-objects','prole_objects'), 0))
+            row["used-bytes-memory"] = "%d"%(snapshot.sum(('used-bytes-memory','memory_used_bytes'), 0))
+            row["used-bytes-disk"] = "%d"%(snapshot.sum(('used-bytes-disk','device_used_bytes'), 0))
+            row["evicted_objects"] = "%d"%(snapshot.sum(('evicted-objects','evicted_objects'), 0))
+            row["migrate_tx_partitions_remaining"] = "%d"%(snapshot.sum(MIGRATE_TX_REMAINING, 0))
+            row["migrate_rx_partitions_remaining"] = "%d"%(snapshot.sum(MIGRATE_RX_REMAINING, 0))
+            row["migrate_rx_partitions_remaining_pct"] = CliView._remainingPct(
+                snapshot.sum(MIGRATE_RX_REMAINING, 0), snapshot.sum(MIGRATE_RX_INITIAL, 0))
+            row["migrate_tx_partitions_remaining_pct"] = CliView._remainingPct(
+                snapshot.sum(MIGRATE_TX_REMAINING, 0), snapshot.sum(MIGRATE_TX_INITIAL, 0))
 
             t.insertRow(row)
 
@@ -814,7 +769,7 @@ class CliView(object):
             CliView.print_result(t)
 
     @staticmethod
-    def showConfig(title, service_configs, cluster, like=None, diff=None, show_total=False, title_every_nth=0, **ignore):
+    def showConfig(title, service_configs, cluster, like=None, diff=None, show_total=False, title_every_nth=0, total_row=None, **ignore):
         prefixes = cluster.getNodeNames()
         column_names = set()
 
@@ -849,9 +804,13 @@ class CliView(object):
                   , title_format=TitleFormats.noChange
                   , style=Styles.VERTICAL)
 
-        row = None
         if show_total:
-            rowTotal = {}
+            if total_row is not None:
+                rowTotal = dict(total_row)
+            else:
+                rowTotal = StatsSnapshot(service_configs).totals()
+
+        row = None
         for node_id, row in service_configs.iteritems():
             if isinstance(row, Exception):
                 row = {}
@@ -859,13 +818,6 @@ class CliView(object):
             row['NODE'] = prefixes[node_id]
             t.insertRow(row)
 
-            if show_total:
-                for key, val in row.iteritems():
-                    if (val.isdigit()):
-                        try:
-                            rowTotal[key] = rowTotal[key] + int(val)
-                        except Exception:
-                            rowTotal[key] = int(val)
         if show_total:
             rowTotal['NODE'] = "Total"
             t.insertRow(rowTotal)
@@ -1126,6 +1078,36 @@ class CliView(object):
                 t.insertRow(row)
         CliView.print_result(t)
 
+    @staticmethod
+    def showCacheStats(stats, **ignore):
+        title = "Info Cache Statistics"
+        column_names = ('Cache',
+                        'Entries',
+                        'Max Size',
+                        'Hits',
+                        'Misses',
+                        'Shared',
+                        'Evictions',
+                        'Hit Ratio')
+        t = Table(title, column_names)
+        for stat in stats:
+            calls = stat['hits'] + stat['misses'] + stat['shared']
+            row = {}
+            row['Cache'] = stat['name']
+            row['Entries'] = stat['entries']
+            row['Max Size'] = stat['max_size']
+            row['Hits'] = stat['hits']
+            row['Misses'] = stat['misses']
+            row['Shared'] = stat['shared']
+            row['Evictions'] = stat['evictions']
+            if calls:
+                row['Hit Ratio'] = "%.2f"%(
+                    float(stat['hits'] + stat['shared']) / calls)
+            else:
+                row['Hit Ratio'] = "N/E"
+            t.insertRow(row)
+        CliView.print_result(t)
+
     @staticmethod
     def dun(results, cluster, **kwargs):
         for node_id, command_result in results.iteritems():
@@ -1174,6 +1156,69 @@ class CliView(object):
                 yield peeked.pop(0)
             yield val
 
+    @staticmethod
+    def diff_text(previous, output):
+        """
+        output with the characters that differ from previous inverted, for
+        watch output not drawn by Table.
+        """
+
+        highlight = False
+        result = []
+        prev_iterator = CliView.group_output(previous)
+        next_peeked = []
+        next_iterator = CliView.group_output(output)
+        next_iterator = CliView.peekable(next_peeked, next_iterator)
+
+        for prev_group in prev_iterator:
+            if '\033' in prev_group:
+                # skip prev escape seq
+                continue
+
+            for next_group in next_iterator:
+                if '\033' in next_group:
+                    # add current escape seq
+                    result += next_group
+                    continue
+                elif next_group == '\n':
+                    if prev_group != '\n':
+                        next_peeked.append(next_group)
+                        break
+                    if highlight:
+                        result += terminal.uninverse()
+                        highlight = False
+                elif prev_group == next_group:
+                    if highlight:
+                        result += terminal.uninverse()
+                        highlight = False
+                else:
+                    if not highlight:
+                        result += terminal.inverse()
+                        highlight = True
+
+                result += next_group
+
+                if '\n' == prev_group and '\n' != next_group:
+                    continue
+                break
+
+        for next_group in next_iterator:
+            if next_group == ' ' or next_group == '\n':
+                if highlight:
+                    result += terminal.uninverse()
+                    highlight = False
+            else:
+                if not highlight:
+                    result += terminal.inverse()
+                    highlight = True
+
+            result += next_group
+
+        if highlight:
+            result += terminal.reset()
+
+        return "".join(result)
+
     @staticmethod
     def watch(ctrl, line):
         diff_highlight = True
@@ -1204,74 +1249,22 @@ class CliView(object):
             real_stdout = sys.stdout
             sys.stdout = mystdout = StringIO()
             previous = None
+            if diff_highlight:
+                # tables compare their cells with the previous iteration
+                Table.diff = TableDiff()
             count = 1
             while True:
-                highlight = False
                 ctrl.execute(line[:])
                 output = mystdout.getvalue()
                 mystdout.truncate(0)
                 mystdout.seek(0)
 
-                if previous and diff_highlight:
-                    result = []
-                    prev_iterator = CliView.group_output(previous)
-                    next_peeked = []
-                    next_iterator = CliView.group_output(output)
-                    next_iterator = CliView.peekable(next_peeked, next_iterator)
-
-                    for prev_group in prev_iterator:
-                        if '\033' in prev_group:
-                            # skip prev escape seq
-                            continue
-
-                        for next_group in next_iterator:
-                            if '\033' in next_group:
-                                # add current escape seq
-                                result += next_group
-                                continue
-                            elif next_group == '\n':
-                                if prev_group != '\n':
-                                    next_peeked.append(next_group)
-                                    break
-                                if highlight:
-                                    result += terminal.uninverse()
-                                    highlight = False
-                            elif prev_group == next_group:
-                                if highlight:
-                                    result += terminal.uninverse()
-                                    highlight = False
-                            else:
-                                if not highlight:
-                                    result += terminal.inverse()
-                                    highlight = True
-
-                            result += next_group
-
-                            if '\n' == prev_group and '\n' != next_group:
-                                continue
-                            break
-
-                    for next_group in next_iterator:
-                        if next_group == ' ' or next_group == '\n':
-                            if highlight:
-                                result += terminal.uninverse()
-                                highlight = False
-                        else:
-                            if not highlight:
-                                result += terminal.inverse()
-                                highlight = True
-
-                        result += next_group
-
-                    if highlight:
-                        result += terminal.reset()
-                        highlight = False
-
-                    result = "".join(result)
-                    previous = output
-                else:
-                    result = output
-                    previous = output
+                result = output
+                if Table.diff is not None and not Table.diff.nextIteration() \
+                        and previous is not None:
+                    # no table was drawn (e.g. asinfo), diff the text instead
+                    result = CliView.diff_text(previous, output)
+                previous = output
 
                 ts = time.time()
                 st = datetime.datetime.fromtimestamp(ts).strftime(' %Y-%m-%d %H:%M:%S')
@@ -1294,5 +1287,6 @@ class CliView(object):
         except (KeyboardInterrupt, SystemExit):
             return
         finally:
+            Table.diff = None
             sys.stdout = real_stdout
             print ''
@@ -0,0 +1,149 @@
+# Copyright 2013-2016 Aerospike, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Micro-benchmark of the info response parsers in lib.util against the
+previous regex/groupby implementation.
+
+Usage: python -m test.perf.bench_info_parser [iterations]
+"""
+
+import itertools
+import re
+import sys
+import timeit
+
+from lib import util
+
+# Shape of a 3.9 "statistics" response: a few hundred key=value pairs with
+# counters, percentages, booleans and comma separated lists.
+SERVICE_STATS = [
+    'cluster_size=60', 'cluster_key=9F3C0E4A2B1D7C65', 'cluster_integrity=true'
+    , 'objects=1864835211', 'sub-records=0', 'total-bytes-disk=6442450944000'
+    , 'used-bytes-disk=2936719212544', 'free-pct-disk=54'
+    , 'total-bytes-memory=206158430208', 'used-bytes-memory=134431817728'
+    , 'data-used-bytes-memory=0', 'index-used-bytes-memory=119349453504'
+    , 'free-pct-memory=34', 'stat_read_reqs=89713253377'
+    , 'stat_read_success=88123523145', 'stat_read_errs_notfound=1589730232'
+    , 'stat_write_reqs=12937485721', 'stat_write_success=12937480012'
+    , 'stat_write_errs=5709', 'stat_rw_timeout=312', 'stat_proxy_reqs=7734'
+    , 'stat_proxy_success=7731', 'stat_proxy_errs=3', 'uptime=8734211'
+    , 'migrate_msgs_sent=0', 'migrate_msgs_recv=0', 'migrate_progress_send=0'
+    , 'migrate_progress_recv=0', 'migrate_num_incoming_accepted=0'
+    , 'paxos_principal=BB9A0F3C4D2B1E0', 'system_swapping=false'
+    , 'system_free_mem_pct=61', 'client_connections=4211'
+    , 'heartbeat_received_self=0', 'heartbeat_received_foreign=893481223'
+    , 'batch_index_initiate=120398712', 'batch_index_complete=120398551'
+    , 'sindex_ucgarbage_found=0', 'query_reqs=0', 'queue=0'
+    , 'transactions=104412331942', 'fabric_msgs_sent=9923810223'
+    , 'fabric_msgs_rcvd=9923810110', 'info_queue=0', 'delete_queue=0'
+    , 'reaped_fds=87712', 'tree_gc_queue=0', 'objects_expired=9877123'
+    , 'storage_defrag_corrupt_record=0', 'err_tsvc_requests=771'
+    , 'err_out_of_space=0', 'err_duplicate_proxy_request=0'
+    , 'err_rw_pending_limit=77', 'err_replica_null_node=0'
+    , 'basic_scans_succeeded=1431', 'basic_scans_failed=2'
+    , 'scans_active=0', 'udf_read_reqs=0', 'udf_write_reqs=0'
+    , 'xdr_ship_success=0', 'dlog_used_objects=0'
+    , 'paxos_succession_list=BB9A0F3C4D2B1E0,BB9A0F3C4D2B1E1,BB9A0F3C4D2B1E2'
+]
+# pad with per-histogram and per-thread style counters until the response
+# has about as many pairs as a real one
+SERVICE_STATS += ['%s_%s_%d=%d'%(prefix, suffix, i, i * 7919)
+                  for i in range(12)
+                  for prefix in ('batch_index', 'fabric', 'tsvc', 'proxy')
+                  for suffix in ('reqs', 'success', 'timeout', 'errors'
+                                 , 'queue', 'bytes')]
+STATISTICS = ";".join(SERVICE_STATS)
+
+NAMESPACE_STATS = ";".join(
+    ['type=device', 'objects=31082253', 'memory-size=17179869184'
+     , 'high-water-disk-pct=50', 'high-water-memory-pct=60'
+     , 'stop-writes-pct=90', 'repl-factor=2', 'default-ttl=2592000'
+     , 'storage-engine=device', 'storage-engine.device=/dev/nvme0n1'
+     , 'storage-engine.device=/dev/nvme1n1', 'storage-engine.device=/dev/nvme2n1'
+     , 'enable-xdr=false', 'sets-enable-xdr=true', 'conflict-resolution-policy=generation']
+    + ['%s=%d'%(name, i * 104729) for i, name in enumerate(
+        '%s_%s'%(a, b) for a in ('client_read', 'client_write', 'client_delete'
+                                 , 'client_udf', 'client_lang', 'batch_sub'
+                                 , 'scan_basic', 'scan_aggr', 'query_lookup'
+                                 , 'xdr_write', 'fail', 'master', 'prole')
+        for b in ('success', 'error', 'timeout', 'not_found', 'filtered_out'
+                  , 'objects', 'tombstones', 'bytes')) ])
+
+SETS = ";".join("ns_name=test:set_name=set%d:n_objects=%d:set-stop-writes-count=0"
+                ":set-evict-hwm-count=0:set-enable-xdr=use-default:set-delete=false"
+                %(i, i * 31337) for i in range(200))
+
+DC_CONFIG = ";".join("DC_Name=dc%d:DC_type=aerospike:DC_nodes=10.0.%d.1+3000,"
+                     "10.0.%d.2+3000:DC_int_ext_ipmap=:DC_ship_bins=true"
+                     %(i, i, i) for i in range(20))
+
+# the implementation these parsers replaced, kept as the reference
+
+def legacy_info_to_dict(value, delimiter = ';'):
+    stat_dict = {}
+    stat_param = itertools.imap(lambda sp: legacy_info_to_tuple(sp, "="),
+                                legacy_info_to_list(value, delimiter))
+    for g in itertools.groupby(stat_param, lambda x: x[0]):
+        try:
+            value = map(lambda v: v[1], g[1])
+            value = ",".join(sorted(value)) if len(value) > 1 else value[0]
+            stat_dict[g[0]] = value
+        except Exception:
+            pass
+    return stat_dict
+
+def legacy_info_to_dict_multi_level(value, keyname, delimiter1 = ';', delimiter2 = ':'):
+    value_list = legacy_info_to_list(value, delimiter1)
+    value_dict = {}
+    for v in value_list:
+        values = legacy_info_to_dict(v, delimiter2)
+        if not values or isinstance(values,Exception) or keyname not in values.keys():
+            continue
+        value_dict[values[keyname]] = values
+    return value_dict
+
+def legacy_info_to_list(value, delimiter = ";"):
+    return re.split(delimiter, value)
+
+def legacy_info_to_tuple(value, delimiter = ":"):
+    return tuple(legacy_info_to_list(value, delimiter))
+
+CASES = (
+    ("statistics", lambda: legacy_info_to_dict(STATISTICS)
+     , lambda: util.info_to_dict(STATISTICS))
+    , ("namespace", lambda: legacy_info_to_dict(NAMESPACE_STATS)
+       , lambda: util.info_to_dict(NAMESPACE_STATS))
+    , ("sets", lambda: [legacy_info_to_dict(s, ':') for s in SETS.split(';')]
+       , lambda: [util.info_colon_to_dict(s) for s in SETS.split(';')])
+    , ("dc-config", lambda: legacy_info_to_dict_multi_level(DC_CONFIG, "DC_Name")
+       , lambda: util.info_to_dict_multi_level(DC_CONFIG, "DC_Name"))
+)
+
+def main(iterations=2000):
+    print "%-12s %12s %12s %8s"%("payload", "legacy (us)", "new (us)", "speedup")
+    for name, legacy, new in CASES:
+        assert legacy() == new(), "%s: parsers disagree"%(name)
+        t_legacy = min(timeit.repeat(legacy, number=iterations, repeat=3))
+        t_new = min(timeit.repeat(new, number=iterations, repeat=3))
+        print "%-12s %12.1f %12.1f %7.1fx"%(name
+                                             , t_legacy * 1e6 / iterations
+                                             , t_new * 1e6 / iterations
+                                             , t_legacy / t_new)
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        main(int(sys.argv[1]))
+    else:
+        main()
@@ -0,0 +1,196 @@
+# Copyright 2013-2016 Aerospike, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Benchmark of Logger.server_log_merger on synthetic node log streams against
+the previous all-pairs implementation.
+
+Usage: python -m test.perf.bench_log_merger [rows per node]
+"""
+
+import datetime
+import random
+import shutil
+import sys
+import tempfile
+import timeit
+
+from lib import terminal
+from lib.logger import Logger, DT_FMT
+from lib.logreader import SHOW_RESULT_KEY, COUNT_RESULT_KEY, END_ROW_KEY
+
+START = datetime.datetime(2016, 7, 1, 10, 0, 0)
+
+def show_stream(node, rows, seed):
+    # grep output: one line per row, several nodes log in the same second
+    rnd = random.Random(seed)
+    tm = START
+    for i in xrange(rows):
+        tm += datetime.timedelta(seconds=rnd.randint(0, 3))
+        yield tm, "%s GMT: INFO (info): line %d of node %s\n"%(
+            tm.strftime(DT_FMT), i, node)
+    while True:
+        yield None, None
+
+def count_stream(node, rows, seed):
+    # grepCount output: one {COUNT_RESULT_KEY: {slice: count}} per slice
+    rnd = random.Random(seed)
+    for i in xrange(rows):
+        tm = START + datetime.timedelta(seconds=10 * i + rnd.randint(0, 1))
+        yield tm, {COUNT_RESULT_KEY: {tm.strftime(DT_FMT): rnd.randint(0, 99)}}
+    yield END_ROW_KEY, {COUNT_RESULT_KEY: {"Total": rows}}
+
+def streams(kind, nodes, rows):
+    make = show_stream if kind == "show" else count_stream
+    return dict(("node%02d"%(n), make("node%02d"%(n), rows, n))
+                for n in range(nodes))
+
+# the implementation the heap based merger replaced, kept as the reference
+
+def legacy_server_log_merger(self, file_streams, output_page_size=3, return_strings=False, end_key=END_ROW_KEY, default_value=[]):
+    latency_end={}
+    result = {}
+    merge_result = {}
+    tm_keys = {}
+    need_to_process = False
+    keys_in_input = []
+    result_count = 0
+    for key in file_streams.keys():
+        if not return_strings:
+            merge_result[key] = {}
+        try:
+            tm, res = file_streams[key].next()
+            if not tm:
+                continue
+            if tm == end_key:
+                latency_end[key] = res
+                continue
+        except Exception:
+            continue
+        need_to_process = True
+        result[key] = {}
+        tm_keys[key] = {}
+        if not return_strings:
+            if not keys_in_input:
+                keys_in_input = res.keys()
+        tm_keys[key] = tm
+        result[key] = res
+
+    if return_strings:
+        colors = self.get_fg_bg_color_index_list(len(file_streams))
+
+    while need_to_process:
+        need_to_process = False
+        try:
+            min_keys = [k for k, x in tm_keys.items() if not any(y < x for y in tm_keys.values())]
+        except Exception:
+            break
+        if not min_keys:
+            break
+        current_tm = tm_keys[min_keys[0]]
+        for file_key in sorted(file_streams.keys()):
+            if file_key in min_keys:
+                if return_strings:
+                    try:
+                        merge_result[SHOW_RESULT_KEY] += "%s  %s%s::" % (self.bg_colors[colors[(file_streams.keys().index(file_key))][0]][1](), terminal.reset(), file_key)
+                    except Exception:
+                        merge_result[SHOW_RESULT_KEY] = "%s  %s%s::" % (self.bg_colors[colors[(file_streams.keys().index(file_key))][0]][1](), terminal.reset(), file_key)
+                    merge_result[SHOW_RESULT_KEY] += result[file_key]
+                else:
+                    if merge_result[file_key]:
+                        for k in keys_in_input:
+                            merge_result[file_key][k].update(result[file_key][k])
+                    else:
+                        merge_result[file_key].update(result[file_key])
+                del result[file_key]
+                del tm_keys[file_key]
+                try:
+                    tm, res = file_streams[file_key].next()
+                    if not tm:
+                        continue
+                    if tm == end_key:
+                        latency_end[file_key] = res
+                        continue
+                except Exception:
+                    continue
+                need_to_process = True
+                tm_keys[file_key] = tm
+                result[file_key] = res
+            else:
+                if file_key in tm_keys and tm_keys[file_key]:
+                    need_to_process = True
+                if return_strings:
+                    continue
+                for k in keys_in_input:
+                    if k not in merge_result[file_key]:
+                        merge_result[file_key][k] = {}
+                    merge_result[file_key][k][current_tm.strftime(DT_FMT)] = default_value
+        result_count += 1
+        if result_count == output_page_size:
+            yield merge_result
+            result_count = 0
+            merge_result = {}
+            if return_strings:
+                continue
+            for key in file_streams.keys():
+                merge_result[key] = {}
+    if not latency_end:
+        yield merge_result
+    else:
+        self.balance_dict(latency_end, file_streams.keys(), default_value)
+        for file_key in latency_end:
+            if file_key not in merge_result or not merge_result[file_key]:
+                merge_result[file_key] = latency_end[file_key]
+            else:
+                for sub_key in latency_end[file_key]:
+                    if sub_key not in merge_result[file_key] or not merge_result[file_key][sub_key]:
+                        merge_result[file_key][sub_key] = latency_end[file_key][sub_key]
+                    else:
+                        merge_result[file_key][sub_key].update(latency_end[file_key][sub_key])
+        yield merge_result
+
+CASES = (
+    ("show", {"output_page_size": 100, "return_strings": True})
+    , ("count", {"output_page_size": 1000, "default_value": 0})
+)
+
+def main(rows=2000):
+    # colors would only differ in escape codes
+    terminal.enable_color(False)
+    log_dir = tempfile.mkdtemp()
+    try:
+        logger = Logger(log_dir)
+    finally:
+        shutil.rmtree(log_dir)
+
+    print "%-6s %6s %9s %12s %12s %8s"%("output", "nodes", "rows/node"
+                                        , "legacy (s)", "heap (s)", "speedup")
+    for kind, kwargs in CASES:
+        for nodes in (4, 16, 64):
+            legacy = lambda: list(legacy_server_log_merger(
+                logger, streams(kind, nodes, rows), **kwargs))
+            new = lambda: list(logger.server_log_merger(
+                streams(kind, nodes, rows), **kwargs))
+            assert legacy() == new(), "%s/%d: mergers disagree"%(kind, nodes)
+            t_legacy = min(timeit.repeat(legacy, number=1, repeat=3))
+            t_new = min(timeit.repeat(new, number=1, repeat=3))
+            print "%-6s %6d %9d %12.3f %12.3f %7.1fx"%(kind, nodes, rows
+                                                       , t_legacy, t_new
+                                                       , t_legacy / t_new)
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        main(int(sys.argv[1]))
+    else:
+        main()
@@ -0,0 +1,202 @@
+# Copyright 2013-2016 Aerospike, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Benchmark of LogLatency.compute_latency (histogram dump tokenizer and
+read_hist) against the previous per-bucket regex, recursive implementation,
+and of LogLatency.compute_latencies, several histograms in one pass, against
+one compute_latency pass per histogram.
+
+The log is generated in the layout of a 3.x server log: a histogram dump
+every 10 seconds per histogram, namespace histograms for several
+namespaces, and other info lines in between.
+
+Usage: python -m test.perf.bench_loglatency [hours]
+"""
+
+import copy
+import datetime
+import os
+import random
+import re
+import shutil
+import sys
+import tempfile
+import timeit
+
+from lib.loglatency import LogLatency, ALL_BUCKETS, BUCKET_LABELS, NS_SLICE_SECONDS
+from lib.logreader import LogReader, DT_FMT
+
+HIST_HEAD = "%s GMT: INFO (info): (hist.c::137) histogram dump: %s (%d total) msec\n"
+HIST_ROW = "%s GMT: INFO (info): (hist.c::154)  %s\n"
+OTHER = "%s GMT: INFO (info): (thr_info.c::4840)  system memory: free %d%%\n"
+NAMESPACES = ["test", "bar", "users", "events"]
+
+def histogram(tm, name, total, rnd):
+    lines = [HIST_HEAD%(tm, name, total)]
+    buckets = []
+    left = total
+    for b in range(rnd.randint(6, ALL_BUCKETS)):
+        count = left if b == 0 else rnd.randint(0, left / 8 + 1)
+        buckets.append("(%s: %010d)"%(BUCKET_LABELS[b], count))
+    for i in range(0, len(buckets), 4):
+        lines.append(HIST_ROW%(tm, " ".join(buckets[i:i + 4])))
+    return lines
+
+def log_lines(hours):
+    rnd = random.Random(7)
+    start = datetime.datetime(2016, 7, 1, 0, 0, 0)
+    totals = {}
+    lines = []
+    for s in range(0, hours * 3600, 10):
+        tm = (start + datetime.timedelta(seconds=s)).strftime(DT_FMT)
+        lines.append(OTHER%(tm, rnd.randint(0, 99)))
+        for name in ["reads", "writes_master"] + ["{%s}-read"%(ns) for ns in NAMESPACES]:
+            totals[name] = totals.get(name, 0) + rnd.randint(1000, 100000)
+            lines.extend(histogram(tm, name, totals[name], rnd))
+        lines.append(OTHER%(tm, rnd.randint(0, 99)))
+    return lines
+
+class LegacyLogLatency(LogLatency):
+    # the implementation LogLatency replaced, kept as the reference
+
+    def read_bucket_values(self, line, file_itr):
+        values = {}
+        for b in range(ALL_BUCKETS):
+            values[b] = 0
+        total = self.parse_total_ops(line)
+        line = self.read_line(file_itr)
+        if not line:
+            return 0, 0, 0
+        b_min = 0
+        while True:
+            found = 0
+            for b in range(b_min, ALL_BUCKETS):
+                pattern = '.*?\(' + BUCKET_LABELS[b] + ': (.*?)\).*?'
+                r = re.compile(pattern)
+                if r.search(line):
+                    found = found + 1
+                    values[b] = long(r.search(line).group(1))
+            if found == 0:
+                break
+            line = self.read_line(file_itr)
+            if not line:
+                return 0, 0, 0
+            b_min = b_min + found
+        return total, values, line
+
+    def read_hist(self, hist_tags, after_dt, file_itr, line=0, end_dt=None, before_dt=None):
+        if not line:
+            line = self.read_line(file_itr)
+        while True:
+            if not line:
+                return 0, 0, 0, 0
+            dt = self.log_reader.parse_dt(line)
+            if dt<after_dt:
+                line = self.read_line(file_itr)
+                continue
+            if end_dt and dt>end_dt:
+                return 0, 0, dt, line
+            if before_dt and dt>before_dt:
+                return 0, 0, dt, line
+            if any(re.search(ht, line) for ht in hist_tags):
+                break
+            line = self.read_line(file_itr)
+
+        total, values, line = self.read_bucket_values(line, file_itr)
+        if not line:
+            return 0, 0, 0, 0
+        if not before_dt:
+            before_dt = dt+datetime.timedelta(seconds=NS_SLICE_SECONDS)
+        r_total, r_values, r_dt, line = self.read_hist(hist_tags,after_dt,file_itr,line,end_dt,before_dt)
+        total += r_total
+        if r_values:
+            values = self.add_buckets(values, r_values)
+        return total, values, dt, line
+
+def latency(cls, lines, hist, ns):
+    reader = LogReader()
+    start = reader.parse_dt(lines[0])
+    end = reader.parse_dt(lines[-1]) + datetime.timedelta(seconds=10)
+    itr = ((reader.parse_dt(line), line) for line in lines)
+    return [copy.deepcopy(r) for r in cls(reader).compute_latency(
+        itr, hist, datetime.timedelta(seconds=60), start, end, 5, 1, arg_ns=ns)]
+
+def write_padded_log(path, lines, padding):
+    # a real log has many more other lines than histogram dumps
+    rnd = random.Random(11)
+    with open(path, "w") as f:
+        for line in lines:
+            f.write(line)
+            if "system memory" in line:
+                for i in range(padding):
+                    f.write(OTHER%(line[:20], rnd.randint(0, 99)))
+
+def latencies(path, hists, one_pass):
+    reader = LogReader()
+    with open(path) as f:
+        start = reader.parse_dt(f.readline())
+    end = start + datetime.timedelta(days=1)
+    args = (datetime.timedelta(seconds=60), start, end, 5, 1)
+    result = {}
+    if one_pass:
+        with open(path) as f:
+            itr = ((reader.parse_dt(line), line) for line in f)
+            for name, latency_it in LogLatency(reader).compute_latencies(itr, hists, *args).iteritems():
+                result[name] = [copy.deepcopy(r) for r in latency_it]
+    else:
+        for hist in hists:
+            with open(path) as f:
+                itr = ((reader.parse_dt(line), line) for line in f)
+                result[hist] = [copy.deepcopy(r) for r in LogLatency(reader).compute_latency(itr, hist, *args)]
+    return result
+
+# "read" without a namespace sums the read histograms of all namespaces
+CASES = (("reads", "reads", None), ("namespace read", "read", "test")
+         , ("all ns read", "read", None))
+
+def main(hours=2):
+    lines = log_lines(hours)
+    print "%-16s %8s %12s %12s %8s"%("histogram", "lines", "legacy (s)", "new (s)"
+                                     , "speedup")
+    for name, hist, ns in CASES:
+        assert latency(LegacyLogLatency, lines, hist, ns) \
+            == latency(LogLatency, lines, hist, ns), "%s: results disagree"%(name)
+        t_legacy = min(timeit.repeat(lambda: latency(LegacyLogLatency, lines, hist, ns)
+                                     , number=1, repeat=3))
+        t_new = min(timeit.repeat(lambda: latency(LogLatency, lines, hist, ns)
+                                  , number=1, repeat=3))
+        print "%-16s %8d %12.3f %12.3f %7.1fx"%(name, len(lines), t_legacy, t_new
+                                                , t_legacy / t_new)
+
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmp_dir, "aerospike.log")
+        write_padded_log(path, lines, 40)
+        print
+        print "%-32s %12s %12s %8s"%("histograms", "separate (s)", "one pass (s)", "speedup")
+        for hists in (["reads", "writes_master"], ["reads", "writes_master", "read"]):
+            assert latencies(path, hists, False) == latencies(path, hists, True)
+            t_separate = min(timeit.repeat(lambda: latencies(path, hists, False), number=1, repeat=3))
+            t_one_pass = min(timeit.repeat(lambda: latencies(path, hists, True), number=1, repeat=3))
+            print "%-32s %12.3f %12.3f %7.1fx"%(",".join(hists), t_separate, t_one_pass
+                                                , t_separate / t_one_pass)
+    finally:
+        shutil.rmtree(tmp_dir)
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        main(int(sys.argv[1]))
+    else:
+        main()
@@ -0,0 +1,70 @@
+# Copyright 2013-2016 Aerospike, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Benchmark of LogReader.parse_dt and parse_epoch against the previous
+strptime based parse_dt, over synthetic server log lines.
+
+Usage: python -m test.perf.bench_parse_dt [lines]
+"""
+
+import calendar
+import datetime
+import sys
+import time
+import timeit
+
+from lib.logreader import LogReader, DT_FMT
+
+LINE = "%s GMT: INFO (info): (thr_info.c::4840)  system memory: free 61%%\n"
+
+def log_lines(count, per_second):
+    start = datetime.datetime(2016, 7, 1, 10, 0, 0)
+    return [LINE%((start + datetime.timedelta(seconds=i / per_second)).strftime(DT_FMT))
+            for i in xrange(count)]
+
+# the implementation parse_dt replaced, kept as the reference
+
+def legacy_parse_dt(line, dt_len = 6):
+    prefix = line[0: line.find(" GMT")].split(",")[0]
+    return datetime.datetime(*(time.strptime(prefix, DT_FMT)[0:dt_len]))
+
+def main(count=20000):
+    print "%-14s %12s %12s %12s %8s"%("lines/second", "legacy (us)"
+                                      , "parse_dt (us)", "epoch (us)", "speedup")
+    for per_second in (1, 4, 50):
+        lines = log_lines(count, per_second)
+        reader = LogReader()
+        assert [legacy_parse_dt(l) for l in lines] == [reader.parse_dt(l) for l in lines]
+        assert [calendar.timegm(legacy_parse_dt(l).timetuple()) for l in lines] \
+            == [reader.parse_epoch(l) for l in lines]
+
+        t_legacy = min(timeit.repeat(lambda: [legacy_parse_dt(l) for l in lines]
+                                     , number=1, repeat=3))
+        # a fresh reader per run, memos start empty
+        t_dt = min(timeit.repeat(lambda: map(LogReader().parse_dt, lines)
+                                 , number=1, repeat=3))
+        t_epoch = min(timeit.repeat(lambda: map(LogReader().parse_epoch, lines)
+                                    , number=1, repeat=3))
+        print "%-14d %12.2f %12.2f %12.2f %7.1fx"%(per_second
+                                                   , t_legacy * 1e6 / count
+                                                   , t_dt * 1e6 / count
+                                                   , t_epoch * 1e6 / count
+                                                   , t_legacy / t_epoch)
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        main(int(sys.argv[1]))
+    else:
+        main()
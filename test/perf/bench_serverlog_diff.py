@@ -0,0 +1,276 @@
+# Copyright 2013-2016 Aerospike, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Benchmark of ServerLog.diff (value pattern compiled once, slice sums taken
+column-wise) against the previous implementation which formatted and
+searched four patterns per line until the first match.
+
+The log holds counters in each of the value formats diff understands, with
+other info lines in between and a few gaps of several slices.
+
+Usage: python -m test.perf.bench_serverlog_diff [lines]
+"""
+
+import copy
+import datetime
+import os
+import random
+import re
+import shutil
+import sys
+import tempfile
+import timeit
+
+from lib.logreader import LogReader
+from lib.serverlog import ServerLog, DT_FMT
+
+LINES = ["%s GMT: INFO (info): (thr_info.c::4900)  trans_in_progress: wr 0 prox 0 tsvc-q %d\n"
+         , "%s GMT: INFO (info): (hist.c::137)  histogram dump: reads (%d, %d, %d) total\n"
+         , "%s GMT: INFO (info): (thr_info.c::4800)  %d(%d) hits\n"
+         , "%s GMT: INFO (info): (thr_info.c::4830)  fds: proto (%d open\n"
+         , "%s GMT: INFO (info): (thr_info.c::4840)  system memory: free %d%%\n"]
+
+def write_log(path, n_lines):
+    rnd = random.Random(7)
+    tm = datetime.datetime(2016, 7, 1, 0, 0, 0)
+    totals = [0] * 4
+    with open(path, "w") as f:
+        for i in range(n_lines):
+            tm += datetime.timedelta(seconds=900 if i % 5000 == 4999 else rnd.randint(1, 3))
+            s = tm.strftime(DT_FMT)
+            for k in range(len(totals)):
+                totals[k] += rnd.randint(0, 50)
+            k = i % len(LINES)
+            if k == 0:
+                f.write(LINES[k]%(s, totals[0]))
+            elif k == 1:
+                f.write(LINES[k]%(s, totals[0], totals[1], totals[2]))
+            elif k == 2:
+                f.write(LINES[k]%(s, totals[2], totals[3]))
+            elif k == 3:
+                f.write(LINES[k]%(s, totals[3]))
+            else:
+                f.write(LINES[k]%(s, rnd.randint(0, 99)))
+
+class LegacyServerLog(ServerLog):
+    # the implementation ServerLog.diff replaced, kept as the reference
+
+    def contains_substrings_in_order(self, main_str="", sub_strs=[]):
+        if not sub_strs:
+            return True
+        if not main_str:
+            return False
+        s_str = sub_strs[0]
+        if not s_str:
+            return True
+        if s_str in main_str:
+            try:
+                main_str = main_str.split(s_str, 1)[1]
+            except Exception:
+                main_str = ""
+            if len(sub_strs) <= 1:
+                return True
+            return self.contains_substrings_in_order(main_str, sub_strs[1:])
+        else:
+            return False
+
+    def diff(self):
+        latencyPattern1 = '%s (\d+)'
+        latencyPattern2 = '%s \(([0-9,\s]+)\)'
+        latencyPattern3 = '(\d+)\((\d+)\) %s'
+        latencyPattern4 = '%s \((\d+)'
+        grep_str = self.search_strings[-1]
+        line = self.next_line()
+        if line:
+
+            value = []
+            diff = []
+
+            slice_start = self.process_start_tm
+            slice_end = slice_start + self.slice_duration
+            while(self.log_reader.parse_dt(line) < slice_start):
+                line = self.next_line()
+                if not line:
+                    break
+
+        if line:
+            if self.contains_substrings_in_order(main_str=line, sub_strs=self.search_strings):
+                if self.is_casesensitive:
+                    m1 = re.search(latencyPattern1 % (grep_str), line)
+                    m2 = re.search(latencyPattern2 % (grep_str), line)
+                    m3 = re.search(latencyPattern3 % (grep_str), line)
+                    m4 = re.search(latencyPattern4 % (grep_str), line)
+                else:
+                    m1 = re.search(latencyPattern1 % (grep_str), line, re.IGNORECASE)
+                    m2 = re.search(latencyPattern2 % (grep_str), line, re.IGNORECASE)
+                    m3 = re.search(latencyPattern3 % (grep_str), line, re.IGNORECASE)
+                    m4 = re.search(latencyPattern4 % (grep_str), line, re.IGNORECASE)
+
+            while(not m1 and not m2 and not m3 and not m4):
+                try:
+                    line = self.next_line()
+                    if not line:
+                        break
+                    if not self.contains_substrings_in_order(main_str=line, sub_strs=self.search_strings):
+                        continue
+                except Exception:
+                    break
+
+                if self.is_casesensitive:
+                    m1 = re.search(latencyPattern1 % (grep_str), line)
+                    m2 = re.search(latencyPattern2 % (grep_str), line)
+                    m3 = re.search(latencyPattern3 % (grep_str), line)
+                    m4 = re.search(latencyPattern4 % (grep_str), line)
+                else:
+                    m1 = re.search(latencyPattern1 % (grep_str), line, re.IGNORECASE)
+                    m2 = re.search(latencyPattern2 % (grep_str), line, re.IGNORECASE)
+                    m3 = re.search(latencyPattern3 % (grep_str), line, re.IGNORECASE)
+                    m4 = re.search(latencyPattern4 % (grep_str), line, re.IGNORECASE)
+
+        if line:
+            slice_count = 0
+            if (self.log_reader.parse_dt(line) >= slice_end):
+                slice_start, slice_end, slice_count = self.get_next_slice_start_and_end_tm(slice_start, slice_end, self.slice_duration,self.log_reader.parse_dt(line))
+                # slice_count -= 1
+            if slice_end > self.process_end_tm:
+                slice_end = self.process_end_tm
+            pattern = ""
+            prev = []
+            slice_val = []
+            pattern_type = 0
+            if m1:
+                pattern = latencyPattern1 % (grep_str)
+                if not slice_count%self.slice_show_count:
+                    slice_val.append(int(m1.group(1)))
+            elif m2:
+                pattern = latencyPattern2 % (grep_str)
+                if not slice_count%self.slice_show_count:
+                    slice_val = map(lambda x: int(x), m2.group(1).split(","))
+                pattern_type = 1
+            elif m3:
+                pattern = latencyPattern3 % (grep_str)
+                if not slice_count%self.slice_show_count:
+                    slice_val = map(lambda x: int(x), list(m3.groups()))
+                pattern_type = 2
+            elif m4:
+                pattern = latencyPattern4 % (grep_str)
+                if not slice_count%self.slice_show_count:
+                    slice_val.append(int(m4.group(1)))
+                pattern_type = 3
+
+            result = {}
+            result["value"] = {}
+            result["diff"] = {}
+
+            for line_tm, line in self.show_it:
+                if not line:
+                    break
+
+                if not self.contains_substrings_in_order(main_str=line, sub_strs=self.search_strings):
+                    continue
+
+                if line_tm >= self.process_end_tm:
+                    if not slice_count%self.slice_show_count:
+                        value, diff = self.get_value_and_diff(prev, slice_val)
+                        if value and diff:
+                            tm = slice_start.strftime(DT_FMT)
+                            result["value"][tm]=value
+                            result["diff"][tm]=diff
+                            yield slice_start, result
+                            result["value"] = {}
+                            result["diff"] = {}
+                            value = []
+                            diff = []
+                    slice_val = []
+                    break
+
+                if line_tm >= slice_end:
+                    if not slice_count%self.slice_show_count:
+                        value, diff = self.get_value_and_diff(prev, slice_val)
+                        if value and diff:
+                            tm = slice_start.strftime(DT_FMT)
+                            result["value"][tm]=value
+                            result["diff"][tm]=diff
+                            yield slice_start, result
+                            result["value"] = {}
+                            result["diff"] = {}
+                            value = []
+                            diff = []
+                        prev = slice_val
+                    slice_start, slice_end, slice_count_jump = self.get_next_slice_start_and_end_tm(slice_start, slice_end, self.slice_duration,line_tm)
+                    slice_count = (slice_count+slice_count_jump)%self.slice_show_count
+                    slice_val = []
+                    if slice_end > self.process_end_tm:
+                        slice_end = self.process_end_tm
+
+                if not slice_count%self.slice_show_count:
+                    if self.is_casesensitive:
+                        m = re.search(pattern, line)
+                    else:
+                        m = re.search(pattern, line, re.IGNORECASE)
+
+                    if m:
+                        if pattern_type == 2:
+                            current = map(lambda x: int(x), list(m.groups()))
+                        else:
+                            current = map(lambda x: int(x), m.group(1).split(","))
+                        if slice_val:
+                            slice_val = ([b + a for b, a in zip(current, slice_val)])
+                        else:
+                            slice_val = ([b for b in current])
+
+            if not slice_count%self.slice_show_count and slice_val:
+                value, diff = self.get_value_and_diff(prev, slice_val)
+                if value and diff:
+                    tm = slice_start.strftime(DT_FMT)
+                    result["value"][tm]=value
+                    result["diff"][tm]=diff
+                    yield slice_start, result
+
+def diff(cls, path, search_strs, kwargs):
+    file_handler = cls("node", path, LogReader())
+    file_handler.set_input(search_strs, is_and=True, start_tm=file_handler.server_start_tm, **kwargs)
+    result = [copy.deepcopy(r) for r in file_handler.diff_iterator()]
+    file_handler.destroy()
+    return result
+
+CASES = (("tsvc-q", ["tsvc-q"], {"slice_duration":"600"})
+         , ("list", ["histogram", "reads"], {"slice_duration":"60"})
+         , ("n(m)", ["hits"], {"slice_duration":"30", "every_nth_slice":3})
+         , ("n (", ["proto"], {"upper_limit_check":400}))
+
+def main(n_lines=200000):
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmp_dir, "aerospike.log")
+        write_log(path, n_lines)
+        print "%-10s %8s %12s %12s %8s"%("format", "lines", "legacy (s)", "new (s)", "speedup")
+        for name, search_strs, kwargs in CASES:
+            assert diff(LegacyServerLog, path, search_strs, kwargs) \
+                == diff(ServerLog, path, search_strs, kwargs), "%s: results disagree"%(name)
+            t_legacy = min(timeit.repeat(lambda: diff(LegacyServerLog, path, search_strs, kwargs)
+                                         , number=1, repeat=3))
+            t_new = min(timeit.repeat(lambda: diff(ServerLog, path, search_strs, kwargs)
+                                      , number=1, repeat=3))
+            print "%-10s %8d %12.3f %12.3f %7.1fx"%(name, n_lines, t_legacy, t_new
+                                                    , t_legacy / t_new)
+    finally:
+        shutil.rmtree(tmp_dir)
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        main(int(sys.argv[1]))
+    else:
+        main()
@@ -0,0 +1,53 @@
+# Copyright 2013-2016 Aerospike, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from mock import patch
+import unittest2 as unittest
+import os
+import shutil
+import tempfile
+from lib.logreader import LogReader
+from lib.serverlog import ServerLog
+
+class LogTestCase(unittest.TestCase):
+    """
+    Base of the tests on log files. Every test gets a temporary directory,
+    self.dir, which also holds the saved server log indices and is removed
+    after the test, as are the patches the test starts.
+    """
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        patch('lib.logreader.INDEX_CACHE_DIR', os.path.join(self.dir, "cache")).start()
+        self.addCleanup(patch.stopall)
+
+    def write_file(self, name, data, mode="w"):
+        """
+        Write data to name in self.dir, returns its path.
+        """
+
+        path = os.path.join(self.dir, name)
+        with open(path, mode) as f:
+            f.write(data)
+        return path
+
+    def server_log(self, path, display_name="node", log_reader=None):
+        """
+        ServerLog of the log at path, destroyed after the test.
+        """
+
+        file_handler = ServerLog(display_name, path, log_reader or LogReader())
+        self.addCleanup(file_handler.destroy)
+        return file_handler
@@ -17,6 +17,9 @@ import unittest2 as unittest
 from lib.cluster import Cluster
 from lib.node import Node
 
+# other test modules stub out _crawl, keep a reference to the real one
+_crawl = Cluster.__dict__['_crawl']
+
 class ClusterTest(unittest.TestCase):
     def getInfoMock(self, return_value):
         Node.info = mock.Mock()
@@ -30,3 +33,60 @@ class ClusterTest(unittest.TestCase):
 
     def testInitCluster(self):
         pass
+
+class ClusterCrawlTest(unittest.TestCase):
+    def setUp(self):
+        self.services = {}
+        self.registered = []
+        self.probed = []
+
+        def register(cluster, addr_port):
+            self.registered.append(addr_port)
+            addr, port = addr_port
+            node = Mock(ip=addr, port=port, alive=True
+                        , key="%s:%s"%(addr, port))
+            cluster.nodes[node.key] = node
+            return node
+
+        def get_services(node):
+            self.probed.append((node.ip, node.port))
+            return self.services.get((node.ip, node.port), [])
+
+        patch.object(Cluster, 'cluster_state', {}).start()
+        patch.object(Cluster, '_crawl', _crawl).start()
+        patch.object(Cluster, '_registerNode', register).start()
+        patch.object(Cluster, '_getServices', staticmethod(get_services)).start()
+        self.addCleanup(patch.stopall)
+
+    def testIncrementalCrawl(self):
+        A, B, C = ("a", 3000), ("b", 3000), ("c", 3000)
+        self.services = {A:[B], B:[A]}
+
+        cluster = Cluster([A])
+        self.assertEqual(sorted(self.registered), [A, B])
+        self.assertEqual(cluster.getLiveNodes(), set([A, B]))
+
+        # within the refresh interval the topology is not checked at all
+        cluster.crawl_interval = 100
+        del self.probed[:]
+        cluster._crawl()
+        self.assertEqual(self.probed, [])
+
+        # unchanged services, nothing is re-registered
+        cluster.crawl_interval = 0
+        del self.registered[:]
+        cluster._crawl()
+        self.assertEqual(sorted(self.probed), [A, B])
+        self.assertEqual(self.registered, [])
+
+        # only the newly advertised node is registered
+        self.services = {A:[B, C], B:[A, C], C:[A, B]}
+        cluster._crawl()
+        self.assertEqual(self.registered, [C])
+        self.assertEqual(cluster.getLiveNodes(), set([A, B, C]))
+
+        # a dead node that is still advertised gets retried
+        del self.registered[:]
+        cluster.nodes["c:3000"].alive = False
+        cluster._crawl()
+        self.assertEqual(self.registered, [C])
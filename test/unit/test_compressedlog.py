@@ -0,0 +1,119 @@
+# Copyright 2013-2016 Aerospike, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from mock import patch
+import unittest2 as unittest
+import copy
+import datetime
+import gzip
+import io
+import lib.compressedlog as compressedlog
+from lib.compressedlog import CompressedLog, compression, open_log
+from lib.logreader import LogReader
+from test.unit.logtestcase import LogTestCase
+
+START = datetime.datetime(2016, 7, 1, 10, 0, 0)
+LOG = "".join("%s GMT: INFO (info): (thr_info.c::4900)  trans_in_progress: wr 0 prox 0 tsvc-q %d\n"
+              %((START + datetime.timedelta(seconds=i)).strftime("%b %d %Y %H:%M:%S"), i)
+              for i in range(0, 1800, 3))
+
+def gzip_bytes(data):
+    out = io.BytesIO()
+    f = gzip.GzipFile(fileobj=out, mode="wb")
+    f.write(data)
+    f.close()
+    return out.getvalue()
+
+class CompressedLogTest(LogTestCase):
+    def setUp(self):
+        super(CompressedLogTest, self).setUp()
+        # small sizes, every read crosses pieces, members and checkpoints
+        patch('lib.compressedlog.READ_BYTES', 512).start()
+        patch('lib.compressedlog.CHECKPOINT_BYTES', 4096).start()
+        patch('lib.compressedlog.KEEP_BYTES', 256).start()
+        patch('lib.compressedlog.TAIL_BYTES', 1024).start()
+        patch('lib.logscan.WINDOW_BYTES', 2048).start()
+        patch('lib.logreader.SCAN_BYTES', 3000).start()
+        patch.dict(compressedlog._block_indices, clear=True).start()
+
+        self.plain = self.write_file("aerospike.log", LOG, "wb")
+        self.gz = self.write_file("aerospike.log.gz", gzip_bytes(LOG), "wb")
+        # several members and trailing garbage, as concatenated gzip files
+        self.multi_gz = self.write_file("aerospike.log.1.gz", "".join(
+            gzip_bytes(LOG[i:i + 5000]) for i in range(0, len(LOG), 5000)) + "\0\0", "wb")
+
+    def assertReads(self, path):
+        f = open_log(path)
+        self.addCleanup(f.close)
+        self.assertIsInstance(f, CompressedLog)
+
+        self.assertEqual(f.read(), LOG)
+        f.seek(100)
+        self.assertEqual(f.readline(), LOG[100:LOG.index("\n", 100) + 1])
+        self.assertEqual(f.tell(), LOG.index("\n", 100) + 1)
+        # seeking back and forward, in and out of the kept data
+        for offset in (len(LOG) - 50, 7000, 6990, 20, len(LOG) - 3000, 12345):
+            f.seek(offset)
+            self.assertEqual(f.read(300), LOG[offset:offset + 300])
+        f.seek(-10, 2)
+        self.assertEqual(f.read(), LOG[-10:])
+        f.seek(0)
+        self.assertEqual(list(f), LOG.splitlines(True))
+
+    def testRead(self):
+        self.assertEqual(compression(self.plain), None)
+        self.assertEqual(compression(self.gz), "gzip")
+        self.assertReads(self.gz)
+        self.assertReads(self.multi_gz)
+        self.assertTrue(len(CompressedLog(self.multi_gz).blocks.saved()["members"]) > 1)
+
+    @unittest.skipIf(compressedlog.zstandard is None, "zstandard is not installed")
+    def testReadZstd(self):
+        zstd = compressedlog.zstandard.ZstdCompressor()
+        path = self.write_file("aerospike.log.zst"
+                          , "\x50\x2a\x4d\x18\x04\0\0\0skip"
+                          + "".join(zstd.compress(LOG[i:i + 5000])
+                                    for i in range(0, len(LOG), 5000))
+                          , "wb")
+        self.assertEqual(compression(path), "zstd")
+        self.assertReads(path)
+
+    def results(self, path):
+        reader = LogReader()
+        self.assertTrue(reader.is_server_log_file(path))
+        file_handler = self.server_log(path, log_reader=reader)
+        results = [file_handler.server_start_tm, file_handler.server_end_tm
+                   , file_handler.indices]
+
+        file_handler.set_input(["tsvc-q"], start_tm=START + datetime.timedelta(seconds=700)
+                               , duration="0:5:0")
+        results.append([line for tm, line
+                        in iter(file_handler.show_iterator().next, (None, None))])
+        file_handler.set_input(["tsvc-q"], start_tm=START, slice_duration="300")
+        results.append([(tm, copy.deepcopy(res)) for tm, res in file_handler.count_iterator()])
+        return results
+
+    def testServerLog(self):
+        expected = self.results(self.plain)
+        self.assertEqual(len(expected[3]), 100)
+        self.assertEqual(self.results(self.gz), expected)
+        self.assertEqual(self.results(self.multi_gz), expected)
+
+        # a new process finds member starts, size and tail in the saved index
+        compressedlog._block_indices.clear()
+        with patch.object(LogReader, '_scan_server_log_indices', side_effect=AssertionError):
+            self.assertEqual(self.results(self.multi_gz), expected)
+        blocks = compressedlog._block_indices.values()[0]
+        self.assertEqual(blocks.size, len(LOG))
+        self.assertEqual(len(blocks.saved()["members"]), len(range(0, len(LOG), 5000)))
@@ -100,6 +100,66 @@ class ControllerTest(unittest.TestCase):
         ssc.do_namespace("namespace")
         ssc.do_xdr("xdr")
 
+    def test_ShowStatisticsRates(self):
+        ssc = ShowStatisticsController()
+        ssc.counter_rates.clear()
+        patch('lib.snapshot.time', side_effect=[100.0, 105.0]).start()
+
+        stats = {"n1": {"stat_read_reqs": "10", "cluster_size": "3"}
+                 , "n2": IOError("down")}
+        title, _, total_row = ssc._counterRates("Service Statistics", stats, True)
+        self.assertIn("baseline", title)
+        self.assertEqual(total_row, None)
+
+        stats = {"n1": {"stat_read_reqs": "10", "cluster_size": "3"}
+                 , "n2": IOError("down")}
+        title, rate_stats, _ = ssc._counterRates("Service Statistics", stats, True)
+        self.assertIn("per second", title)
+        self.assertEqual(rate_stats["n1"]["cluster_size"], "3")
+        self.assertTrue(rate_stats["n1"]["stat_read_reqs"].endswith("(+0)"))
+        self.assertIsInstance(rate_stats["n2"], IOError)
+
+        title, raw, total_row = ssc._counterRates("Service Statistics", stats, False)
+        self.assertEqual((title, raw, total_row), ("Service Statistics", stats, None))
+
+    def test_ShowStatisticsRatesTotal(self):
+        ssc = ShowStatisticsController()
+        ssc.counter_rates.clear()
+        patch('lib.snapshot.time', side_effect=[100.0, 110.0]).start()
+
+        ssc._counterRates("Service Statistics"
+                          , {"n1": {"stat_read_reqs": "10", "uptime": "100"}
+                             , "n2": {"stat_read_reqs": "20", "uptime": "100"}}, True)
+        stats = {"n1": {"stat_read_reqs": "30", "uptime": "110", "objects": "5"}
+                 , "n2": {"stat_read_reqs": "70", "uptime": "110", "objects": "7"}
+                 , "n3": {"stat_read_reqs": "900", "uptime": "1", "objects": "1"}}
+        _, _, total_row = ssc._counterRates("Service Statistics", stats, True)
+        # counters total their rates, the raw counter of the new node n3 is
+        # left out
+        self.assertEqual(total_row["stat_read_reqs"], "7.0/s (+70)")
+        self.assertEqual(total_row["objects"], 13)
+
+    def test_ShowStatisticsRatesUptime(self):
+        ShowStatisticsController.counter_rates.clear()
+        patch('lib.snapshot.time', side_effect=[100.0, 105.0]).start()
+        cluster = Mock()
+        cluster.infoStatistics.side_effect = [{"n1": {"uptime": "1000"}, "n2": IOError("down")}
+                                              , {"n1": {"uptime": "3"}, "n2": IOError("down")}]
+
+        # each run is a new controller, fetching the service statistics once
+        for stats in ({"n1": {"client_read_success": "10"}}, {"n1": {"client_read_success": "50"}}):
+            ssc = ShowStatisticsController()
+            ssc.nodes = 'all'
+            ssc.cluster = cluster
+            self.assertEqual(ssc._uptimes(False), None)
+            uptimes = ssc._uptimes(True)
+            self.assertEqual(ssc._serviceStatistics()["n1"]["uptime"], uptimes["n1"])
+            title, rate_stats, _ = ssc._counterRates("test Namespace Statistics", stats, True
+                                                     , uptimes)
+        self.assertEqual(cluster.infoStatistics.call_count, 2)
+        # n1 restarted, its service uptime went down
+        self.assertEqual(rate_stats["n1"]["client_read_success"], "reset")
+
 class ClusterControllerTest(unittest.TestCase):
 
     def setUp(self):
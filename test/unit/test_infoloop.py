@@ -0,0 +1,125 @@
+# Copyright 2013-2016 Aerospike, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest2 as unittest
+import socket
+import struct
+import threading
+from lib import infoloop
+from lib.infopool import InfoConnectionPool
+
+class FakeInfoServer(object):
+    """
+    Minimal info protocol server, answers 'name' with 'value-of-name' and
+    accepts every login unless auth_rc is set.
+    """
+
+    def __init__(self, auth_rc=0, silent=False):
+        self.auth_rc = auth_rc
+        self.silent = silent
+        self.connections = 0
+        self.logins = 0
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.listen(16)
+        self.port = self.sock.getsockname()[1]
+        t = threading.Thread(target=self._accept)
+        t.daemon = True
+        t.start()
+
+    def _recv(self, conn, size):
+        data = ""
+        while len(data) < size:
+            chunk = conn.recv(size - len(data))
+            if not chunk:
+                raise socket.error("closed")
+            data += chunk
+        return data
+
+    def _accept(self):
+        while True:
+            conn, _ = self.sock.accept()
+            self.connections += 1
+            t = threading.Thread(target=self._serve, args=(conn,))
+            t.daemon = True
+            t.start()
+
+    def _serve(self, conn):
+        try:
+            while True:
+                q = struct.unpack("! Q", self._recv(conn, 8))[0]
+                msg_type = (q >> 48) & 0xFF
+                body = self._recv(conn, q & 0xFFFFFFFFFFFF)
+                if self.silent:
+                    continue
+                if msg_type == 2:
+                    self.logins += 1
+                    conn.sendall(struct.pack("! Q B B B B 12x", 16, 0
+                                             , self.auth_rc, 0, 0))
+                    continue
+                rsp = "".join("%s\tvalue-of-%s\n"%(name, name)
+                              for name in body.split("\n") if name)
+                conn.sendall(struct.pack("! Q", (2 << 56) | (1 << 48)
+                                         | len(rsp)) + rsp)
+        except Exception:
+            conn.close()
+
+class InfoLoopTest(unittest.TestCase):
+    def testFanout(self):
+        servers = [FakeInfoServer() for _ in range(3)]
+        pools = [InfoConnectionPool("127.0.0.1", s.port, user="admin"
+                                    , password="pw") for s in servers]
+        requests = [(i, pool, "node") for i, pool in enumerate(pools)]
+
+        results = infoloop.info_fanout(requests)
+        self.assertEqual(results, {0:"value-of-node", 1:"value-of-node"
+                                   , 2:"value-of-node"})
+
+        # second round reuses the authenticated pooled connections
+        results = infoloop.info_fanout(
+            [(i, pool, ("a", "b")) for i, pool in enumerate(pools)])
+        self.assertEqual(results[1], {"a":"value-of-a", "b":"value-of-b"})
+        for server in servers:
+            self.assertEqual(server.connections, 1)
+            self.assertEqual(server.logins, 1)
+
+        # blocking pool path shares the same connection
+        self.assertEqual(pools[0].info("build"), "value-of-build")
+        self.assertEqual(servers[0].connections, 1)
+
+    def testFanoutFailures(self):
+        good = FakeInfoServer()
+        silent = FakeInfoServer(silent=True)
+        denied = FakeInfoServer(auth_rc=65)
+
+        # find a closed port
+        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        s.bind(("127.0.0.1", 0))
+        closed_port = s.getsockname()[1]
+        s.close()
+
+        requests = [("good", InfoConnectionPool("127.0.0.1", good.port), "node")
+                    , ("silent", InfoConnectionPool("127.0.0.1", silent.port)
+                       , "node")
+                    , ("denied", InfoConnectionPool("127.0.0.1", denied.port
+                                                    , user="a", password="b")
+                       , "node")
+                    , ("closed", InfoConnectionPool("127.0.0.1", closed_port)
+                       , "node")]
+
+        results = infoloop.info_fanout(requests, timeout=0.3)
+        self.assertEqual(results["good"], "value-of-node")
+        self.assertIsInstance(results["silent"], socket.timeout)
+        self.assertIsInstance(results["denied"], IOError)
+        self.assertIsInstance(results["closed"], socket.error)
@@ -0,0 +1,80 @@
+# Copyright 2013-2016 Aerospike, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from mock import patch, Mock
+import unittest2 as unittest
+import socket
+from lib.infopool import InfoConnectionPool
+
+class InfoConnectionPoolTest(unittest.TestCase):
+    def setUp(self):
+        self.create_connection = patch('socket.create_connection').start()
+        self.authenticate = patch('lib.citrusleaf.authenticate').start()
+        self.send = patch('lib.citrusleaf.citrusleaf_info_send').start()
+        self.select = patch('select.select').start()
+        self.addCleanup(patch.stopall)
+
+        self.create_connection.side_effect = lambda *args: Mock()
+        self.authenticate.return_value = 0
+        self.send.return_value = "node\tBB9000000000001\n"
+        self.select.return_value = ([], [], [])
+
+    def testReusesConnection(self):
+        pool = InfoConnectionPool("127.0.0.1", 3000, user="admin"
+                                  , password="secret")
+
+        self.assertEqual(pool.info("node"), "BB9000000000001")
+        self.assertEqual(pool.info("node"), "BB9000000000001")
+
+        self.assertEqual(self.create_connection.call_count, 1)
+        self.assertEqual(self.authenticate.call_count, 1)
+
+    def testUnhealthyConnectionReplaced(self):
+        pool = InfoConnectionPool("127.0.0.1", 3000)
+        pool.info("node")
+
+        # idle socket became readable, i.e. server closed it
+        self.select.side_effect = lambda r, w, x, t: (r, [], [])
+        pool.info("node")
+
+        self.assertEqual(self.create_connection.call_count, 2)
+
+    def testIdleConnectionEvicted(self):
+        pool = InfoConnectionPool("127.0.0.1", 3000, idle_timeout=0)
+        pool.info("node")
+        pool._idle[0].last_used -= 1
+        pool.info("node")
+
+        self.assertEqual(self.create_connection.call_count, 2)
+
+    def testReconnectOnError(self):
+        pool = InfoConnectionPool("127.0.0.1", 3000)
+        pool.info("node")
+
+        self.send.side_effect = [socket.error("reset by peer")
+                                 , "node\tBB9000000000001\n"]
+        self.assertEqual(pool.info("node"), "BB9000000000001")
+        self.assertEqual(self.create_connection.call_count, 2)
+
+        # a fresh connection failing is reported to the caller
+        pool.close()
+        self.send.side_effect = socket.error("refused")
+        self.assertRaises(IOError, pool.info, "node")
+
+    def testAuthenticationFailure(self):
+        self.authenticate.return_value = -1
+        pool = InfoConnectionPool("127.0.0.1", 3000, user="admin"
+                                  , password="bad")
+
+        self.assertRaises(IOError, pool.info, "node")
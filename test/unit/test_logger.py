@@ -0,0 +1,229 @@
+# Copyright 2013-2016 Aerospike, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from mock import patch
+import datetime
+import gzip
+import os
+import shutil
+import lib.compressedlog as compressedlog
+from lib.logger import Logger
+from lib.logreader import LogReader, SHOW_RESULT_KEY, END_ROW_KEY
+from lib.logworker import LogScanWorker, LogScanError
+from test.unit.logtestcase import LogTestCase
+
+LINES = ["%s GMT: INFO (info): (thr_info.c::4840)  system memory: free %d%%\n"
+         , "%s GMT: INFO (info): (thr_info.c::4900)  trans_in_progress: wr 0 prox 0 tsvc %d\n"
+         , "%s GMT: INFO (hb): (hb.c::2290)  heartbeat_received: self 0 : foreign %d\n"]
+
+def write_log(path, start, seconds, step, seed):
+    with open(path, "w") as f:
+        for i in range(0, seconds, step):
+            tm = (start + datetime.timedelta(seconds=i)).strftime("%b %d %Y %H:%M:%S")
+            f.write(LINES[(i / step + seed) % len(LINES)]%(tm, i * 13 + seed))
+
+class LoggerWorkerTest(LogTestCase):
+    def setUp(self):
+        super(LoggerWorkerTest, self).setUp()
+        self.addCleanup(setattr, Logger, "use_worker_processes", True)
+
+        start = datetime.datetime(2016, 7, 1, 10, 0, 0)
+        log_reader = LogReader()
+        self.file_handlers = []
+        for n, step in enumerate((3, 5, 7)):
+            path = os.path.join(self.dir, "node%d.log"%(n))
+            write_log(path, start + datetime.timedelta(seconds=n), 3600, step, n)
+            self.file_handlers.append(self.server_log(path, "node%d"%(n), log_reader))
+        self.logger = Logger(self.dir)
+        # a worker for every log, whatever the number of cpus
+        patch('lib.logger.max_workers', return_value=len(self.file_handlers)).start()
+
+    def collect(self, use_workers, method, *args, **kwargs):
+        Logger.use_worker_processes = use_workers
+        return list(getattr(self.logger, method)(self.file_handlers, *args
+                                                 , **kwargs))
+
+    def testSameOutputAsInProcess(self):
+        cases = (("grep", (["system memory"],)
+                  , {"ignore_strs":["free 1"], "grep_cluster_logs":False})
+                 , ("grep", (["heartbeat", "foreign"],)
+                    , {"is_and":True, "duration_arg":"0:10:0"
+                       , "grep_cluster_logs":False})
+                 , ("grepCount", (["trans_in_progress"],)
+                    , {"slice_duration":"300", "grep_cluster_logs":False})
+                 , ("grep", (["tsvc"],)
+                    , {"uniq":True, "grep_cluster_logs":False})
+                 , ("grepCount", (["trans_in_progress"],)
+                    , {"uniq_exact":True, "slice_duration":"300", "grep_cluster_logs":False})
+                 , ("grepDiff", (["heartbeat_received", "foreign"],)
+                    , {"slice_duration":"600"}))
+
+        for method, args, kwargs in cases:
+            expected = self.collect(False, method, *args, **kwargs)
+            self.assertTrue(expected)
+            self.assertEqual(self.collect(True, method, *args, **kwargs)
+                             , expected, method)
+
+    def testStopEarly(self):
+        Logger.use_worker_processes = True
+        show_its = self.logger.server_log_iterators(
+            self.file_handlers, "show_iterator", search_strs=["system"]
+            , start_tm=self.file_handlers[0].server_start_tm)
+
+        tm, line = show_its["node1"].next()
+        self.assertIn("system memory", line)
+        for it in show_its.itervalues():
+            it.close()
+            self.assertFalse(it._process.is_alive())
+
+    def testWorkerCap(self):
+        expected = self.collect(False, "grep", ["system memory"], grep_cluster_logs=False)
+        Logger.use_worker_processes = True
+        with patch('lib.logger.max_workers', return_value=2):
+            show_its = self.logger.server_log_iterators(
+                self.file_handlers, "show_iterator", search_strs=["system"]
+                , start_tm=self.file_handlers[0].server_start_tm)
+            self.assertEqual(sum(isinstance(it, LogScanWorker)
+                                 for it in show_its.itervalues()), 2)
+            for it in show_its.itervalues():
+                it.close()
+            self.assertEqual(self.collect(True, "grep", ["system memory"], grep_cluster_logs=False)
+                             , expected)
+
+    def testScanError(self):
+        patch.object(self.file_handlers[1], "show_iterator"
+                     , side_effect=ValueError("bad log")).start()
+        # a failed log stops the command, in a worker or not
+        self.assertRaises(ValueError, self.collect, False, "grep", ["system"]
+                          , grep_cluster_logs=False)
+        with self.assertRaises(LogScanError) as cm:
+            self.collect(True, "grep", ["system"], grep_cluster_logs=False)
+        self.assertIn("ValueError: bad log", str(cm.exception))
+
+    def testCompressedInProcess(self):
+        patch('lib.compressedlog.CHECKPOINT_BYTES', 4096).start()
+        patch.dict(compressedlog._block_indices, clear=True).start()
+        path = self.file_handlers[0].server_file
+        with open(path, "rb") as f_in:
+            f_out = gzip.open(path + ".gz", "wb")
+            shutil.copyfileobj(f_in, f_out)
+            f_out.close()
+        expected = self.collect(False, "grep", ["system memory"], grep_cluster_logs=False)
+        self.file_handlers[0] = self.server_log(path + ".gz", "node0")
+
+        Logger.use_worker_processes = True
+        show_its = self.logger.server_log_iterators(
+            self.file_handlers, "show_iterator", search_strs=["system"]
+            , start_tm=self.file_handlers[0].server_start_tm)
+        self.assertNotIsInstance(show_its["node0"], LogScanWorker)
+        self.assertIsInstance(show_its["node1"], LogScanWorker)
+        for it in show_its.itervalues():
+            it.close()
+
+        # the checkpoints are left in this process for the next command
+        self.assertEqual(self.collect(True, "grep", ["system memory"], grep_cluster_logs=False)
+                         , expected)
+        blocks = compressedlog._block_indices.values()[0]
+        self.assertTrue(any(decompressor is not None
+                            for offset, compressed_offset, decompressor in blocks.points))
+
+class LoggerMergerTest(LogTestCase):
+    def setUp(self):
+        super(LoggerMergerTest, self).setUp()
+        self.logger = Logger(self.dir)
+
+    def stream(self, seconds, end=None):
+        start = datetime.datetime(2016, 7, 1, 10, 0, 0)
+        for s in seconds:
+            tm = start + datetime.timedelta(seconds=s)
+            yield tm, {"count": {tm.strftime("%b %d %Y %H:%M:%S"): s}}
+        if end is not None:
+            yield end
+
+    def testMergeOrder(self):
+        streams = {"b": iter([(1, "b1\n"), (3, "b3\n"), (None, None)])
+                   , "a": iter([(1, "a1\n"), (2, "a2\n"), (2, "a2'\n")])
+                   , "c": iter([])}
+        pages = list(self.logger.server_log_merger(streams, output_page_size=2
+                                                   , return_strings=True))
+        text = "".join(page.get(SHOW_RESULT_KEY, "") for page in pages)
+        keys = [line.split("::")[0].strip()[-1] + line.split("::")[1]
+                for line in text.splitlines()]
+        # equal timestamps come out in key order, one row per stream per round
+        self.assertEqual(keys, ["aa1", "bb1", "aa2", "aa2'", "bb3"])
+        self.assertEqual(len(pages), 3)
+
+    def testHeartbeat(self):
+        # a followed log without a matching line moves the merge on
+        streams = {"a": iter([(1, "a1\n"), (5, "a5\n")])
+                   , "b": iter([(2, None), (4, "b4\n")])}
+        pages = list(self.logger.server_log_merger(streams, output_page_size=1
+                                                   , return_strings=True))
+        self.assertEqual([page[SHOW_RESULT_KEY].split("::")[1] for page in pages if page]
+                         , ["a1\n", "b4\n", "a5\n"])
+
+    def testEndNotes(self):
+        # e.g. the duplicates left out by a unique grep, after all lines
+        streams = {"b": iter([(1, "b1\n"), (END_ROW_KEY, "2 duplicate lines suppressed\n")])
+                   , "a": iter([(2, "a2\n")])}
+        pages = list(self.logger.server_log_merger(streams, output_page_size=1
+                                                   , return_strings=True))
+        self.assertEqual([line.split("::")[1] for page in pages
+                          for line in page[SHOW_RESULT_KEY].splitlines()]
+                         , ["b1", "a2", "2 duplicate lines suppressed"])
+
+    def testDefaultFill(self):
+        streams = {"n1": self.stream([0, 10])
+                   , "n2": self.stream([10, 20], end=(END_ROW_KEY, {"count": {"Total": 30}}))}
+        pages = list(self.logger.server_log_merger(streams, output_page_size=10
+                                                   , default_value=0))
+        self.assertEqual(len(pages), 1)
+        self.assertEqual(pages[0]["n1"]["count"]
+                         , {"Jul 01 2016 10:00:00": 0, "Jul 01 2016 10:00:10": 10
+                            , "Jul 01 2016 10:00:20": 0, "Total": 0})
+        self.assertEqual(pages[0]["n2"]["count"]
+                         , {"Jul 01 2016 10:00:00": 0, "Jul 01 2016 10:00:10": 10
+                            , "Jul 01 2016 10:00:20": 20, "Total": 30})
+
+class LoggerFollowTest(LogTestCase):
+    def setUp(self):
+        super(LoggerFollowTest, self).setUp()
+        start = datetime.datetime(2016, 7, 1, 10, 0, 0)
+        log_reader = LogReader()
+        self.file_handlers = []
+        for n in range(2):
+            path = os.path.join(self.dir, "node%d.log"%(n))
+            write_log(path, start, 600, 5, n)
+            self.file_handlers.append(self.server_log(path, "node%d"%(n), log_reader))
+        self.logger = Logger(self.dir)
+
+        # every wait for new lines runs the next of these instead of sleeping
+        path = self.file_handlers[0].server_file
+        self.writes = [lambda i=i: self.append(path, "Jul 01 2016 10:10:%02d GMT: WARNING (rw): warnx %d\n"%(i, i))
+                       for i in range(5)] + [lambda: None] * 10
+        patch('lib.serverlog.time.sleep', side_effect=lambda s: self.writes.pop(0)()).start()
+
+    def append(self, path, text):
+        with open(path, "a") as f:
+            f.write(text)
+
+    def testIdleLog(self):
+        # node1.log never grows, node0.log lines still come out one by one
+        results = self.logger.grep(self.file_handlers, ["warnx"], start_tm_arg="-0"
+                                   , grep_cluster_logs=False, output_page_size=1, follow=True)
+        lines = [results.next()[SHOW_RESULT_KEY] for _ in range(5)]
+        results.close()
+        self.assertEqual([line.split("warnx ")[1] for line in lines]
+                         , ["0\n", "1\n", "2\n", "3\n", "4\n"])
+        self.assertTrue(self.writes)
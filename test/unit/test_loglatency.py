@@ -0,0 +1,89 @@
+# Copyright 2013-2016 Aerospike, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest2 as unittest
+import copy
+import datetime
+from lib.loglatency import LogLatency, HIST_TAG_PATTERNS
+from lib.logreader import LogReader
+
+LOG = """Jul 01 2016 10:00:00 GMT: INFO (info): (hist.c::137) histogram dump: {test}-read (100 total) msec
+Jul 01 2016 10:00:00 GMT: INFO (info): (hist.c::154)  (00: 0000000090) (01: 0000000005) (02: 0000000003)
+Jul 01 2016 10:00:00 GMT: INFO (info): (hist.c::154)  (04: 0000000002)
+Jul 01 2016 10:00:01 GMT: INFO (info): (hist.c::137) histogram dump: {bar}-read (50 total) msec
+Jul 01 2016 10:00:01 GMT: INFO (info): (hist.c::154)  (00: 0000000040) (03: 0000000010)
+Jul 01 2016 10:00:02 GMT: INFO (info): (thr_info.c::4840)  system memory: free 61%
+Jul 01 2016 10:00:10 GMT: INFO (info): (hist.c::137) histogram dump: {test}-read (120 total) msec
+Jul 01 2016 10:00:10 GMT: INFO (info): (hist.c::154)  (00: 0000000110) (01: 0000000010)
+Jul 01 2016 10:00:11 GMT: INFO (info): (thr_info.c::4840)  system memory: free 61%
+""".splitlines(True)
+
+class LogLatencyTest(unittest.TestCase):
+    def setUp(self):
+        self.reader = LogReader()
+        self.latency = LogLatency(self.reader)
+        self.itr = iter([(self.reader.parse_dt(line), line) for line in LOG])
+        self.tags = [s%("read") for s in HIST_TAG_PATTERNS]
+
+    def testReadBucketValues(self):
+        self.itr.next()
+        total, values, line = self.latency.read_bucket_values(LOG[0], self.itr)
+        self.assertEqual(total, 100)
+        self.assertEqual([values[b] for b in range(6)], [90, 5, 3, 0, 2, 0])
+        self.assertEqual(line, LOG[3])
+
+    def testReadHistSumsNamespaces(self):
+        start = datetime.datetime(2016, 7, 1, 10, 0, 0)
+        total, values, dt, line = self.latency.read_hist(self.tags, start, self.itr)
+        self.assertEqual(total, 150)
+        self.assertEqual([values[b] for b in range(5)], [130, 5, 3, 10, 2])
+        self.assertEqual(dt, start)
+        self.assertEqual(line, LOG[6])
+
+        total, values, dt, line = self.latency.read_hist(
+            self.tags, start + datetime.timedelta(seconds=5), self.itr, line)
+        self.assertEqual(total, 120)
+        self.assertEqual(dt, datetime.datetime(2016, 7, 1, 10, 0, 10))
+        # the log ends inside the slice
+        self.assertEqual(line, 0)
+
+    def testSplitHistLines(self):
+        test_itr, bar_itr = self.latency.split_hist_lines(
+            self.itr, [self.latency.get_hist_tags("read", "test"), self.latency.get_hist_tags("read", "bar")])
+        # each dump ends with the first line after its buckets, and every
+        # iterator ends with the last line of the log
+        self.assertEqual([line for _, line in test_itr], LOG[0:4] + LOG[6:9])
+        self.assertEqual([line for _, line in bar_itr], LOG[3:6] + LOG[8:9])
+
+    def testComputeLatencies(self):
+        start = datetime.datetime(2016, 7, 1, 10, 0, 0)
+        end = datetime.datetime(2016, 7, 1, 10, 1, 0)
+        args = (datetime.timedelta(seconds=10), start, end, 3, 1)
+
+        def separate(ns):
+            itr = iter([(self.reader.parse_dt(line), line) for line in LOG])
+            return [(tm, copy.deepcopy(latency)) for tm, latency
+                    in LogLatency(self.reader).compute_latency(itr, "read", *args, arg_ns=ns)]
+
+        latency_its = self.latency.compute_latencies(self.itr, ["read"], *args, arg_ns=["test", "bar"])
+        self.assertEqual(sorted(latency_its.keys()), ["bar - read", "test - read"])
+        # consumed alternately, as the log merger does
+        results = dict((name, []) for name in latency_its)
+        for _ in range(3):
+            for name, latency_it in latency_its.iteritems():
+                for tm, latency in latency_it:
+                    results[name].append((tm, copy.deepcopy(latency)))
+                    break
+        self.assertEqual(results["test - read"], separate("test"))
+        self.assertEqual(results["bar - read"], separate("bar"))
@@ -0,0 +1,123 @@
+# Copyright 2013-2016 Aerospike, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from mock import patch
+import unittest2 as unittest
+import calendar
+import datetime
+import os
+import time
+from lib import logreader
+from lib.logreader import LogReader
+from test.unit.logtestcase import LogTestCase
+
+LINE = "%s GMT: INFO (info): (thr_info.c::4840)  system memory: free 1%%\n"
+
+def write_log(path, start, seconds, mode="w"):
+    with open(path, mode) as f:
+        for i in range(0, seconds, 7):
+            tm = start + datetime.timedelta(seconds=i)
+            f.write(LINE%(tm.strftime("%b %d %Y %H:%M:%S")))
+
+class ServerLogIndexTest(LogTestCase):
+    def setUp(self):
+        super(ServerLogIndexTest, self).setUp()
+        self.log = os.path.join(self.dir, "aerospike.log")
+        self.start = datetime.datetime(2016, 7, 1, 10, 58, 30)
+        self.reader = LogReader()
+
+    def expected(self):
+        indices = []
+        pos = 0
+        with open(self.log) as f:
+            for line in f:
+                tm = self.reader.parse_dt(line, dt_len=logreader.INDEX_DT_LEN)
+                if not indices or indices[-1][0] != tm:
+                    indices.append((tm, pos))
+                pos += len(line)
+        return indices
+
+    def testIndexSavedAndExtended(self):
+        write_log(self.log, self.start, 600)
+        indices = self.reader.generate_server_log_indices(self.log)
+        self.assertEqual(indices, self.expected())
+        self.assertEqual(indices[0][0], datetime.datetime(2016, 7, 1, 10, 58))
+        self.assertTrue(os.path.exists(self.log + logreader.INDEX_FILE_EXT))
+
+        # unchanged log is loaded without searching it again
+        with patch.object(LogReader, '_build_server_log_indices') as build:
+            self.assertEqual(self.reader.generate_server_log_indices(self.log)
+                             , indices)
+            self.assertFalse(build.called)
+
+        # grown log only searches past the saved entries
+        write_log(self.log, self.start + datetime.timedelta(seconds=600), 300
+                  , mode="a")
+        with patch.object(LogReader, 'get_next_timestamp'
+                          , wraps=self.reader.get_next_timestamp) as search:
+            extended = self.reader.generate_server_log_indices(self.log)
+        self.assertEqual(extended, self.expected())
+        self.assertEqual(extended[:len(indices)], indices)
+        self.assertTrue(all(call[0][3] >= indices[-1][0]
+                            for call in search.call_args_list))
+
+    def testIndexRebuiltForNewLog(self):
+        write_log(self.log, self.start, 300)
+        self.reader.generate_server_log_indices(self.log)
+
+        # rotated: same path, different content
+        write_log(self.log, self.start + datetime.timedelta(days=1), 400)
+        self.assertEqual(self.reader.generate_server_log_indices(self.log)
+                         , self.expected())
+
+    def testUnwritableLogDirectory(self):
+        write_log(self.log, self.start, 200)
+        with patch('lib.logreader.LogReader._index_file_paths'
+                   , return_value=[os.path.join(self.log, "x.asadm-idx")
+                                   , os.path.join(self.dir, "cache", "x.asadm-idx")]):
+            indices = self.reader.generate_server_log_indices(self.log)
+        self.assertEqual(indices, self.expected())
+        self.assertTrue(os.path.exists(os.path.join(self.dir, "cache"
+                                                    , "x.asadm-idx")))
+
+class ParseDtTest(unittest.TestCase):
+    def setUp(self):
+        self.reader = LogReader()
+
+    def strptime_dt(self, line, dt_len=6):
+        prefix = line[0: line.find(" GMT")].split(",")[0]
+        return datetime.datetime(*(time.strptime(prefix, logreader.DT_FMT)[0:dt_len]))
+
+    def testSameAsStrptime(self):
+        lines = [LINE%("Jul 01 2016 10:58:30")
+                 , LINE%("Jul 01 2016 10:58:30")
+                 , LINE%("Jul 01 2016 10:58:31")
+                 , LINE%("Dec 31 2016 23:59:59")
+                 , "Feb 29 2016 00:00:00 GMT+05: INFO (info): (a.c::1) x\n"
+                 , "Mar 02 2016 07:08:09 GMT-0330: WARNING (hb): (b.c::2) y\n"
+                 , "Jan 05 2015 01:02:03,123 GMT: INFO (info): (c.c::3) z\n"
+                 , "Jul  1 2016 10:58:30 GMT: INFO (info): (d.c::4) w\n"]
+        for line in lines:
+            for dt_len in (5, 6):
+                self.assertEqual(self.reader.parse_dt(line, dt_len=dt_len)
+                                 , self.strptime_dt(line, dt_len), line)
+            self.assertEqual(self.reader.parse_epoch(line)
+                             , calendar.timegm(self.strptime_dt(line).timetuple()))
+
+    def testInvalid(self):
+        for line in ("Feb 30 2016 00:00:00 GMT: INFO x\n"
+                     , "Foo 01 2016 00:00:00 GMT: INFO x\n"
+                     , "continuation of a multi line message\n"):
+            self.assertRaises(ValueError, self.reader.parse_dt, line)
+            self.assertRaises(ValueError, self.reader.parse_epoch, line)
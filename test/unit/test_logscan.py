@@ -0,0 +1,119 @@
+# Copyright 2013-2016 Aerospike, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from lib.logscan import LogScanner
+from test.unit.logtestcase import LogTestCase
+
+LOG = ("line one alpha\n"
+       "line two beta\n"
+       "line three Alpha beta\n"
+       "line four gamma\n"
+       "line five alpha\n"
+       "gamma last")
+
+class LogScannerTest(LogTestCase):
+    def setUp(self):
+        super(LogScannerTest, self).setUp()
+        self.path = self.write_file("aerospike.log", LOG)
+        self.f = open(self.path, "r")
+        self.addCleanup(self.f.close)
+
+    def lines(self, **kwargs):
+        scanner = LogScanner(self.f, **kwargs)
+        lines = []
+        while True:
+            line = scanner.read_line()
+            if line is None:
+                break
+            if scanner.is_match(line):
+                lines.append(line.split()[1])
+        scanner.close()
+        return lines
+
+    def testAnyTerm(self):
+        self.assertEqual(self.lines(search_strs=["alpha", "gamma"])
+                         , ["one", "four", "five", "last"])
+        self.assertEqual(self.lines(search_strs=["ALPHA"], is_casesensitive=False)
+                         , ["one", "three", "five"])
+        # case insensitive terms are regular expressions
+        self.assertEqual(self.lines(search_strs=["t[hw]"], is_casesensitive=False)
+                         , ["two", "three"])
+        # a match across a line end is not a match of either line
+        self.assertEqual(self.lines(search_strs=["beta\\sline"], is_casesensitive=False)
+                         , [])
+
+    def testAnchorsPerLine(self):
+        # ^ and $ match at every line start and end, as they do on one line
+        self.assertEqual(self.lines(search_strs=["^LINE T"], is_casesensitive=False)
+                         , ["two", "three"])
+        self.assertEqual(self.lines(search_strs=["ALPHA$"], is_casesensitive=False)
+                         , ["one", "five"])
+        self.assertEqual(self.lines(search_strs=["^gamma", "zeta"], is_casesensitive=False)
+                         , ["last"])
+        self.assertEqual(self.lines(search_strs=["^line f", "last$"], is_and=True
+                                    , is_casesensitive=False)
+                         , [])
+        # a negated class matching the line end is not a match either
+        self.assertEqual(self.lines(search_strs=["beta[^x]line"], is_casesensitive=False)
+                         , [])
+
+    def testAllTermsAndIgnore(self):
+        self.assertEqual(self.lines(search_strs=["line", "beta"], is_and=True)
+                         , ["two", "three"])
+        self.assertEqual(self.lines(search_strs=["line"], ignore_strs=["beta", "gamma"])
+                         , ["one", "five"])
+        self.assertEqual(self.lines(search_strs=[]), [])
+        self.assertEqual(len(self.lines(read_all_lines=True)), 6)
+
+    def testRangeAndSeekBack(self):
+        start = LOG.index("line two")
+        end = LOG.index("line five")
+        self.assertEqual(self.lines(search_strs=["line"], start=start, end=end)
+                         , ["two", "three", "four"])
+
+        scanner = LogScanner(self.f, search_strs=["beta"])
+        self.assertEqual(scanner.read_line(), "line two beta\n")
+        scanner.seek_back()
+        self.assertEqual(scanner.read_line(), "line two beta\n")
+        self.assertEqual(scanner.read_line(), "line three Alpha beta\n")
+        self.assertEqual(scanner.read_line(), None)
+        scanner.close()
+
+    def testEmptyFile(self):
+        open(self.path, "w").close()
+        with open(self.path, "r") as f:
+            self.assertEqual(LogScanner(f, search_strs=["x"]).read_line(), None)
+
+    def testFollow(self):
+        scanner = LogScanner(self.f, search_strs=["gamma"], follow=True)
+        # the last line is not complete yet
+        self.assertEqual(scanner.read_line(), "line four gamma\n")
+        self.assertEqual(scanner.read_line(), None)
+        self.assertEqual(scanner.last_line(), "line five alpha\n")
+        self.assertFalse(scanner.remap())
+
+        with open(self.path, "a") as f:
+            f.write(" alpha\nline six gamma\nline seven")
+        self.assertTrue(scanner.remap())
+        self.assertEqual(scanner.read_line(), "gamma last alpha\n")
+        self.assertEqual(scanner.read_line(), "line six gamma\n")
+        self.assertEqual(scanner.read_line(), None)
+        self.assertEqual(scanner.tell(), len(LOG) + len(" alpha\nline six gamma\n"))
+        self.assertEqual(scanner.last_line(), "line six gamma\n")
+        scanner.close()
+
+        # a scan with an end does not follow
+        scanner = LogScanner(self.f, search_strs=["gamma"], end=10, follow=True)
+        self.assertFalse(scanner.remap())
+        scanner.close()
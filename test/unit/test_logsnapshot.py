@@ -0,0 +1,208 @@
+# Copyright 2013-2016 Aerospike, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from mock import patch
+import os
+import shutil
+from lib.logger import Logger
+from lib.logreader import LogReader, SHOW_RESULT_KEY
+from lib.logsnapshot import LogSnapshot
+from test.unit.logtestcase import LogTestCase
+
+COLLECTINFO = """====ASCOLLECTINFO(20160701_100000)====
+['date']
+Fri Jul  1 10:00:00 UTC 2016
+
+====ASCOLLECTINFO====
+['config']
+~~~~~~~~~~~~~~~~~~~~Service Configuration~~~~~~~~~~~~~~~~~~~~
+NODE                   :   10.0.0.1:3000   10.0.0.2:3000
+proto-fd-max           :   15000           N/E
+
+====ASCOLLECTINFO====
+['config', 'diff']
+~~~~Service Information~~~~
+part of the diff output
+
+====ASCOLLECTINFO====
+['statistics']
+~~~~~~~~~~~~~~~~~~~~Service Statistics~~~~~~~~~~~~~~~~~~~~
+NODE                   :   10.0.0.1:3000   10.0.0.2:3000
+objects                :   100             120
+
+====ASCOLLECTINFO====
+['info', 'network']
+~~~~~~~~~~~~~~~~~~~~Network Information~~~~~~~~~~~~~~~~~~~~
+          Node               Node                Ip       Build
+             .                 Id                 .           .
+10.0.0.1:3000   *BB9020011AC4202   10.0.0.1:3000   E-3.9.1
+10.0.0.2:3000   BB9030011AC4202    10.0.0.2:3000   C-3.9.1
+Number of rows: 2
+"""
+
+class LogSnapshotTest(LogTestCase):
+    def setUp(self):
+        super(LogSnapshotTest, self).setUp()
+        self.path = self.write_file("ascollectinfo.log", COLLECTINFO)
+        self.reader = LogReader()
+
+    def testIndexSections(self):
+        sections = self.reader.index_sections(self.path)
+        # a config diff is not a config section, lines inside it are looked
+        # at like any other line
+        self.assertEqual([s[0] for s in sections]
+                         , ["config", "summary", "statistics", "summary"])
+        section_type, header, start, end = sections[2]
+        self.assertEqual(header, "['statistics']\n")
+        self.assertTrue(COLLECTINFO[start:end].startswith("~~~"))
+        self.assertTrue(COLLECTINFO[end:].startswith("====ASCOLLECTINFO====\n['info'"))
+
+    def testLazySections(self):
+        snapshot = LogSnapshot("ts", self.path, self.reader)
+        self.addCleanup(snapshot.destroy)
+
+        self.assertEqual(snapshot.get_configs("service")
+                         , {"10.0.0.1:3000": {"proto-fd-max": "15000"}
+                            , "10.0.0.2:3000": {}})
+        self.assertEqual(snapshot.parsed_types, set(["config", "summary"]))
+        self.assertEqual(snapshot.nodes["10.0.0.1:3000"].node_id, "BB9020011AC4202")
+        self.assertEqual(snapshot.nodes["10.0.0.2:3000"].asd_version, "Community")
+
+        self.assertEqual(snapshot.get_statistics("service")["10.0.0.2:3000"]
+                         , {"objects": "120"})
+        self.assertIn("statistics", snapshot.parsed_types)
+        self.assertEqual(snapshot.get_histograms("ttl"), {})
+
+    def testParsedCache(self):
+        snapshot = LogSnapshot("ts", self.path, self.reader)
+        self.addCleanup(snapshot.destroy)
+        statistics = snapshot.get_statistics("service")
+        configs = snapshot.get_configs("service")
+
+        # a copy of the same collectinfo is not parsed again
+        path = os.path.join(self.dir, "copy.log")
+        shutil.copy(self.path, path)
+        with patch.object(LogReader, "index_sections") as index_sections, \
+                patch.object(LogReader, "read") as read:
+            snapshot = LogSnapshot("ts", path, self.reader)
+            self.addCleanup(snapshot.destroy)
+            self.assertEqual(snapshot.get_statistics("service"), statistics)
+            self.assertEqual(snapshot.get_configs("service"), configs)
+            self.assertEqual(snapshot.nodes["10.0.0.1:3000"].node_id, "BB9020011AC4202")
+            self.assertFalse(index_sections.called)
+            self.assertFalse(read.called)
+
+        # a cache written by another version is ignored
+        with patch('lib.logreader.CACHE_HEADER', "asadm-cache 0 0\n"):
+            self.assertEqual(self.reader.load_cache(snapshot.file_hash, "config"), (False, None))
+
+    def testFileHashReused(self):
+        file_hash = self.reader.file_hash(self.path)
+        # an unchanged file is not read again
+        with patch.object(LogReader, "_content_hash", side_effect=AssertionError):
+            self.assertEqual(self.reader.file_hash(self.path), file_hash)
+
+        with open(self.path, "a") as f:
+            f.write("\n")
+        self.assertNotEqual(self.reader.file_hash(self.path), file_hash)
+
+    def testPruneCache(self):
+        gone = self.write_file("gone.log", COLLECTINFO + "gone\n")
+        self.reader.file_hash(gone)
+        self.reader.file_hash(self.path)
+        os.remove(gone)
+        for i, name in enumerate(("old", "recent", "new")):
+            self.reader.save_cache(name, "config", {"config": "x" * 1000})
+            path = self.reader._cache_path(name, "config")
+            os.utime(path, (1000 + i, 1000 + i))
+        # loading marks a cache as recently used
+        self.reader.load_cache("recent", "config")
+
+        with patch('lib.logreader.CACHE_MAX_BYTES', 2500):
+            self.reader.prune_cache()
+        self.assertEqual(self.reader.load_cache("old", "config"), (False, None))
+        self.assertTrue(self.reader.load_cache("recent", "config")[0])
+        self.assertTrue(self.reader.load_cache("new", "config")[0])
+        self.assertFalse(os.path.exists(self.reader._hash_record_path(gone)))
+        self.assertTrue(os.path.exists(self.reader._hash_record_path(self.path)))
+
+    def testGrep(self):
+        snapshot = LogSnapshot("ts", self.path, self.reader)
+        self.addCleanup(snapshot.destroy)
+
+        snapshot.set_input(["10.0.0.1:3000"], ignore_strs=["NODE"])
+        self.assertEqual(list(snapshot.show_iterator())
+                         , ["10.0.0.1:3000   *BB9020011AC4202   10.0.0.1:3000   E-3.9.1\n"])
+        snapshot.set_input(["10.0.0.1:3000"])
+        self.assertEqual(snapshot.count_iterator().next(), 3)
+
+        # case insensitive terms are substrings, not regular expressions
+        snapshot.set_input(["e-3.9.1", "c.3"], is_casesensitive=False)
+        self.assertEqual(snapshot.count_iterator().next(), 1)
+        snapshot.set_input(["node", "ip"], is_and=True, is_casesensitive=False)
+        self.assertEqual(snapshot.count_iterator().next(), 1)
+
+        pages = list(Logger(self.dir).grep([snapshot], ["3000"], output_page_size=3))
+        self.assertEqual([page[SHOW_RESULT_KEY].count("\n") for page in pages], [3, 1])
+        self.assertEqual("".join(page[SHOW_RESULT_KEY] for page in pages)
+                         , "".join(l for l in COLLECTINFO.splitlines(True) if "3000" in l))
+        # a snapshot without matches still has its (empty) result
+        self.assertEqual(list(Logger(self.dir).grep([snapshot], ["no such line"]))
+                         , [{SHOW_RESULT_KEY: ""}])
+
+    def testPrefixes(self):
+        self.assertEqual(LogReader.getPrefixes(self.path)
+                         , ["10.0.0.1:3000", "10.0.0.2:3000"])
+
+class ClusterManifestTest(LogTestCase):
+    def setUp(self):
+        super(ClusterManifestTest, self).setUp()
+        self.addCleanup(Logger.all_cluster_files.clear)
+        self.addCleanup(Logger.selected_cluster_files.clear)
+
+        self.logs = os.path.join(self.dir, "logs")
+        os.makedirs(self.logs)
+        self.path = self.write_file(os.path.join("logs", "ascollectinfo.log"), COLLECTINFO)
+        self.write_file(os.path.join("logs", "notes.txt"), "not a collectinfo\n")
+
+    def add(self):
+        Logger.all_cluster_files.clear()
+        Logger.selected_cluster_files.clear()
+        logger = Logger(self.logs)
+        return sorted(logger.all_cluster_files.keys())
+
+    def testManifestReused(self):
+        self.assertEqual(self.add(), ["2016-07-01 10:00:00 UTC"])
+        # snapshots are not parsed (or opened) until used
+        snapshot = Logger.all_cluster_files["2016-07-01 10:00:00 UTC"]
+        self.assertFalse(snapshot.cluster_data)
+        self.assertIsNone(snapshot.file_stream)
+
+        with patch.object(LogReader, "is_cluster_log_file") as is_cluster:
+            self.assertEqual(self.add(), ["2016-07-01 10:00:00 UTC"])
+            self.assertFalse(is_cluster.called)
+
+        # a changed file is looked at again
+        with open(self.path, "a") as f:
+            f.write("\n")
+        with patch.object(LogReader, "is_cluster_log_file", return_value=False) as is_cluster:
+            self.assertEqual(self.add(), [])
+            self.assertEqual(is_cluster.call_count, 1)
+
+    def testUnreadableDirectory(self):
+        logger = Logger(self.logs)
+        with patch('lib.logger.logutil.get_all_files', side_effect=OSError("Permission denied")):
+            added, error = logger.add_cluster_snapshots(self.logs)
+        self.assertEqual(added, 0)
+        self.assertIn("No aerospike collectinfo file available", error)
@@ -125,6 +125,56 @@ class NodeTest(unittest.TestCase):
         self.assertEqual(stats, expected,
             "infoNamespaceStatistics error:\nExpected:\t%s\nFound:\t%s"%(expected,stats))
     
+    def testInfoBatch(self):
+        n = self.getInfoMock("")
+        Node._infoCInfo.return_value = {"node":"A00000000000000"
+                                        , "build":"3.9.1"}
+
+        result = n.infoBatch(["node", "build", "node", "bogus"])
+        n._infoCInfo.assert_called_with(("node", "build", "bogus"))
+        self.assertEqual(result["node"], "A00000000000000")
+        self.assertEqual(result["build"], "3.9.1")
+        self.assertIsInstance(result["bogus"], IOError)
+
+    def testInfoAllNamespaceStatistics(self):
+        n = self.getInfoMock("")
+        n.infoNamespaces = Mock(return_value=["test", "bar"])
+        Node._infoCInfo.return_value = {"namespace/test":"a=1;b=2"
+                                        , "namespace/bar":"a=3"}
+
+        stats = n.infoAllNamespaceStatistics()
+        n._infoCInfo.assert_called_with(("namespace/test"
+                                         , "namespace/bar"))
+        self.assertEqual(stats, {"test":{"a":"1", "b":"2"}
+                                 , "bar":{"a":"3"}})
+
+    def testInfoCacheTTL(self):
+        self.assertEqual(lib.node.info_cache_ttl((None, "node")), 300.0)
+        self.assertEqual(lib.node.info_cache_ttl((None, "statistics")), 0.5)
+        self.assertEqual(lib.node.info_cache_ttl(
+            (None, "set-config:context=service;proto-fd-max=100")), 0)
+        self.assertEqual(lib.node.info_cache_ttl(
+            (None, ("build", "statistics"), 3004)), 0.5)
+
+    def testInfoGetConfigAll(self):
+        n = self.getInfoMock("")
+        n.infoNamespaces = Mock(return_value=["test", "bar"])
+        # no response to the service config, the namespaces are still there
+        Node._infoCInfo.return_value = {
+            "get-config:context=namespace;id=test":"a=1;b=2"
+            , "get-config:context=namespace;id=bar":"a=3"}
+
+        config = n.infoGetConfig("all")
+        self.assertEqual(config["namespace"], {"test":{"a":"1", "b":"2"}
+                                               , "bar":{"a":"3"}})
+        self.assertIsInstance(config["service"], IOError)
+
+        Node._infoCInfo.return_value = {
+            "get-config:context=namespace;id=test":"a=1;b=2"
+            , "get-config:context=service":"c=4"}
+        # a missing namespace fails the whole config, as it always did
+        self.assertIsInstance(n.infoGetConfig("all"), IOError)
+
     @unittest.skip("unknown Failure")
     def testInfoGetConfig(self):
         # todo call getconfig with various formats
@@ -0,0 +1,152 @@
+# Copyright 2013-2016 Aerospike, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from mock import patch
+import copy
+import os
+from lib.logreader import COUNT_RESULT_KEY, TOTAL_ROW_HEADER, END_ROW_KEY, UNIQ_SUPPRESSED_HEADER
+from lib.serverlog import compile_in_order
+from lib.uniqlines import UniqLines, ENTRY_BYTES
+from test.unit.logtestcase import LogTestCase
+
+LOG = """Jul 01 2016 10:00:01 GMT: INFO (info): (thr_info.c::4900)  trans_in_progress: wr 0 prox 0 tsvc-q 5
+Jul 01 2016 10:00:02 GMT: INFO (info): (hist.c::137)  histogram dump: reads (10, 20, 30) total
+Jul 01 2016 10:00:04 GMT: INFO (info): (thr_info.c::4800)  7(3) hits
+Jul 01 2016 10:00:05 GMT: INFO (info): (thr_info.c::4900)  trans_in_progress: wr 0 prox 0 tsvc-q 8
+Jul 01 2016 10:00:06 GMT: INFO (info): (hist.c::137)  histogram dump: reads (15, 21, 40) total
+Jul 01 2016 10:00:12 GMT: INFO (info): (thr_info.c::4800)  9(4) hits
+Jul 01 2016 10:00:13 GMT: INFO (info): (hist.c::137)  histogram dump: reads (16, 30, 41) total
+Jul 01 2016 10:00:14 GMT: INFO (info): (thr_info.c::4900)  trans_in_progress: wr 0 prox 0 tsvc-q 10
+"""
+
+class ServerLogDiffTest(LogTestCase):
+    def setUp(self):
+        super(ServerLogDiffTest, self).setUp()
+        self.file_handler = self.server_log(self.write_file("aerospike.log", LOG))
+
+    def diff(self, search_strs):
+        self.file_handler.set_input(search_strs, is_and=True, start_tm=self.file_handler.server_start_tm
+                                    , slice_duration="10")
+        return [(tm.second, copy.deepcopy(res)) for tm, res in self.file_handler.diff_iterator()]
+
+    def testValueFormats(self):
+        # values of a slice are summed, diff is against the previous slice
+        self.assertEqual(self.diff(["tsvc-q"])
+                         , [(1, {"value":{"Jul 01 2016 10:00:01":[13]}, "diff":{"Jul 01 2016 10:00:01":[13]}})
+                            , (11, {"value":{"Jul 01 2016 10:00:11":[10]}, "diff":{"Jul 01 2016 10:00:11":[-3]}})])
+        self.assertEqual([res["diff"].values()[0] for _, res in self.diff(["histogram", "reads"])]
+                         , [[25, 41, 70], [-9, -11, -29]])
+        self.assertEqual([res["value"].values()[0] for _, res in self.diff(["hits"])]
+                         , [[7, 3], [9, 4]])
+
+    def testInOrder(self):
+        self.assertTrue(compile_in_order(["wr", "tsvc-q"]).search(LOG.splitlines()[0]))
+        self.assertFalse(compile_in_order(["tsvc-q", "wr"]).search(LOG.splitlines()[0]))
+        self.assertTrue(compile_in_order(["a.b", ""]).search("xa.by"))
+        self.assertFalse(compile_in_order(["a.b"]).search("axb"))
+
+class ServerLogFollowTest(LogTestCase):
+    def setUp(self):
+        super(ServerLogFollowTest, self).setUp()
+        self.path = self.write_file("aerospike.log", LOG)
+        self.file_handler = self.server_log(self.path)
+        # every wait for new lines runs the next of these instead of sleeping
+        self.writes = []
+        patch('lib.serverlog.time.sleep', side_effect=lambda s: self.writes.pop(0)()).start()
+
+    def append(self, text):
+        def write():
+            with open(self.path, "a") as f:
+                f.write(text)
+        return write
+
+    def rotate(self, text):
+        def write():
+            os.rename(self.path, self.path + ".1")
+            with open(self.path, "w") as f:
+                f.write(text)
+        return write
+
+    def testCount(self):
+        self.writes = [self.append("Jul 01 2016 10:00:22 GMT: INFO (info): tsvc-q 3\n")
+                       , self.rotate("Jul 01 2016 10:00:35 GMT: INFO (info): tsvc-q 4\n")]
+        self.file_handler.set_input(["tsvc-q"], start_tm=self.file_handler.server_start_tm
+                                    , slice_duration="10", follow=True)
+        count_it = self.file_handler.count_iterator()
+        # a slice is out once the log has gone past its end
+        counts = [count_it.next()[1][COUNT_RESULT_KEY].items()[0] for _ in range(3)]
+        self.assertEqual(counts, [("Jul 01 2016 10:00:01", 2), ("Jul 01 2016 10:00:11", 1)
+                                  , ("Jul 01 2016 10:00:21", 1)])
+        self.assertEqual(self.writes, [])
+        self.assertEqual(self.file_handler.file_inode, os.stat(self.path).st_ino)
+
+    def testShow(self):
+        self.writes = [self.append("Jul 01 2016 10:00:20 GMT: INFO (info): tsvc-q 3\nJul 01 2016 10:00:2")
+                       , self.append("1 GMT: INFO (info): (thr_info.c::4800)  8(3) hits\n")]
+        self.file_handler.set_input(["hits"], start_tm=self.file_handler.server_start_tm, follow=True)
+        show_it = self.file_handler.show_iterator()
+        self.assertEqual([show_it.next()[0].second for _ in range(2)], [4, 12])
+        # the log grew without a match
+        tm, line = show_it.next()
+        self.assertEqual((tm.second, line), (20, None))
+        tm, line = show_it.next()
+        self.assertEqual(tm.second, 21)
+        self.assertIn("8(3) hits", line)
+        # the index follows the log
+        self.assertEqual(self.file_handler.server_end_tm.second, 21)
+
+class ServerLogUniqTest(LogTestCase):
+    def setUp(self):
+        super(ServerLogUniqTest, self).setUp()
+        # the same three messages over and over, only the time differs
+        self.file_handler = self.server_log(self.write_file("aerospike.log", "".join(
+            "Jul 01 2016 10:00:%02d GMT: WARNING (rw): (thr_rw.c::%d)  write timeout\n"
+            %(i, 100 + i % 3) for i in range(30))))
+
+    def show(self, **kwargs):
+        self.file_handler.set_input(["timeout"], start_tm=self.file_handler.server_start_tm, **kwargs)
+        return list(iter(self.file_handler.show_iterator().next, (None, None)))
+
+    def testShow(self):
+        self.assertEqual(len(self.show()), 30)
+        for kwargs in ({"uniq": True}, {"uniq_exact": True}):
+            lines = self.show(**kwargs)
+            self.assertEqual([tm.second for tm, line in lines[:3]], [0, 1, 2])
+            # then the report, once
+            self.assertEqual(lines[3], (END_ROW_KEY, "27 duplicate lines suppressed\n"))
+            self.assertEqual(len(lines), 4)
+
+    def testSecondTimeZone(self):
+        # only the timestamp is left out, not the message after another GMT
+        with open(self.file_handler.server_file, "a") as f:
+            f.write("Jul 01 2016 10:00:40 GMT: WARNING (rw): write timeout since 10:00 GMT on ns foo\n"
+                    "Jul 01 2016 10:00:41 GMT: WARNING (rw): write timeout since 10:00 GMT on ns bar\n")
+        for kwargs in ({"uniq": True}, {"uniq_exact": True}):
+            lines = self.show(**kwargs)
+            self.assertEqual([tm.second for tm, line in lines[:5]], [0, 1, 2, 40, 41])
+
+    def testCount(self):
+        self.file_handler.set_input(["timeout"], start_tm=self.file_handler.server_start_tm
+                                    , slice_duration="10", uniq=True)
+        counts = dict(self.file_handler.count_iterator())
+        self.assertEqual(counts[END_ROW_KEY][COUNT_RESULT_KEY][TOTAL_ROW_HEADER], 3)
+        self.assertEqual(counts[END_ROW_KEY][COUNT_RESULT_KEY][UNIQ_SUPPRESSED_HEADER], 27)
+
+    def testMemoryCap(self):
+        with patch('lib.serverlog.UniqLines', lambda exact: UniqLines(exact, max_bytes=ENTRY_BYTES)):
+            lines = self.show(uniq=True)
+        # the same lines are left out, now by the Bloom filter
+        self.assertEqual(len(lines), 4)
+        self.assertTrue(self.file_handler.uniq_lines.is_capped())
+        self.assertIn("memory cap", lines[3][1])
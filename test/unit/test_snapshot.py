@@ -0,0 +1,100 @@
+# Copyright 2013-2016 Aerospike, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest2 as unittest
+from lib.snapshot import StatsSnapshot, CounterRates, namespace_snapshots, \
+    is_counter
+
+class StatsSnapshotTest(unittest.TestCase):
+    def setUp(self):
+        self.stats = {"n1": {"objects": "10", "free-pct": "40.5"
+                             , "swapping": "false", "old-name": "3"}
+                      , "n2": {"objects": "32", "free-pct": "20"
+                               , "swapping": "true", "new_name": "4"}
+                      , "n3": IOError("down")}
+
+    def testColumns(self):
+        snapshot = StatsSnapshot(self.stats)
+
+        self.assertEqual(snapshot.nodes, ["n1", "n2"])
+        self.assertIn("n3", snapshot.errors)
+        self.assertEqual(snapshot.value("n1", "objects"), 10)
+        self.assertEqual(snapshot.value("n1", "swapping"), None)
+        self.assertEqual(snapshot.value("n3", "objects", 0), 0)
+        self.assertEqual(snapshot.get("n2", "swapping"), "true")
+
+        self.assertEqual(snapshot.sum("objects"), 42)
+        self.assertEqual(snapshot.min("free-pct"), 20)
+        self.assertEqual(snapshot.max("free-pct"), 40.5)
+        self.assertEqual(snapshot.sum("swapping"), None)
+        self.assertEqual(snapshot.sum("missing", 0), 0)
+
+        # aliases, each node uses whichever name it reports
+        self.assertEqual(snapshot.sum(("old-name", "new_name")), 7)
+
+        # only values made of digits are totalled, on the nodes having one
+        self.assertEqual(snapshot.totals(), {"objects": 42, "old-name": 3
+                                             , "new_name": 4, "free-pct": 20})
+        snapshot = StatsSnapshot({"n1": {"a": "-5", "b": "1.5", "c": "7"}
+                                  , "n2": {"a": "10", "b": "2", "c": "x"}})
+        self.assertEqual(snapshot.totals(), {"a": 10, "b": 2, "c": 7})
+
+    def testNamespaceSnapshots(self):
+        stats = {"n1": {"test": {"objects": "1"}, "bar": {"objects": "5"}}
+                 , "n2": {"test": {"objects": "2"}
+                          , "bar": IOError("timeout")}
+                 , "n3": IOError("down")}
+
+        snapshots = namespace_snapshots(stats)
+        self.assertEqual(sorted(snapshots.keys()), ["bar", "test"])
+        self.assertEqual(snapshots["test"].sum("objects"), 3)
+        self.assertEqual(snapshots["bar"].nodes, ["n1"])
+        self.assertIn("n2", snapshots["bar"].errors)
+
+    def testRates(self):
+        self.assertTrue(is_counter("stat_read_reqs"))
+        self.assertTrue(is_counter("client_write_success"))
+        self.assertFalse(is_counter("objects"))
+        self.assertFalse(is_counter("free-pct-memory"))
+
+        rates = CounterRates()
+        first = {"n1": {"stat_read_reqs": "100", "uptime": "50", "objects": "7"}
+                 , "n2": {"stat_read_reqs": "500", "uptime": "900"}}
+        self.assertEqual(rates.update("service", first, timestamp=10), None)
+
+        # n2 restarted between the two snapshots
+        second = {"n1": {"stat_read_reqs": "300", "uptime": "60", "objects": "9"}
+                  , "n2": {"stat_read_reqs": "20", "uptime": "5"}
+                  , "n3": {"stat_read_reqs": "1", "uptime": "1"}}
+        result = rates.update("service", second, timestamp=20)
+        self.assertEqual(result["n1"], {"stat_read_reqs": (20.0, 200)})
+        self.assertEqual(result["n2"], {"stat_read_reqs": None})
+        self.assertNotIn("n3", result)
+
+        # snapshots are kept per table
+        self.assertEqual(rates.update("other", second), None)
+
+    def testNamespaceRates(self):
+        # namespace statistics have no uptime, the service uptime fetched
+        # with them tells a restart even if counters have climbed back
+        rates = CounterRates()
+        first = {"n1": {"client_read_success": "100"}, "n2": {"client_read_success": "500"}}
+        self.assertEqual(rates.update("test Namespace Statistics", first, timestamp=10
+                                      , uptimes={"n1": "50", "n2": "900"}), None)
+
+        second = {"n1": {"client_read_success": "300"}, "n2": {"client_read_success": "700"}}
+        result = rates.update("test Namespace Statistics", second, timestamp=20
+                              , uptimes={"n1": "60", "n2": "5"})
+        self.assertEqual(result["n1"], {"client_read_success": (20.0, 200)})
+        self.assertEqual(result["n2"], {"client_read_success": None})
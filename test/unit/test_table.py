@@ -0,0 +1,67 @@
+# Copyright 2013-2016 Aerospike, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from mock import patch, Mock
+import unittest2 as unittest
+import sys
+from cStringIO import StringIO
+from lib import terminal
+from lib.table import Table, TableDiff, Styles, TitleFormats
+from lib.view import CliView
+
+class TableDiffTest(unittest.TestCase):
+    def tearDown(self):
+        Table.diff = None
+
+    def render(self, rows):
+        t = Table("Stats", ["NODE", "objects", "uptime"]
+                  , title_format=TitleFormats.noChange, style=Styles.VERTICAL)
+        for row in rows:
+            t.insertRow(row)
+        str(t)
+        return t
+
+    def testChangedCells(self):
+        Table.diff = TableDiff()
+
+        t = self.render([{"NODE":"a", "objects":"1", "uptime":"10"}
+                         , {"NODE":"b", "objects":"5", "uptime":"10"}])
+        self.assertEqual(t._changed, set())
+        Table.diff.nextIteration()
+
+        # wider values must not shift the comparison
+        t = self.render([{"NODE":"b", "objects":"5", "uptime":"12"}
+                         , {"NODE":"a", "objects":"1000", "uptime":"12"}])
+        self.assertEqual(t._changed, set([(0, 1), (0, 2), (1, 2)]))
+
+    def testNoDiff(self):
+        t = self.render([{"NODE":"a", "objects":"1", "uptime":"10"}])
+        self.assertEqual(t._changed, set())
+
+    def testWatchTextDiff(self):
+        # output not drawn by Table (e.g. asinfo) falls back to a text diff
+        self.addCleanup(terminal.enable_color, terminal.color_enabled)
+        terminal.enable_color(True)
+        patch('lib.view.time.sleep').start()
+        self.addCleanup(patch.stopall)
+        outputs = ["objects 10 uptime 5\n", "objects 10 uptime 7\n"]
+        ctrl = Mock()
+        ctrl.execute.side_effect = lambda line: sys.stdout.write(outputs.pop(0))
+
+        out = StringIO()
+        with patch('sys.stdout', out):
+            CliView.watch(ctrl, ["1", "2", "asinfo"])
+        self.assertIn("uptime %s7%s"%(terminal.inverse(), terminal.uninverse())
+                      , out.getvalue())
+        self.assertNotIn(terminal.inverse() + "1", out.getvalue())
@@ -0,0 +1,53 @@
+# Copyright 2013-2016 Aerospike, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest2 as unittest
+from lib.uniqlines import BloomFilter, UniqLines, ENTRY_BYTES
+
+class UniqLinesTest(unittest.TestCase):
+    def add(self, uniq_lines, lines):
+        return [line for line in lines if uniq_lines.add(line)]
+
+    def testExactAndHashed(self):
+        lines = ["a\n", "b\n", "a\n", "c\n", "b\n", "a\n"]
+        for exact in (False, True):
+            uniq_lines = UniqLines(exact=exact)
+            self.assertEqual(self.add(uniq_lines, lines), ["a\n", "b\n", "c\n"])
+            self.assertEqual(uniq_lines.suppressed, 3)
+            self.assertFalse(uniq_lines.is_capped())
+            self.assertEqual(uniq_lines.report(), "3 duplicate lines suppressed\n")
+        self.assertEqual(UniqLines().report(), "")
+
+    def testMemoryCap(self):
+        lines = ["line %d\n"%(i) for i in range(2000)]
+        uniq_lines = UniqLines(max_bytes=100 * ENTRY_BYTES)
+        self.assertEqual(len(self.add(uniq_lines, lines[:100])), 100)
+        self.assertFalse(uniq_lines.is_capped())
+
+        # past 100 lines the set moves to a Bloom filter of the same memory
+        self.assertTrue(len(self.add(uniq_lines, lines[100:])) > 1880)
+        self.assertTrue(uniq_lines.is_capped())
+        self.assertEqual(uniq_lines.seen, set())
+        self.assertEqual(len(uniq_lines.bloom.bits), 100 * ENTRY_BYTES)
+        self.assertEqual(self.add(uniq_lines, lines), [])
+        self.assertIn("memory cap", uniq_lines.report())
+
+    def testBloomFilter(self):
+        bloom = BloomFilter(1024)
+        hashes = [hash("line %d"%(i)) for i in range(500)]
+        self.assertTrue(all(bloom.add(h) for h in hashes))
+        self.assertFalse(any(bloom.add(h) for h in hashes))
+        # about 1% false positives at 16 bits per entry and less
+        new = sum(bloom.add(hash("other %d"%(i))) for i in range(500))
+        self.assertTrue(new > 480)
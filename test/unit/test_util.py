@@ -28,6 +28,26 @@ class UtilTest(unittest.TestCase):
         result = util.info_to_dict(value, ':')
         self.assertEqual(result, expected)
 
+    def testInfoToDictEdgeCases(self):
+        # consecutive duplicate keys are merged, sorted
+        self.assertEqual(util.info_to_dict("a=2;a=1;b=3")
+                         , {'a':'1,2', 'b':'3'})
+        # non consecutive duplicates, the last one wins
+        self.assertEqual(util.info_to_dict("a=1;b=2;a=3"), {'a':'3', 'b':'2'})
+        # items without '=' are ignored, and so is their group
+        self.assertEqual(util.info_to_dict("a=1;junk;b=2;"), {'a':'1', 'b':'2'})
+        self.assertEqual(util.info_to_dict("a;a=1;b=2"), {'b':'2'})
+        # only the text up to a second '=' is kept
+        self.assertEqual(util.info_to_dict("a=b=c;d="), {'a':'b', 'd':''})
+        self.assertEqual(util.info_to_dict(""), {})
+
+    def testInfoToDictMultiLevel(self):
+        value = "DC_Name=dc1:DC_type=aerospike;DC_Name=dc2:DC_type=http;x=1"
+        expected = {'dc1':{'DC_Name':'dc1', 'DC_type':'aerospike'}
+                    , 'dc2':{'DC_Name':'dc2', 'DC_type':'http'}}
+        result = util.info_to_dict_multi_level(value, "DC_Name")
+        self.assertEqual(result, expected)
+
     def testInfoColonToDict(self):
         value = "a=1:b=@:c=c:d=1@"
         expected = {'a':'1', 'b':'@', 'c':'c', 'd':'1@'}
@@ -58,6 +78,49 @@ class UtilTest(unittest.TestCase):
         result = util.concurrent_map(lambda v: v*v, value)
         self.assertEqual(result, expected)
 
+    def testConcurrentMapBoundedPool(self):
+        max_workers = util.get_max_workers()
+        self.addCleanup(util.set_max_workers, max_workers)
+        util.set_max_workers(2)
+
+        # nested maps must not deadlock when every worker is busy
+        def outer(v):
+            return sum(util.concurrent_map(lambda x: x*v, range(5)))
+
+        value = range(8)
+        expected = map(outer, value)
+        result = util.concurrent_map(outer, value)
+        self.assertEqual(result, expected)
+        self.assertRaises(ValueError, util.set_max_workers, 0)
+
+    def testConcurrentMapTimeout(self):
+        result = util.concurrent_map(time.sleep, [0.05, 0.5], timeout=0.1)
+        self.assertEqual(result[0], None)
+        self.assertIsInstance(result[1], timeout.TimeoutException)
+
+    def testConcurrentMapException(self):
+        def tester(v):
+            if v == 2:
+                raise ValueError("bad value")
+            return v
+
+        # a failed element does not abort the others
+        result = util.concurrent_map(tester, [1, 2, 3])
+        self.assertEqual(result[0], 1)
+        self.assertIsInstance(result[1], ValueError)
+        self.assertEqual(result[2], 3)
+
+    def testFuture(self):
+        future = util.Future(lambda a, b: a + b, 1, b=2).start()
+        self.assertEqual(future.result(), 3)
+
+        future = util.Future(lambda: 1/0).start()
+        self.assertRaises(ZeroDivisionError, future.result)
+
+        future = util.Future(time.sleep, 0.5).start()
+        time.sleep(0.05)
+        self.assertRaises(timeout.TimeoutException, future.result, 0.1)
+
     def testCached(self):
         def tester(arg1, arg2, sleep):
             time.sleep(sleep)
@@ -75,3 +138,44 @@ class UtilTest(unittest.TestCase):
         self.assertEqual(4, tester(2,2,0.2))
         self.assertEqual(5, tester(3,2,0.2))
         self.assertRaises(timeout.TimeoutException, tester, 1, 2, 5)
+
+    def testCachedBounded(self):
+        calls = []
+        def tester(arg):
+            calls.append(arg)
+            return arg
+
+        tester = util.cached(tester, ttl=lambda key: 0 if key[0] < 0 else 5
+                             , max_size=2)
+        tester(1)
+        tester(2)
+        tester(1)
+        tester(3) # evicts 2, the least recently used
+        tester(1)
+        tester(2)
+        tester(-1)
+        tester(-1) # ttl 0, never cached
+
+        self.assertEqual(calls, [1, 2, 3, 2, -1, -1])
+        stats = tester.getStats()
+        self.assertEqual(stats['entries'], 2)
+        self.assertEqual(stats['hits'], 2)
+        self.assertEqual(stats['misses'], 6)
+        self.assertEqual(stats['evictions'], 2)
+
+    def testCachedSingleFlight(self):
+        calls = []
+        def tester(arg):
+            calls.append(arg)
+            time.sleep(0.2)
+            return arg
+
+        tester = util.cached(tester, ttl=5)
+        result = util.concurrent_map(tester, [1] * 5)
+
+        self.assertEqual(result, [1] * 5)
+        self.assertEqual(calls, [1])
+        stats = tester.getStats()
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['hits'] + stats['shared'], 4)
+